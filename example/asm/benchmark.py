@@ -0,0 +1,55 @@
+#! /usr/bin/env python2
+"""Measure the time spent to parse, resolve and assemble a large listing"""
+from __future__ import print_function
+from argparse import ArgumentParser
+import random
+import time
+
+from miasm.arch.x86.arch import mn_x86
+from miasm.core import parse_asm, asmblock
+
+parser = ArgumentParser("Assembler benchmark")
+parser.add_argument("-n", "--instructions", type=int, default=50000,
+                    help="Number of instructions in the listing")
+parser.add_argument("-s", "--seed", type=int, default=0,
+                    help="Random seed used to build the listing")
+args = parser.parse_args()
+
+random.seed(args.seed)
+
+# Build a listing made of small blocks, linked by short and long jumps
+BLOCK_SIZE = 10
+block_count = max(1, args.instructions // BLOCK_SIZE)
+lines = []
+for index in range(block_count):
+    lines.append("lbl_%d:" % index)
+    for _ in range(BLOCK_SIZE - 2):
+        lines.append(random.choice([
+            "    MOV    EAX, 0x%x" % random.randint(0, 0xFFFFFFFF),
+            "    ADD    EBX, 0x%x" % random.randint(0, 0xFF),
+            "    XOR    ECX, EDX",
+            "    PUSH   EAX",
+            "    POP    EDX",
+            "    LEA    ESI, DWORD PTR [EDI + 0x%x]" % random.randint(0, 0xFFFF),
+        ]))
+    # Near destinations use short jumps, far ones long jumps
+    target = min(
+        block_count - 1,
+        max(0, index + random.choice([-3, -1, 1, 2, 5, 50, 500]))
+    )
+    lines.append("    JZ     lbl_%d" % target)
+    lines.append("    CALL   lbl_%d" % random.randint(0, block_count - 1))
+lines.append("    RET")
+txt = "\n".join(lines) + "\n"
+
+start = time.time()
+asmcfg, loc_db = parse_asm.parse_txt(mn_x86, 32, txt)
+parsed = time.time()
+loc_db.set_location_offset(loc_db.get_name_location("lbl_0"), 0x0)
+patches = asmblock.asm_resolve_final(mn_x86, asmcfg, loc_db)
+resolved = time.time()
+
+print("Instructions: %d" % len(patches))
+print("Bytes: %d" % sum(len(data) for data in patches.values()))
+print("Parse: %.2fs" % (parsed - start))
+print("Resolve and assemble: %.2fs" % (resolved - parsed))
@@ -0,0 +1,73 @@
+#! /usr/bin/env python2
+"""Measure interval operations on a large set of intervals"""
+from __future__ import print_function
+from argparse import ArgumentParser
+import random
+import time
+
+from miasm.core.interval import interval
+
+parser = ArgumentParser("Interval benchmark")
+parser.add_argument("-n", "--intervals", type=int, default=100000,
+                    help="Number of intervals")
+parser.add_argument("-s", "--seed", type=int, default=0,
+                    help="Random seed used to build the intervals")
+args = parser.parse_args()
+
+random.seed(args.seed)
+
+# Block-like ranges: small, mostly disjoint, in random order
+bounds = []
+for index in range(args.intervals):
+    start = index * 0x20 + random.randint(0, 0x10)
+    bounds.append((start, start + random.randint(0, 0x18)))
+random.shuffle(bounds)
+queries = [random.randint(0, args.intervals * 0x20) for _ in range(args.intervals)]
+
+
+def bench(name, func):
+    start = time.time()
+    result = func()
+    print("%s: %.2fs" % (name, time.time() - start))
+    return result
+
+
+def build():
+    inter = interval(bounds)
+    return inter
+
+
+def add_one_by_one():
+    inter = interval()
+    for start, stop in bounds:
+        inter.add(start, stop)
+    return inter
+
+
+def contains():
+    return sum(1 for offset in queries if offset in inter)
+
+
+def overlaps():
+    return sum(1 for offset in queries if inter.overlaps(offset, offset + 0x10))
+
+
+inter = bench("Build", build)
+assert bench("Add one by one", add_one_by_one) == inter
+print("Intervals: %d" % len(inter.intervals))
+bench("Point queries", contains)
+bench("Overlap queries", overlaps)
+other = interval((offset, offset + 0x8) for offset in queries)
+bench("Union", lambda: inter + other)
+bench("Difference", lambda: inter - other)
+bench("Intersection", lambda: inter & other)
+
+
+def remove_one_by_one():
+    removed = interval(inter)
+    for start, stop in bounds:
+        removed.remove(start, stop)
+    return removed
+
+
+assert bench("Remove one by one", remove_one_by_one).empty
@@ -0,0 +1,51 @@
+#! /usr/bin/env python2
+"""Measure the startup time of a Machine, using 'python -X importtime'"""
+from __future__ import print_function
+from argparse import ArgumentParser
+import subprocess
+import sys
+import time
+
+parser = ArgumentParser("Machine startup benchmark")
+parser.add_argument("-m", "--machine", default="x86_64",
+                    help="Machine to instantiate")
+parser.add_argument("-a", "--attributes", nargs="*", default=[],
+                    help="Machine attributes to access (ie. mn, dis_engine)")
+parser.add_argument("-t", "--top", type=int, default=10,
+                    help="Number of slowest modules to display")
+args = parser.parse_args()
+
+code = "from miasm.analysis.machine import Machine\n"
+code += "machine = Machine(%r)\n" % args.machine
+for attribute in args.attributes:
+    code += "machine.%s\n" % attribute
+
+command = [sys.executable, "-X", "importtime", "-c", code]
+start = time.time()
+process = subprocess.Popen(command, stderr=subprocess.PIPE)
+_, stderr = process.communicate()
+elapsed = time.time() - start
+if process.returncode:
+    print(stderr.decode("utf8", "replace"))
+    raise RuntimeError("Machine instantiation failed")
+
+# Lines are: "import time: self [us] | cumulative | imported package"
+modules = []
+for line in stderr.decode("utf8", "replace").splitlines():
+    if not line.startswith("import time:"):
+        continue
+    fields = line[len("import time:"):].split("|")
+    if len(fields) != 3 or not fields[0].strip().isdigit():
+        continue
+    modules.append((int(fields[0]), int(fields[1]), fields[2].rstrip()))
+
+if modules:
+    print("Imported modules: %d" % len(modules))
+    print("Import time: %.3fs" % (sum(module[0] for module in modules) / 1e6))
+    print("Slowest modules (self, cumulative):")
+    for self_time, cumulative, name in sorted(modules, reverse=True)[:args.top]:
+        print("  %.3fs %.3fs %s" % (self_time / 1e6, cumulative / 1e6, name))
+else:
+    # -X importtime is only available since Python 3.7
+    print("No import time information available")
+print("Total: %.3fs" % elapsed)
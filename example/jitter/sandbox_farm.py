@@ -0,0 +1,67 @@
+#! /usr/bin/env python2
+"""Emulate a batch of binaries across worker processes"""
+from __future__ import print_function
+from argparse import ArgumentParser
+import time
+
+from miasm.analysis import sandbox
+from miasm.analysis.sandbox_farm import SandboxFarm, SandboxJob, \
+    EXIT_ERROR, EXIT_CRASHED
+
+parser = ArgumentParser("Sandbox farm")
+parser.add_argument("filenames", nargs="+", help="Binaries to emulate")
+parser.add_argument("-s", "--sandbox", default="Sandbox_Linux_arml",
+                    help="Sandbox class name (default: Sandbox_Linux_arml)")
+parser.add_argument("-r", "--repeat", type=int, default=1,
+                    help="Number of times each binary is emulated")
+parser.add_argument("-p", "--processes", type=int, default=None,
+                    help="Number of worker processes")
+parser.add_argument("-t", "--timeout", type=float, default=None,
+                    help="Timeout of each job, in seconds")
+parser.add_argument("-n", "--max-instructions", type=int, default=None,
+                    help="Instruction budget of each job")
+parser.add_argument("-m", "--memory-limit", type=int, default=None,
+                    help="Address space limit of each job, in MB")
+parser.add_argument("-o", "--sandbox-options", default="-q",
+                    help="Options passed to the sandbox (default: '-q')")
+parser.add_argument("-j", "--jitter", default="gcc",
+                    help="Jitter engine")
+args = parser.parse_args()
+
+sandbox_cls = getattr(sandbox, args.sandbox)
+options = args.sandbox_options.split() + ["--jitter", args.jitter]
+memory_limit = args.memory_limit << 20 if args.memory_limit else None
+
+jobs = [
+    SandboxJob(sandbox_cls, fname, options,
+               job_id="%s #%d" % (fname, index))
+    for fname in args.filenames
+    for index in range(args.repeat)
+]
+farm = SandboxFarm(
+    processes=args.processes,
+    timeout=args.timeout,
+    max_instructions=args.max_instructions,
+    memory_limit=memory_limit,
+)
+
+start = time.time()
+reasons = {}
+for result in farm.run(jobs):
+    print("%s: %s in %.2fs, %d API calls%s" % (
+        result.job_id,
+        result.reason,
+        result.elapsed,
+        len(result.api_calls),
+        "" if result.instructions is None
+        else ", %d instructions" % result.instructions,
+    ))
+    if result.error:
+        print(result.error)
+    reasons[result.reason] = reasons.get(result.reason, 0) + 1
+print("Jobs: %d in %.2fs" % (len(jobs), time.time() - start))
+print("Exit reasons: %s" % ", ".join(
+    "%s: %d" % (reason, count) for reason, count in sorted(reasons.items())
+))
+
+assert EXIT_ERROR not in reasons and EXIT_CRASHED not in reasons
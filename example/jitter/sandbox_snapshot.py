@@ -0,0 +1,51 @@
+#! /usr/bin/env python2
+"""Initialise a sandbox once, then restart its emulation from a snapshot"""
+from __future__ import print_function
+from argparse import ArgumentParser
+import time
+
+from miasm.analysis import sandbox
+
+# Parse arguments
+parser = ArgumentParser(add_help=False)
+parser.add_argument("sandbox", help="Sandbox class name (ie. Sandbox_Linux_arml)")
+options, _ = parser.parse_known_args()
+sandbox_cls = getattr(sandbox, options.sandbox)
+
+parser = sandbox_cls.parser(description="Sandbox snapshot")
+parser.add_argument("sandbox", help="Sandbox class name (ie. Sandbox_Linux_arml)")
+parser.add_argument("filename", help="Binary to emulate")
+parser.add_argument("-n", "--runs", type=int, default=3,
+                    help="Number of runs from the snapshot")
+options = parser.parse_args()
+
+# Initialise the environment once
+start = time.time()
+sb = sandbox_cls(options.filename, options, globals())
+snapshot = sb.snapshot()
+print("Initialisation: %.3fs" % (time.time() - start))
+
+
+def final_state(sb):
+    """Registers and memory at the end of an emulation"""
+    memory = dict(
+        (addr, page["data"])
+        for addr, page in sb.jitter.vm.get_all_memory().items()
+    )
+    return sb.jitter.cpu.get_gpreg(), memory
+
+
+states = []
+for index in range(options.runs):
+    start = time.time()
+    sb.restore(snapshot)
+    restored = time.time()
+    sb.run()
+    print("Run %d: restore %.3fs, emulation %.3fs" % (
+        index, restored - start, time.time() - restored
+    ))
+    states.append(final_state(sb))
+
+# Each run must end in the same state
+for state in states[1:]:
+    assert state == states[0]
@@ -0,0 +1,161 @@
+"""Persistent storage of analysis results (AsmCFG, LocationDB and IRCFG)
+
+Results are stored per function in a SQLite database, keyed by the container
+digest and the miasm version. Each entry also records the digest of the
+bytes covered by the function blocks: an entry is invalidated on load if
+these bytes have been patched.
+
+Example:
+
+    analysis_db = AnalysisDB("analysis.sqlite", cont)
+    asmcfg, ircfg = analysis_db.load(offset) or (None, None)
+    if asmcfg is None:
+        asmcfg = mdis.dis_multiblock(offset)
+        ircfg = ir_arch.new_ircfg_from_asmcfg(asmcfg)
+        analysis_db.save(offset, asmcfg, ircfg)
+"""
+
+import hashlib
+import json
+import pickle
+import sqlite3
+
+from miasm import VERSION
+
+
+class AnalysisDB(object):
+    """SQLite store of the analysis results of a container's functions
+
+    A function entry holds its AsmCFG, and optionally its IRCFG, pickled
+    together so that they share the same LocationDB (AsmCFG.loc_db) once
+    loaded.
+
+    Warning: the stored results are unpickled on load, which can execute
+    arbitrary code. Only open databases from a trusted source. The ranges
+    covered by the functions are stored as JSON, so they are checked without
+    unpickling anything.
+    """
+
+    SCHEMA = """CREATE TABLE IF NOT EXISTS functions (
+        container TEXT NOT NULL,
+        version TEXT NOT NULL,
+        offset INTEGER NOT NULL,
+        ranges BLOB NOT NULL,
+        digest TEXT NOT NULL,
+        data BLOB NOT NULL,
+        PRIMARY KEY (container, version, offset)
+    )"""
+
+    def __init__(self, path, container, version=VERSION):
+        """
+        @path: path of the SQLite database, created if needed
+        @container: Container instance of the analysed binary
+        @version: (optional) version of the stored results, default to the
+        miasm one
+        """
+        self.path = path
+        self.container = container
+        self.version = version
+        self._container_key = (container.digest, version)
+        self._db = sqlite3.connect(path)
+        self._db.execute(self.SCHEMA)
+        self._db.commit()
+
+    def close(self):
+        "Close the database"
+        self._db.close()
+
+    @staticmethod
+    def get_ranges(asmcfg):
+        """Return the list of (start, stop) offsets of @asmcfg's blocks"""
+        ranges = set()
+        for block in asmcfg.blocks:
+            if not block.lines:
+                continue
+            ranges.add(block.get_range())
+        return sorted(ranges)
+
+    def get_digest(self, ranges):
+        """Return the digest of the bytes covered by @ranges in the container
+        bin_stream, None if some of them are not available
+        @ranges: list of (start, stop) offsets
+        """
+        digest = hashlib.sha256()
+        bin_stream = self.container.bin_stream
+        for start, stop in ranges:
+            try:
+                digest.update(bin_stream.getbytes(start, stop - start))
+            except IOError:
+                return None
+        return digest.hexdigest()
+
+    def save(self, offset, asmcfg, ircfg=None):
+        """Store the analysis of the function at @offset
+        @offset: function offset
+        @asmcfg: AsmCFG instance of the function
+        @ircfg: (optional) IRCFG instance of the function
+        """
+        ranges = self.get_ranges(asmcfg)
+        digest = self.get_digest(ranges)
+        if digest is None:
+            raise ValueError("Function bytes are not in the container")
+        ranges = json.dumps(ranges).encode("ascii")
+        data = pickle.dumps((asmcfg, ircfg), pickle.HIGHEST_PROTOCOL)
+        self._db.execute(
+            "INSERT OR REPLACE INTO functions VALUES (?, ?, ?, ?, ?, ?)",
+            self._container_key + (
+                offset,
+                sqlite3.Binary(ranges),
+                digest,
+                sqlite3.Binary(data),
+            )
+        )
+        self._db.commit()
+
+    def load(self, offset):
+        """Return the (AsmCFG, IRCFG) stored for the function at @offset, or
+        None if not stored or if its bytes changed since
+        The IRCFG is None if it was not saved.
+        @offset: function offset
+        """
+        row = self._db.execute(
+            "SELECT ranges, digest, data FROM functions "
+            "WHERE container = ? AND version = ? AND offset = ?",
+            self._container_key + (offset,)
+        ).fetchone()
+        if row is None:
+            return None
+        ranges, digest, data = row
+        if self.get_digest(json.loads(bytes(ranges).decode("ascii"))) != digest:
+            # Patched function
+            self.invalidate(offset)
+            return None
+        return pickle.loads(bytes(data))
+
+    def invalidate(self, offset=None):
+        """Remove the function at @offset from the store
+        @offset: (optional) function offset, all the container functions if
+        not set
+        """
+        if offset is None:
+            self._db.execute(
+                "DELETE FROM functions WHERE container = ? AND version = ?",
+                self._container_key
+            )
+        else:
+            self._db.execute(
+                "DELETE FROM functions "
+                "WHERE container = ? AND version = ? AND offset = ?",
+                self._container_key + (offset,)
+            )
+        self._db.commit()
+
+    def offsets(self):
+        """Return the offsets of the functions stored for the container"""
+        return sorted(
+            offset for (offset,) in self._db.execute(
+                "SELECT offset FROM functions "
+                "WHERE container = ? AND version = ?",
+                self._container_key
+            )
+        )
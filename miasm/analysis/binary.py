@@ -1,3 +1,4 @@
+import hashlib
 import logging
 import warnings
 
@@ -86,6 +87,7 @@ class Container(object):
         self._bin_stream = None
         self._entry_point = None
         self._arch = None
+        self._digest = None
         if loc_db is None:
             self._loc_db = LocationDB()
         else:
@@ -119,6 +121,18 @@ class Container(object):
         "LocationDB instance preloaded with container symbols (if any)"
         return self._loc_db
 
+    @property
+    def digest(self):
+        """Return the SHA-256 hex digest of the parsed binary, computed on
+        first access"""
+        if self._digest is None:
+            self._digest = hashlib.sha256(self._get_content()).hexdigest()
+        return self._digest
+
+    def _get_content(self):
+        "Return the bytes of the parsed binary, as held by the executable"
+        return bytes(self._executable.content)
+
     @property
     def symbol_pool(self):
         "[DEPRECATED API]"
@@ -218,6 +232,9 @@ class ContainerELF(Container):
 class ContainerUnknown(Container):
     "Container abstraction for unknown format"
 
+    def _get_content(self):
+        return bytes(self._bin_stream.bin)
+
     def parse(self, data, vm=None, addr=0, **kwargs):
         self._bin_stream = bin_stream_str(data, base_address=addr)
         if vm is not None:
@@ -16,6 +16,177 @@ from miasm.analysis.ssa import get_phi_sources_parent_block, \
     irblock_has_phi
 from miasm.ir.symbexec import get_expr_base_offset
 from collections import deque
+from heapq import heappush, heappop
+
+
+class BitsetIndex(object):
+    """
+    Dense numbering of hashable elements, used to represent sets of those
+    elements as python integers (bit n set <=> element n in the set)
+    """
+
+    __slots__ = ["_index", "_elements"]
+
+    def __init__(self):
+        self._index = {}
+        self._elements = []
+
+    def __len__(self):
+        return len(self._elements)
+
+    def __contains__(self, element):
+        return element in self._index
+
+    def get_bit(self, element):
+        """Return the bit number of @element, allocating it if needed"""
+        bit = self._index.get(element, None)
+        if bit is None:
+            bit = len(self._elements)
+            self._index[element] = bit
+            self._elements.append(element)
+        return bit
+
+    def to_bits(self, elements):
+        """Return the bitset representing the iterable @elements"""
+        bits = 0
+        for element in elements:
+            bits |= 1 << self.get_bit(element)
+        return bits
+
+    def iter_elements(self, bits):
+        """Iterate on the elements of the bitset @bits"""
+        elements = self._elements
+        while bits:
+            low = bits & -bits
+            yield elements[low.bit_length() - 1]
+            bits ^= low
+
+    def to_set(self, bits):
+        """Return the set of elements of the bitset @bits"""
+        return set(self.iter_elements(bits))
+
+
+class BitsetDataFlow(object):
+    """
+    Generic worklist solver for gen/kill data flow problems on a DiGraph.
+    States are bitsets (see BitsetIndex), the transfer function of a node is
+        out = gen | (in & ~kill)
+    and the confluence operator is the union.
+
+    Nodes are processed in reverse postorder (or postorder for backward
+    problems), which usually reaches the fix point in a few iterations.
+
+    Subclasses must implement get_gen_kill; in / out are understood in the
+    analysis direction (for a backward analysis, the "in" state of a node is
+    the state at its end).
+    """
+
+    # True for forward analysis, False for backward
+    forward = True
+
+    def __init__(self, graph, nodes=None):
+        """
+        @graph: DiGraph instance
+        @nodes: (optional) nodes of @graph to analyse; edges to other nodes
+        are ignored
+        """
+        self.graph = graph
+        if nodes is None:
+            nodes = graph.nodes()
+        self.nodes = set(nodes)
+        self.state_in = {}
+        self.state_out = {}
+
+    def get_gen_kill(self, node):
+        """Return the (gen, kill) bitsets of @node"""
+        raise NotImplementedError("Abstract method")
+
+    def get_boundary(self, node):
+        """Return the bitset always merged in the "in" state of @node"""
+        return 0
+
+    def filter_edge(self, src, dst, bits):
+        """Return the state @bits flowing from @src to @dst (@src and @dst are
+        given in the analysis direction)"""
+        return bits
+
+    def _next_nodes(self, node):
+        if self.forward:
+            return self.graph.successors_iter(node)
+        return self.graph.predecessors_iter(node)
+
+    def _prev_nodes(self, node):
+        if self.forward:
+            return self.graph.predecessors_iter(node)
+        return self.graph.successors_iter(node)
+
+    def get_order(self):
+        """Return the nodes in reverse postorder of the analysis direction.
+        Nodes which cannot be reached from an entry node are appended at the
+        end"""
+        nodes = self.nodes
+        done = set()
+        postorder = []
+        entries = [
+            node for node in nodes
+            if not any(prev in nodes for prev in self._prev_nodes(node))
+        ]
+        for entry in entries + list(nodes):
+            if entry in done:
+                continue
+            done.add(entry)
+            stack = [(entry, iter(self._next_nodes(entry)))]
+            while stack:
+                node, next_nodes = stack[-1]
+                for next_node in next_nodes:
+                    if next_node in nodes and next_node not in done:
+                        done.add(next_node)
+                        stack.append(
+                            (next_node, iter(self._next_nodes(next_node)))
+                        )
+                        break
+                else:
+                    stack.pop()
+                    postorder.append(node)
+        postorder.reverse()
+        return postorder
+
+    def solve(self):
+        """Compute the fix point. Results are in self.state_in and
+        self.state_out ({node: bitset})"""
+        order = self.get_order()
+        node_to_rank = {node: rank for rank, node in enumerate(order)}
+        gen_kill = {node: self.get_gen_kill(node) for node in order}
+        state_in, state_out = self.state_in, self.state_out
+        for node in order:
+            state_in[node] = 0
+            state_out[node] = None
+
+        todo = list(range(len(order)))
+        in_todo = set(todo)
+        nodes = self.nodes
+        while todo:
+            rank = heappop(todo)
+            in_todo.remove(rank)
+            node = order[rank]
+            bits = self.get_boundary(node)
+            for prev in self._prev_nodes(node):
+                if prev not in nodes or state_out[prev] is None:
+                    continue
+                bits |= self.filter_edge(prev, node, state_out[prev])
+            state_in[node] = bits
+            gen, kill = gen_kill[node]
+            bits = gen | (bits & ~kill)
+            if bits == state_out[node]:
+                continue
+            state_out[node] = bits
+            for next_node in self._next_nodes(node):
+                next_rank = node_to_rank.get(next_node, None)
+                if next_rank is None or next_rank in in_todo:
+                    continue
+                in_todo.add(next_rank)
+                heappush(todo, next_rank)
+
 
 class ReachingDefinitions(dict):
     """
@@ -58,33 +229,17 @@ class ReachingDefinitions(dict):
 
     def compute(self):
         """This is the main fixpoint"""
-        modified = True
-        while modified:
-            modified = False
-            for block in viewvalues(self.ircfg.blocks):
-                modified |= self.process_block(block)
-
-    def process_block(self, block):
-        """
-        Fetch reach definitions from predecessors and propagate it to
-        the assignblk in block @block.
-        """
-        predecessor_state = {}
-        for pred_lbl in self.ircfg.predecessors(block.loc_key):
-            if pred_lbl not in self.ircfg.blocks:
-                continue
-            pred = self.ircfg.blocks[pred_lbl]
-            for lval, definitions in viewitems(self.get_definitions(pred_lbl, len(pred))):
-                predecessor_state.setdefault(lval, set()).update(definitions)
-
-        modified = self.get((block.loc_key, 0)) != predecessor_state
-        if not modified:
-            return False
-        self[(block.loc_key, 0)] = predecessor_state
-
-        for index in range(len(block)):
-            modified |= self.process_assignblock(block, index)
-        return modified
+        solver = ReachingDefinitionsFlow(self.ircfg)
+        solver.solve()
+        for block in viewvalues(self.ircfg.blocks):
+            predecessor_state = {}
+            for loc_key, index, lval in solver.sites.iter_elements(
+                    solver.state_in[block.loc_key]
+            ):
+                predecessor_state.setdefault(lval, set()).add((loc_key, index))
+            self[(block.loc_key, 0)] = predecessor_state
+            for index in range(len(block)):
+                self.process_assignblock(block, index)
 
     def process_assignblock(self, block, assignblk_index):
         """
@@ -105,6 +260,36 @@ class ReachingDefinitions(dict):
 
         return modified
 
+class ReachingDefinitionsFlow(BitsetDataFlow):
+    """
+    Reaching definitions at the IRBlock level. Definition sites are
+    (loc_key, assignblk index, lvalue) triplets.
+    """
+
+    def __init__(self, ircfg):
+        super(ReachingDefinitionsFlow, self).__init__(ircfg, ircfg.blocks)
+        self.ircfg = ircfg
+        self.sites = BitsetIndex()
+        # lvalue -> bitset of all its definition sites
+        self.lval_sites = {}
+        for block in viewvalues(ircfg.blocks):
+            for index, assignblk in enumerate(block):
+                for lval in assignblk:
+                    bit = 1 << self.sites.get_bit((block.loc_key, index, lval))
+                    self.lval_sites[lval] = self.lval_sites.get(lval, 0) | bit
+
+    def get_gen_kill(self, node):
+        gen, kill = 0, 0
+        sites, lval_sites = self.sites, self.lval_sites
+        for index, assignblk in enumerate(self.ircfg.blocks[node]):
+            for lval in assignblk:
+                gen &= ~lval_sites[lval]
+                kill |= lval_sites[lval]
+            for lval in assignblk:
+                gen |= 1 << sites.get_bit((node, index, lval))
+        return gen, kill
+
+
 ATTR_DEP = {"color" : "black",
             "_type" : "data"}
 
@@ -355,10 +540,16 @@ class DeadRemoval(object):
 
 
 
-        # Useful nodes dependencies
-        for node in useful:
-            for parent in defuse.reachable_parents(node):
-                yield parent
+        # Useful nodes dependencies, walked once for all the useful nodes
+        todo = list(useful)
+        done = set()
+        while todo:
+            node = todo.pop()
+            if node in done:
+                continue
+            done.add(node)
+            yield node
+            todo += defuse.predecessors_iter(node)
 
     def do_dead_removal(self, ircfg):
         """
@@ -1136,56 +1327,64 @@ class DiGraphLiveness(DiGraph):
             )
             yield self.DotCellDescription(text="", attr={})
 
-    def back_propagate_compute(self, block):
+    def filter_edge(self, node, parent, bits, variables):
         """
-        Compute the liveness information in the @block.
-        @block: AssignBlockLivenessInfos instance
+        Return the liveness information @bits (live variables at the
+        beginning of @node) propagated to the end of @parent.
+        @variables: BitsetIndex of the variables
         """
-        infos = block.infos
-        modified = False
-        for i in reversed(range(len(infos))):
-            new_vars = set(infos[i].gen.union(infos[i].var_out.difference(infos[i].kill)))
-            if infos[i].var_in != new_vars:
-                modified = True
-                infos[i].var_in = new_vars
-            if i > 0 and infos[i - 1].var_out != set(infos[i].var_in):
-                modified = True
-                infos[i - 1].var_out = set(infos[i].var_in)
-        return modified
-
-    def back_propagate_to_parent(self, todo, node, parent):
-        """
-        Back propagate the liveness information from @node to @parent.
-        @node: loc_key of the source node
-        @parent: loc_key of the node to update
-        """
-        parent_block = self.blocks[parent]
-        cur_block = self.blocks[node]
-        if cur_block.infos[0].var_in == parent_block.infos[-1].var_out:
-            return
-        var_info = cur_block.infos[0].var_in.union(parent_block.infos[-1].var_out)
-        parent_block.infos[-1].var_out = var_info
-        todo.add(parent)
+        return bits
 
     def compute_liveness(self):
         """
-        Compute the liveness information for the digraph.
+        Compute the liveness information for the digraph. The var_out of the
+        last assignblocks (see init_var_info) are kept as live variables.
         """
-        todo = set(self.leaves())
-        while todo:
-            node = todo.pop()
-            cur_block = self.blocks.get(node, None)
-            if cur_block is None:
-                continue
-            modified = self.back_propagate_compute(cur_block)
-            if not modified:
-                continue
-            # We modified parent in, propagate to parents
-            for pred in self.predecessors(node):
-                self.back_propagate_to_parent(todo, node, pred)
+        solver = LivenessFlow(self)
+        solver.solve()
+        variables = solver.variables
+        for node, block in viewitems(self.blocks):
+            bits = solver.state_in[node]
+            for info in reversed(block.infos):
+                info.var_out = variables.to_set(bits)
+                bits = variables.to_bits(info.gen) | (
+                    bits & ~variables.to_bits(info.kill)
+                )
+                info.var_in = variables.to_set(bits)
         return True
 
 
+class LivenessFlow(BitsetDataFlow):
+    """
+    Backward liveness analysis at the IRBlock level of a DiGraphLiveness
+    """
+
+    forward = False
+
+    def __init__(self, liveness):
+        super(LivenessFlow, self).__init__(liveness, liveness.blocks)
+        self.liveness = liveness
+        self.variables = BitsetIndex()
+
+    def get_gen_kill(self, node):
+        gen, kill = 0, 0
+        variables = self.variables
+        for info in reversed(self.liveness.blocks[node].infos):
+            info_kill = variables.to_bits(info.kill)
+            gen = variables.to_bits(info.gen) | (gen & ~info_kill)
+            kill |= info_kill
+        return gen, kill
+
+    def get_boundary(self, node):
+        infos = self.liveness.blocks[node].infos
+        if not infos:
+            return 0
+        return self.variables.to_bits(infos[-1].var_out)
+
+    def filter_edge(self, src, dst, bits):
+        return self.liveness.filter_edge(src, dst, bits, self.variables)
+
+
 class DiGraphLivenessIRA(DiGraphLiveness):
     """
     DiGraph representing variable liveness for IRA
@@ -1392,30 +1591,17 @@ class DiGraphLivenessSSA(DiGraphLivenessIRA):
                     out.setdefault(var, set()).update(var_parents)
             self.loc_key_to_phi_parents[irblock.loc_key] = out
 
-    def back_propagate_to_parent(self, todo, node, parent):
-        if parent not in self.blocks:
-            return
-        parent_block = self.blocks[parent]
-        cur_block = self.blocks[node]
-        irblock = self.ircfg.blocks[node]
-        if cur_block.infos[0].var_in == parent_block.infos[-1].var_out:
-            return
-        var_info = cur_block.infos[0].var_in.union(parent_block.infos[-1].var_out)
-
-        if irblock_has_phi(irblock):
-            # Remove phi special case
-            out = set()
-            phi_sources = self.loc_key_to_phi_parents[irblock.loc_key]
-            for var in var_info:
-                if var not in phi_sources:
-                    out.add(var)
-                    continue
-                if parent in phi_sources[var]:
-                    out.add(var)
-            var_info = out
-
-        parent_block.infos[-1].var_out = var_info
-        todo.add(parent)
+    def filter_edge(self, node, parent, bits, variables):
+        phi_sources = self.loc_key_to_phi_parents.get(node, None)
+        if phi_sources is None:
+            return bits
+        # Remove phi special case: phi sources are only live in the parent
+        # they come from
+        mask = 0
+        for var, var_parents in viewitems(phi_sources):
+            if parent not in var_parents:
+                mask |= 1 << variables.get_bit(var)
+        return bits & ~mask
 
 
 def get_phi_sources(phi_src, phi_dsts, ids_to_src):
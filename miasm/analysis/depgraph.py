@@ -201,6 +201,79 @@ class DependencyState(object):
             future_pending.setdefault(dependency.element, set()).add(depnode)
 
 
+class DependencySummaryState(DependencyState):
+
+    """
+    DependencyState used to compute the dependency transfer of a block,
+    independently of the incoming pending dependencies. Each pending element
+    initially depends on itself (the element stands for its incoming
+    dependencies), and calls to link_element are recorded in element_links.
+    """
+
+    def __init__(self, loc_key, pending_elements, line_nb=None):
+        super(DependencySummaryState, self).__init__(
+            loc_key,
+            {element: set([element]) for element in pending_elements},
+            line_nb
+        )
+        self.element_links = []
+
+    def link_element(self, element, line_nb):
+        depnode = DependencyNode(self.loc_key, element, line_nb)
+        self.element_links.append((depnode, frozenset(self.pending[element])))
+
+
+class BlockSummary(object):
+
+    """
+    Dependency transfer of an IRBlock (up to a line) for a given set of
+    pending elements
+    """
+
+    __slots__ = ["irblock", "element_links", "links", "pending"]
+
+    def __init__(self, irblock, state):
+        """
+        @irblock: the summarized IRBlock
+        @state: DependencySummaryState instance, after the block computation
+        """
+        self.irblock = irblock
+        self.element_links = state.element_links
+        self.links = frozenset(state.links)
+        self.pending = {
+            element: frozenset(sons)
+            for element, sons in viewitems(state.pending)
+        }
+
+    @staticmethod
+    def _expand(sons, pending):
+        """Replace incoming elements in @sons by their @pending dependencies"""
+        out = set()
+        for son in sons:
+            if isinstance(son, DependencyNode):
+                out.add(son)
+            else:
+                out.update(pending[son])
+        return out
+
+    def apply(self, state):
+        """Apply the summarized transfer to the DependencyState @state"""
+        pending = state.pending
+        for depnode, sons in self.element_links:
+            sons = self._expand(sons, pending)
+            if not sons:
+                # Create start node
+                state.links.add((depnode, None))
+            else:
+                for node_son in sons:
+                    state.links.add((depnode, node_son))
+        state.links.update(self.links)
+        state.pending = {
+            element: self._expand(sons, pending)
+            for element, sons in viewitems(self.pending)
+        }
+
+
 class DependencyResult(DependencyState):
 
     """Container and methods for DependencyGraph results"""
@@ -527,6 +600,11 @@ class DependencyGraph(object):
             self._cb_follow.append(self._follow_simp_expr)
         self._cb_follow.append(lambda exprs: self.do_follow(exprs, follow_mem, follow_call))
 
+        # Caches shared by queries: src expression -> FollowExpr set and
+        # (loc_key, line_nb, pending elements) -> BlockSummary
+        self._follow_cache = {}
+        self._summaries = {}
+
     @staticmethod
     def do_follow(exprs, follow_mem, follow_call):
         visitor = FilterExprSources(follow_mem, follow_call)
@@ -547,6 +625,13 @@ class DependencyGraph(object):
     def _follow_apply_cb(self, expr):
         """Apply callback functions to @expr
         @expr : FollowExpr instance"""
+        out = self._follow_cache.get(expr, None)
+        if out is None:
+            out = self._follow_apply_cb_uncached(expr)
+            self._follow_cache[expr] = out
+        return out
+
+    def _follow_apply_cb_uncached(self, expr):
         follow = set([expr])
         nofollow = set()
 
@@ -591,34 +676,48 @@ class DependencyGraph(object):
         for cur_line_nb, assignblk in reversed(list(enumerate(irb[:line_nb]))):
             self._track_exprs(state, assignblk, cur_line_nb)
 
-    def get(self, loc_key, elements, line_nb, heads):
-        """Compute the dependencies of @elements at line number @line_nb in
-        the block named @loc_key in the current IRCFG, before the execution of
-        this line. Dependency check stop if one of @heads is reached
-        @loc_key: LocKey instance
-        @element: set of Expr instances
-        @line_nb: int
+    def _get_summary(self, state):
+        """Return the BlockSummary of the block of @state for its pending
+        elements, computing it if needed
+        @state: instance of DependencyState"""
+        irb = self._ircfg.blocks[state.loc_key]
+        key = (state.loc_key, state.line_nb, frozenset(state.pending))
+        summary = self._summaries.get(key, None)
+        if summary is not None and summary.irblock is irb:
+            return summary
+        summary_state = DependencySummaryState(state.loc_key, state.pending,
+                                               state.line_nb)
+        self._compute_intrablock(summary_state)
+        summary = BlockSummary(irb, summary_state)
+        self._summaries[key] = summary
+        return summary
+
+    def _compute_state(self, state):
+        """Follow dependencies tracked in @state in the current irbloc, using
+        the cached block summaries
+        @state: instance of DependencyState"""
+        self._get_summary(state).apply(state)
+
+    def _walk_states(self, initial_states, heads):
+        """Walk the dependencies of the @initial_states in a single worklist.
+        Yield (index of the initial state, final state) couples
+        @initial_states: list of DependencyState instances
         @heads: set of LocKey instances
-        Return an iterator on DiGraph(DependencyNode)
         """
-        # Init the algorithm
-        inputs = {element: set() for element in elements}
-        initial_state = DependencyState(loc_key, inputs, line_nb)
-        todo = set([initial_state])
+        todo = set(enumerate(initial_states))
         done = set()
-        dpResultcls = DependencyResultImplicit if self._implicit else DependencyResult
 
         while todo:
-            state = todo.pop()
-            self._compute_intrablock(state)
-            done_state = state.get_done_state()
+            index, state = todo.pop()
+            self._compute_state(state)
+            done_state = (index, state.get_done_state())
             if done_state in done:
                 continue
             done.add(done_state)
             if (not state.pending or
                     state.loc_key in heads or
                     not self._ircfg.predecessors(state.loc_key)):
-                yield dpResultcls(self._ircfg, initial_state, state, elements)
+                yield index, state
                 if not state.pending:
                     continue
 
@@ -628,7 +727,48 @@ class DependencyGraph(object):
 
             # Propagate state to parents
             for pred in self._ircfg.predecessors_iter(state.loc_key):
-                todo.add(state.extend(pred))
+                todo.add((index, state.extend(pred)))
+
+    def get(self, loc_key, elements, line_nb, heads):
+        """Compute the dependencies of @elements at line number @line_nb in
+        the block named @loc_key in the current IRCFG, before the execution of
+        this line. Dependency check stop if one of @heads is reached
+        @loc_key: LocKey instance
+        @element: set of Expr instances
+        @line_nb: int
+        @heads: set of LocKey instances
+        Return an iterator on DiGraph(DependencyNode)
+        """
+        # Init the algorithm
+        inputs = {element: set() for element in elements}
+        initial_state = DependencyState(loc_key, inputs, line_nb)
+        dpResultcls = DependencyResultImplicit if self._implicit else DependencyResult
+
+        for _, state in self._walk_states([initial_state], heads):
+            yield dpResultcls(self._ircfg, initial_state, state, elements)
+
+    def get_batch(self, queries, heads):
+        """Compute the dependencies of several queries in one traversal,
+        sharing the block computations between them.
+        @queries: list of (loc_key, elements, line_nb), see get()
+        @heads: set of LocKey instances
+        Return a list containing, for each query, the list of its
+        DependencyResult
+        """
+        dpResultcls = DependencyResultImplicit if self._implicit else DependencyResult
+        initial_states = []
+        for loc_key, elements, line_nb in queries:
+            inputs = {element: set() for element in elements}
+            initial_states.append(DependencyState(loc_key, inputs, line_nb))
+
+        results = [[] for _ in queries]
+        for index, state in self._walk_states(initial_states, heads):
+            _, elements, _ = queries[index]
+            results[index].append(
+                dpResultcls(self._ircfg, initial_states[index], state,
+                            elements)
+            )
+        return results
 
     def get_from_depnodes(self, depnodes, heads):
         """Alias for the get() method. Use the attributes of @depnodes as
@@ -1,26 +1,67 @@
 #-*- coding:utf-8 -*-
 
 from __future__ import print_function
-from future.builtins import map, range
+from future.builtins import range
 
 from miasm.core.utils import decode_hex, encode_hex, int_to_byte
 
+import select
 import socket
 import struct
-import time
 import logging
-from io import BytesIO
 import miasm.analysis.debugging as debugging
 from miasm.jitter.jitload import ExceptionHandle
 
 
+# Bytes which must be escaped in binary packets data
+ESCAPED_BYTES = b"#$}*"
+
+
+def escape_binary(data):
+    "Escape @data to be sent in a binary packet"
+    out = bytearray()
+    for byte in bytearray(data):
+        if byte in bytearray(ESCAPED_BYTES):
+            out += bytearray([0x7d, byte ^ 0x20])
+        else:
+            out.append(byte)
+    return bytes(out)
+
+
+def unescape_binary(data):
+    "Unescape the content @data of a binary packet"
+    out = bytearray()
+    escaped = False
+    for byte in bytearray(data):
+        if escaped:
+            out.append(byte ^ 0x20)
+            escaped = False
+        elif byte == 0x7d:
+            escaped = True
+        else:
+            out.append(byte)
+    return bytes(out)
+
+
 class GdbServer(object):
 
-    "Debugguer binding for GDBServer protocol"
+    """Debugguer binding for GDBServer protocol
+
+    The server is not blocking: the socket is polled between runs of the
+    emulation, so that the emulation keeps running on a 'continue' until a
+    breakpoint is reached or the client interrupts it.
+    """
 
     general_registers_order = []
     general_registers_size = {}  # RegName : Size in octet
     status = b"S05"
+    # Target description returned through qXfer:features:read (None if
+    # unsupported)
+    target_xml = None
+    # Maximum size of a packet
+    packet_size = 0x4000
+    # Number of emulated blocks between two polls of the socket when running
+    run_slice = 0x1000
 
     def __init__(self, dbg, port=4455):
         server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -29,61 +70,103 @@ class GdbServer(object):
         server.listen(1)
         self.server = server
         self.dbg = dbg
+        self.sock = None
+        self.running = False
+        self.recv_buffer = b""
+        self.recv_queue = []
+        self.send_queue = []
+        self.last_packet = None
 
     # Communication methods
 
     def compute_checksum(self, data):
-        return encode_hex(int_to_byte(sum(map(ord, data)) % 256))
-
-    def get_messages(self):
-        all_data = b""
-        while True:
-            data = self.sock.recv(4096)
-            if not data:
-                break
-            all_data += data
-
-        logging.debug("<- %r", all_data)
-        self.recv_queue += self.parse_messages(all_data)
+        return encode_hex(int_to_byte(sum(bytearray(data)) % 256))
+
+    def get_messages(self, timeout=None):
+        """Receive the available data, waiting at most @timeout seconds (None
+        to block) and queue the complete packets"""
+        readable, _, _ = select.select([self.sock], [], [], timeout)
+        if not readable:
+            return
+        data = self.sock.recv(self.packet_size)
+        if not data:
+            # Connection closed by the client
+            self.sock.close()
+            self.sock = None
+            return
+        logging.debug("<- %r", data)
+        self.recv_queue += self.parse_messages(data)
 
     def parse_messages(self, data):
-        buf = BytesIO(data)
+        """Parse @data, appended to the bytes left over by the previous call,
+        and return the complete packets it contains.
+        A b"\x03" message stands for an interruption request"""
+        buf = self.recv_buffer + data
         msgs = []
-
-        while (buf.tell() < buf.len):
-            token = buf.read(1)
+        index = 0
+        while index < len(buf):
+            token = buf[index:index + 1]
             if token == b"+":
-                continue
-            if token == b"-":
-                raise NotImplementedError("Resend packet")
-            if token == b"$":
-                packet_data = b""
-                c = buf.read(1)
-                while c != b"#":
-                    packet_data += c
-                    c = buf.read(1)
-                checksum = buf.read(2)
+                index += 1
+            elif token == b"-":
+                # Resend last packet
+                if self.last_packet is not None:
+                    self.send_queue.append(self.last_packet)
+                index += 1
+            elif token == b"\x03":
+                msgs.append(token)
+                index += 1
+            elif token == b"$":
+                end = buf.find(b"#", index)
+                if end == -1 or end + 3 > len(buf):
+                    # Incomplete packet
+                    break
+                packet_data = buf[index + 1:end]
+                checksum = buf[end + 1:end + 3]
                 if checksum != self.compute_checksum(packet_data):
                     raise ValueError("Incorrect checksum")
                 msgs.append(packet_data)
-
+                index = end + 3
+            else:
+                # Garbage between packets
+                index += 1
+        self.recv_buffer = buf[index:]
         return msgs
 
     def send_string(self, s):
         self.send_queue.append(b"O" + encode_hex(s))
 
+    @staticmethod
+    def parse_addr_size(data):
+        "Parse 'addr,size' from @data"
+        return tuple(int(x, 16) for x in data.split(b",", 1))
+
     def process_messages(self):
 
         while self.recv_queue:
             msg = self.recv_queue.pop(0)
-            buf = BytesIO(msg)
-            msg_type = buf.read(1)
+
+            if msg == b"\x03":
+                # Interrupt
+                if self.running:
+                    self.running = False
+                    self.status = b"S02"
+                    self.send_queue.append(self.status)  # INT signal
+                continue
+
+            msg_type = msg[:1]
+            payload = msg[1:]
 
             self.send_queue.append(b"+")
 
             if msg_type == b"q":
                 if msg.startswith(b"qSupported"):
-                    self.send_queue.append(b"PacketSize=3fff")
+                    features = [b"PacketSize=%x" % self.packet_size]
+                    if self.target_xml is not None:
+                        features.append(b"qXfer:features:read+")
+                    self.send_queue.append(b";".join(features))
+                elif msg.startswith(b"qXfer:"):
+                    self.send_queue.append(self.xfer(msg))
                 elif msg.startswith(b"qC"):
                     # Current thread
                     self.send_queue.append(b"")
@@ -113,12 +196,12 @@ class GdbServer(object):
 
             elif msg_type == b"p":
                 # Read a specific register
-                reg_num = int(buf.read(), 16)
+                reg_num = int(payload, 16)
                 self.send_queue.append(self.read_register(reg_num))
 
             elif msg_type == b"P":
                 # Set a specific register
-                reg_num, value = buf.read().split(b"=")
+                reg_num, value = payload.split(b"=")
                 reg_num = int(reg_num, 16)
                 value = int(encode_hex(decode_hex(value)[::-1]), 16)
                 self.set_register(reg_num, value)
@@ -126,14 +209,31 @@ class GdbServer(object):
 
             elif msg_type == b"m":
                 # Read memory
-                addr, size = (int(x, 16) for x in buf.read().split(b",", 1))
+                addr, size = self.parse_addr_size(payload)
                 self.send_queue.append(self.read_memory(addr, size))
 
+            elif msg_type == b"M":
+                # Write memory (hex encoded)
+                addr_size, data = payload.split(b":", 1)
+                addr, size = self.parse_addr_size(addr_size)
+                self.send_queue.append(
+                    self.write_memory(addr, decode_hex(data)[:size])
+                )
+
+            elif msg_type == b"X":
+                # Write memory (binary)
+                addr_size, data = payload.split(b":", 1)
+                addr, size = self.parse_addr_size(addr_size)
+                self.send_queue.append(
+                    self.write_memory(addr, unescape_binary(data)[:size])
+                )
+
             elif msg_type == b"k":
                 # Kill
                 self.sock.close()
                 self.send_queue = []
                 self.sock = None
+                self.running = False
 
             elif msg_type == b"!":
                 # Extending debugging will be used
@@ -151,11 +251,11 @@ class GdbServer(object):
 
             elif msg_type == b"Z":
                 # Add breakpoint or watchpoint
-                bp_type = buf.read(1)
+                bp_type = payload[:1]
                 if bp_type == b"0":
                     # Exec breakpoint
-                    assert(buf.read(1) == b",")
-                    addr, size = (int(x, 16) for x in buf.read().split(b",", 1))
+                    assert(payload[1:2] == b",")
+                    addr, size = self.parse_addr_size(payload[2:])
 
                     if size != 1:
                         raise NotImplementedError("Bigger size")
@@ -164,8 +264,8 @@ class GdbServer(object):
 
                 elif bp_type == b"1":
                     # Hardware BP
-                    assert(buf.read(1) == b",")
-                    addr, size = (int(x, 16) for x in buf.read().split(b",", 1))
+                    assert(payload[1:2] == b",")
+                    addr, size = self.parse_addr_size(payload[2:])
 
                     self.dbg.add_memory_breakpoint(
                         addr,
@@ -177,10 +277,10 @@ class GdbServer(object):
 
                 elif bp_type in [b"2", b"3", b"4"]:
                     # Memory breakpoint
-                    assert(buf.read(1) == b",")
+                    assert(payload[1:2] == b",")
                     read = bp_type in [b"3", b"4"]
                     write = bp_type in [b"2", b"4"]
-                    addr, size = (int(x, 16) for x in buf.read().split(b",", 1))
+                    addr, size = self.parse_addr_size(payload[2:])
 
                     self.dbg.add_memory_breakpoint(
                         addr,
@@ -195,11 +295,11 @@ class GdbServer(object):
 
             elif msg_type == b"z":
                 # Remove breakpoint or watchpoint
-                bp_type = buf.read(1)
+                bp_type = payload[:1]
                 if bp_type == b"0":
                     # Exec breakpoint
-                    assert(buf.read(1) == b",")
-                    addr, size = (int(x, 16) for x in buf.read().split(b",", 1))
+                    assert(payload[1:2] == b",")
+                    addr, size = self.parse_addr_size(payload[2:])
 
                     if size != 1:
                         raise NotImplementedError("Bigger size")
@@ -210,8 +310,8 @@ class GdbServer(object):
 
                 elif bp_type == b"1":
                     # Hardware BP
-                    assert(buf.read(1) == b",")
-                    addr, size = (int(x, 16) for x in buf.read().split(b",", 1))
+                    assert(payload[1:2] == b",")
+                    addr, size = self.parse_addr_size(payload[2:])
                     self.dbg.remove_memory_breakpoint_by_addr_access(
                         addr,
                         read=True,
@@ -221,10 +321,10 @@ class GdbServer(object):
 
                 elif bp_type in [b"2", b"3", b"4"]:
                     # Memory breakpoint
-                    assert(buf.read(1) == b",")
+                    assert(payload[1:2] == b",")
                     read = bp_type in [b"3", b"4"]
                     write = bp_type in [b"2", b"4"]
-                    addr, size = (int(x, 16) for x in buf.read().split(b",", 1))
+                    addr, size = self.parse_addr_size(payload[2:])
 
                     self.dbg.remove_memory_breakpoint_by_addr_access(
                         addr,
@@ -237,42 +337,63 @@ class GdbServer(object):
                     raise ValueError("Impossible value")
 
             elif msg_type == b"c":
-                # Continue
+                # Continue: the emulation is run by slices in the main loop,
+                # the stop reply is sent once it stops
                 self.status = b""
-                self.send_messages()
-                ret = self.dbg.run()
-                if isinstance(ret, debugging.DebugBreakpointSoft):
-                    self.status = b"S05"
-                    self.send_queue.append(b"S05")  # TRAP signal
-                elif isinstance(ret, ExceptionHandle):
-                    if ret == ExceptionHandle.memoryBreakpoint():
-                        self.status = b"S05"
-                        self.send_queue.append(b"S05")
-                    else:
-                        raise NotImplementedError("Unknown Except")
-                elif isinstance(ret, debugging.DebugBreakpointTerminate):
-                    # Connection should close, but keep it running as a TRAP
-                    # The connection will be close on instance destruction
-                    print(ret)
-                    self.status = b"S05"
-                    self.send_queue.append(b"S05")
-                else:
-                    raise NotImplementedError()
+                self.running = True
 
             else:
                 raise NotImplementedError(
                     "Not implemented: message type %r" % msg_type
                 )
 
+    def run_emulation(self):
+        """Run the emulation for at most @run_slice blocks
+        If it stops, queue the corresponding stop reply"""
+        jitter = self.dbg.myjit
+        max_exec = jitter.jit.options["max_exec_per_call"]
+        jitter.jit.set_options(max_exec_per_call=self.run_slice)
+        try:
+            ret = jitter.continue_run(step=True)
+        finally:
+            jitter.jit.set_options(max_exec_per_call=max_exec)
+        if ret is None and jitter.run:
+            # Still running
+            return
+        ret = self.dbg.handle_exception(ret)
+
+        self.running = False
+        if isinstance(ret, debugging.DebugBreakpointSoft):
+            self.status = b"S05"
+            self.send_queue.append(b"S05")  # TRAP signal
+        elif isinstance(ret, ExceptionHandle):
+            if ret == ExceptionHandle.memoryBreakpoint():
+                self.status = b"S05"
+                self.send_queue.append(b"S05")
+            else:
+                raise NotImplementedError("Unknown Except")
+        elif isinstance(ret, debugging.DebugBreakpointTerminate):
+            # Connection should close, but keep it running as a TRAP
+            # The connection will be close on instance destruction
+            print(ret)
+            self.status = b"S05"
+            self.send_queue.append(b"S05")
+        else:
+            raise NotImplementedError()
+
     def send_messages(self):
+        out = []
         for msg in self.send_queue:
             if msg == b"+":
                 data = b"+"
             else:
                 data = b"$%s#%s" % (msg, self.compute_checksum(msg))
+                self.last_packet = msg
             logging.debug("-> %r", data)
-            self.sock.send(data)
+            out.append(data)
         self.send_queue = []
+        if out and self.sock is not None:
+            self.sock.sendall(b"".join(out))
 
     def main_loop(self):
         self.recv_queue = []
@@ -281,39 +402,80 @@ class GdbServer(object):
         self.send_string(b"Test\n")
 
         while (self.sock):
-            self.get_messages()
-            self.process_messages()
             self.send_messages()
+            # Only poll the socket while the emulation is running
+            self.get_messages(0 if self.running else None)
+            self.process_messages()
+            if self.running:
+                self.send_messages()
+                self.run_emulation()
 
     def run(self):
         self.sock, self.address = self.server.accept()
         self.main_loop()
 
     # Debugguer processing methods
-    def report_general_register_values(self):
-        s = b""
-        for i in range(len(self.general_registers_order)):
-            s += self.read_register(i)
-        return s
 
-    def read_register(self, reg_num):
-        reg_name = self.general_registers_order[reg_num]
-        reg_value = self.read_register_by_name(reg_name)
-        size = self.general_registers_size[reg_name]
+    def xfer(self, msg):
+        """Answer the qXfer:object:read:annex:offset,length request @msg"""
+        fields = msg.split(b":", 4)
+        if len(fields) != 5 or fields[2] != b"read":
+            return b""
+        _, obj, _, annex, offset_length = fields
+        data = self.xfer_read(obj, annex)
+        if data is None:
+            return b"E00"
+        offset, length = self.parse_addr_size(offset_length)
+        chunk = data[offset:offset + length]
+        if offset + length < len(data):
+            return b"m" + escape_binary(chunk)
+        return b"l" + escape_binary(chunk)
+
+    def xfer_read(self, obj, annex):
+        """Return the content of the qXfer object @obj/@annex, or None if
+        unsupported"""
+        if (obj == b"features" and annex == b"target.xml" and
+                self.target_xml is not None):
+            return self.target_xml
+        return None
+
+    def read_registers(self):
+        "Return the values of the general registers"
+        return [self.read_register_by_name(reg_name)
+                for reg_name in self.general_registers_order]
+
+    def get_registers_struct(self):
+        "Return the struct.Struct packing the general registers"
+        cls = self.__class__
+        if cls.__dict__.get("_registers_struct") is None:
+            cls._registers_struct = struct.Struct(
+                "<" + "".join(self.size2fmt(self.general_registers_size[name])
+                              for name in self.general_registers_order)
+            )
+        return cls._registers_struct
+
+    def report_general_register_values(self):
+        return encode_hex(
+            self.get_registers_struct().pack(*self.read_registers())
+        )
 
-        pack_token = ""
+    @staticmethod
+    def size2fmt(size):
         if size == 1:
-            pack_token = "<B"
+            return "B"
         elif size == 2:
-            pack_token = "<H"
+            return "H"
         elif size == 4:
-            pack_token = "<I"
+            return "I"
         elif size == 8:
-            pack_token = "<Q"
-        else:
-            raise NotImplementedError("Unknown size")
+            return "Q"
+        raise NotImplementedError("Unknown size")
 
-        return encode_hex(struct.pack(pack_token, reg_value))
+    def read_register(self, reg_num):
+        reg_name = self.general_registers_order[reg_num]
+        reg_value = self.read_register_by_name(reg_name)
+        size = self.general_registers_size[reg_name]
+        return encode_hex(struct.pack("<" + self.size2fmt(size), reg_value))
 
     def set_register(self, reg_num, value):
         reg_name = self.general_registers_order[reg_num]
@@ -330,11 +492,21 @@ class GdbServer(object):
             self.dbg.myjit.vm.set_exception(except_flag_vm)
             return b"00" * size
 
+    def write_memory(self, addr, data):
+        vm = self.dbg.myjit.vm
+        if not vm.is_mapped(addr, len(data)):
+            return b"E01"
+        vm.set_mem(addr, data)
+        return b"OK"
+
 
 class GdbServer_x86_32(GdbServer):
 
     "Extend GdbServer for x86 32bits purposes"
 
+    target_xml = (b'<?xml version="1.0"?>'
+                  b'<target><architecture>i386</architecture></target>')
+
     general_registers_order = [
         "EAX", "ECX", "EDX", "EBX", "ESP", "EBP", "ESI",
         "EDI", "EIP", "EFLAGS", "CS", "SS", "DS", "ES",
@@ -399,6 +571,9 @@ class GdbServer_msp430(GdbServer):
 
     "Extend GdbServer for msp430 purposes"
 
+    target_xml = (b'<?xml version="1.0"?>'
+                  b'<target><architecture>msp430</architecture></target>')
+
     general_registers_order = [
         "PC", "SP", "SR", "R3", "R4", "R5", "R6", "R7",
         "R8", "R9", "R10", "R11", "R12", "R13", "R14",
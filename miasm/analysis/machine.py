@@ -1,259 +1,138 @@
 #-*- coding:utf-8 -*-
 
+import sys
+
 
 class Machine(object):
-    """Abstract machine architecture to restrict architecture dependent code"""
+    """Abstract machine architecture to restrict architecture dependent code
 
-    __dis_engine = None   # Disassembly engine
-    __mn = None           # Machine instance
-    __ira = None          # IR analyser
-    __jitter = None       # Jit engine
-    __gdbserver = None    # GdbServer handler
+    Architecture modules are imported on first access to the corresponding
+    attribute, so that instantiating a Machine is cheap.
+    """
 
     __available = ["arml", "armb", "armtl", "armtb", "sh4", "x86_16", "x86_32",
                    "x86_64", "msp430", "mips32b", "mips32l",
                    "aarch64l", "aarch64b", "ppc32b", "mepl", "mepb"]
 
+    # Machine name -> (architecture package, mnemonic class name)
+    __archs = {
+        "arml": ("arm", "mn_arm"),
+        "armb": ("arm", "mn_arm"),
+        "armtl": ("arm", "mn_armt"),
+        "armtb": ("arm", "mn_armt"),
+        "sh4": ("sh4", "mn_sh4"),
+        "x86_16": ("x86", "mn_x86"),
+        "x86_32": ("x86", "mn_x86"),
+        "x86_64": ("x86", "mn_x86"),
+        "msp430": ("msp430", "mn_msp430"),
+        "mips32b": ("mips32", "mn_mips32"),
+        "mips32l": ("mips32", "mn_mips32"),
+        "aarch64l": ("aarch64", "mn_aarch64"),
+        "aarch64b": ("aarch64", "mn_aarch64"),
+        "ppc32b": ("ppc", "mn_ppc"),
+        "mepl": ("mep", "mn_mep"),
+        "mepb": ("mep", "mn_mep"),
+    }
+
+    # Machines only providing an architecture (no disassembler, IR, jitter)
+    __arch_only = ["sh4"]
+    # Machines without jitter
+    __no_jitter = ["sh4", "armtb"]
+    # Machine name -> GdbServer class name
+    __gdbservers = {
+        "x86_32": "GdbServer_x86_32",
+        "msp430": "GdbServer_msp430",
+    }
 
     def __init__(self, machine_name):
-
-        dis_engine = None
-        mn = None
-        ira = None
-        ir = None
-        jitter = None
-        gdbserver = None
-        jit = None
-        jitter = None
-        log_jit = None
-        log_arch = None
-
-        # Import on runtime for performance issue
-        if machine_name == "arml":
-            from miasm.arch.arm.disasm import dis_arml as dis_engine
-            from miasm.arch.arm import arch
-            try:
-                from miasm.arch.arm import jit
-                jitter = jit.jitter_arml
-            except ImportError:
-                pass
-            mn = arch.mn_arm
-            from miasm.arch.arm.ira import ir_a_arml as ira
-            from miasm.arch.arm.sem import ir_arml as ir
-        elif machine_name == "armb":
-            from miasm.arch.arm.disasm import dis_armb as dis_engine
-            from miasm.arch.arm import arch
-            try:
-                from miasm.arch.arm import jit
-                jitter = jit.jitter_armb
-            except ImportError:
-                pass
-            mn = arch.mn_arm
-            from miasm.arch.arm.ira import ir_a_armb as ira
-            from miasm.arch.arm.sem import ir_armb as ir
-        elif machine_name == "aarch64l":
-            from miasm.arch.aarch64.disasm import dis_aarch64l as dis_engine
-            from miasm.arch.aarch64 import arch
-            try:
-                from miasm.arch.aarch64 import jit
-                jitter = jit.jitter_aarch64l
-            except ImportError:
-                pass
-            mn = arch.mn_aarch64
-            from miasm.arch.aarch64.ira import ir_a_aarch64l as ira
-            from miasm.arch.aarch64.sem import ir_aarch64l as ir
-        elif machine_name == "aarch64b":
-            from miasm.arch.aarch64.disasm import dis_aarch64b as dis_engine
-            from miasm.arch.aarch64 import arch
-            try:
-                from miasm.arch.aarch64 import jit
-                jitter = jit.jitter_aarch64b
-            except ImportError:
-                pass
-            mn = arch.mn_aarch64
-            from miasm.arch.aarch64.ira import ir_a_aarch64b as ira
-            from miasm.arch.aarch64.sem import ir_aarch64b as ir
-        elif machine_name == "armtl":
-            from miasm.arch.arm.disasm import dis_armtl as dis_engine
-            from miasm.arch.arm import arch
-            mn = arch.mn_armt
-            from miasm.arch.arm.ira import ir_a_armtl as ira
-            from miasm.arch.arm.sem import ir_armtl as ir
-            try:
-                from miasm.arch.arm import jit
-                jitter = jit.jitter_armtl
-            except ImportError:
-                pass
-        elif machine_name == "armtb":
-            from miasm.arch.arm.disasm import dis_armtb as dis_engine
-            from miasm.arch.arm import arch
-            mn = arch.mn_armt
-            from miasm.arch.arm.ira import ir_a_armtb as ira
-            from miasm.arch.arm.sem import ir_armtb as ir
-        elif machine_name == "sh4":
-            from miasm.arch.sh4 import arch
-            mn = arch.mn_sh4
-        elif machine_name == "x86_16":
-            from miasm.arch.x86.disasm import dis_x86_16 as dis_engine
-            from miasm.arch.x86 import arch
-            try:
-                from miasm.arch.x86 import jit
-                jitter = jit.jitter_x86_16
-            except ImportError:
-                pass
-            mn = arch.mn_x86
-            from miasm.arch.x86.ira import ir_a_x86_16 as ira
-            from miasm.arch.x86.sem import ir_x86_16 as ir
-        elif machine_name == "x86_32":
-            from miasm.arch.x86.disasm import dis_x86_32 as dis_engine
-            from miasm.arch.x86 import arch
-            try:
-                from miasm.arch.x86 import jit
-                jitter = jit.jitter_x86_32
-            except ImportError:
-                pass
-            mn = arch.mn_x86
-            from miasm.arch.x86.ira import ir_a_x86_32 as ira
-            from miasm.arch.x86.sem import ir_x86_32 as ir
-            try:
-                from miasm.analysis.gdbserver import GdbServer_x86_32 as gdbserver
-            except ImportError:
-                pass
-        elif machine_name == "x86_64":
-            from miasm.arch.x86.disasm import dis_x86_64 as dis_engine
-            from miasm.arch.x86 import arch
-            try:
-                from miasm.arch.x86 import jit
-                jitter = jit.jitter_x86_64
-            except ImportError:
-                pass
-            mn = arch.mn_x86
-            from miasm.arch.x86.ira import ir_a_x86_64 as ira
-            from miasm.arch.x86.sem import ir_x86_64 as ir
-        elif machine_name == "msp430":
-            from miasm.arch.msp430.disasm import dis_msp430 as dis_engine
-            from miasm.arch.msp430 import arch
-            try:
-                from miasm.arch.msp430 import jit
-                jitter = jit.jitter_msp430
-            except ImportError:
-                pass
-            mn = arch.mn_msp430
-            from miasm.arch.msp430.ira import ir_a_msp430 as ira
-            from miasm.arch.msp430.sem import ir_msp430 as ir
-            try:
-                from miasm.analysis.gdbserver import GdbServer_msp430 as gdbserver
-            except ImportError:
-                pass
-        elif machine_name == "mips32b":
-            from miasm.arch.mips32.disasm import dis_mips32b as dis_engine
-            from miasm.arch.mips32 import arch
-            try:
-                from miasm.arch.mips32 import jit
-                jitter = jit.jitter_mips32b
-            except ImportError:
-                pass
-            mn = arch.mn_mips32
-            from miasm.arch.mips32.ira import ir_a_mips32b as ira
-            from miasm.arch.mips32.sem import ir_mips32b as ir
-        elif machine_name == "mips32l":
-            from miasm.arch.mips32.disasm import dis_mips32l as dis_engine
-            from miasm.arch.mips32 import arch
-            try:
-                from miasm.arch.mips32 import jit
-                jitter = jit.jitter_mips32l
-            except ImportError:
-                pass
-            mn = arch.mn_mips32
-            from miasm.arch.mips32.ira import ir_a_mips32l as ira
-            from miasm.arch.mips32.sem import ir_mips32l as ir
-        elif machine_name == "ppc32b":
-            from miasm.arch.ppc.disasm import dis_ppc32b as dis_engine
-            from miasm.arch.ppc import arch
-            try:
-                from miasm.arch.ppc import jit
-                jitter = jit.jitter_ppc32b
-            except ImportError:
-                pass
-            mn = arch.mn_ppc
-            from miasm.arch.ppc.ira import ir_a_ppc32b as ira
-            from miasm.arch.ppc.sem import ir_ppc32b as ir
-        elif machine_name == "mepb":
-            from miasm.arch.mep.disasm import dis_mepb as dis_engine
-            from miasm.arch.mep import arch
-            try:
-                from miasm.arch.mep import jit
-                jitter = jit.jitter_mepb
-            except ImportError:
-                pass
-            mn = arch.mn_mep
-            from miasm.arch.mep.ira import ir_a_mepb as ira
-            from miasm.arch.mep.sem import ir_mepb as ir
-        elif machine_name == "mepl":
-            from miasm.arch.mep.disasm import dis_mepl as dis_engine
-            from miasm.arch.mep import arch
-            try:
-                from miasm.arch.mep import jit
-                jitter = jit.jitter_mepl
-            except ImportError:
-                pass
-            mn = arch.mn_mep
-            from miasm.arch.mep.ira import ir_a_mepl as ira
-            from miasm.arch.mep.sem import ir_mepl as ir
-        else:
+        if machine_name not in self.__archs:
             raise ValueError('Unknown machine: %s' % machine_name)
-
-        # Loggers
-        if jit is not None:
-            log_jit = jit.log
-        log_arch = arch.log
-
-        self.__dis_engine = dis_engine
-        self.__mn = mn
-        self.__ira = ira
-        self.__jitter = jitter
-        self.__gdbserver = gdbserver
-        self.__log_jit = log_jit
-        self.__log_arch = log_arch
-        self.__base_expr = arch.base_expr
-        self.__ir = ir
         self.__name = machine_name
+        self.__package = "miasm.arch.%s" % self.__archs[machine_name][0]
+        # (module name, attribute) -> loaded object
+        self.__loaded = {}
+
+    def __load(self, module_name, attribute=None, optional=False):
+        """Import @module_name on first call and return it, or its
+        @attribute if set. If @optional, return None if the module cannot be
+        imported"""
+        key = (module_name, attribute)
+        if key not in self.__loaded:
+            try:
+                # Use the import statement machinery, so that the import is
+                # reported by 'python -X importtime'
+                __import__(module_name)
+                value = sys.modules[module_name]
+            except ImportError:
+                if not optional:
+                    raise
+                value = None
+            if value is not None and attribute is not None:
+                value = getattr(value, attribute)
+            self.__loaded[key] = value
+        return self.__loaded[key]
+
+    def __load_arch(self, module, attribute=None, optional=False):
+        """Load @attribute from the architecture @module (ie. 'disasm')"""
+        return self.__load(
+            "%s.%s" % (self.__package, module),
+            attribute,
+            optional
+        )
 
     @property
     def dis_engine(self):
-        return self.__dis_engine
+        if self.__name in self.__arch_only:
+            return None
+        return self.__load_arch("disasm", "dis_%s" % self.__name)
 
     @property
     def mn(self):
-        return self.__mn
+        return self.__load_arch("arch", self.__archs[self.__name][1])
 
     @property
     def ira(self):
-        return self.__ira
+        if self.__name in self.__arch_only:
+            return None
+        return self.__load_arch("ira", "ir_a_%s" % self.__name)
 
     @property
     def ir(self):
-        return self.__ir
+        if self.__name in self.__arch_only:
+            return None
+        return self.__load_arch("sem", "ir_%s" % self.__name)
 
     @property
     def jitter(self):
-        return self.__jitter
+        if self.__name in self.__no_jitter:
+            return None
+        return self.__load_arch(
+            "jit", "jitter_%s" % self.__name, optional=True
+        )
 
     @property
     def gdbserver(self):
-        return self.__gdbserver
+        if self.__name not in self.__gdbservers:
+            return None
+        return self.__load(
+            "miasm.analysis.gdbserver",
+            self.__gdbservers[self.__name],
+            optional=True
+        )
 
     @property
     def log_jit(self):
-        return self.__log_jit
+        if self.__name in self.__no_jitter:
+            return None
+        return self.__load_arch("jit", "log", optional=True)
 
     @property
     def log_arch(self):
-        return self.__log_arch
+        return self.__load_arch("arch", "log")
 
     @property
     def base_expr(self):
-        return self.__base_expr
+        return self.__load_arch("arch", "base_expr")
 
     @property
     def name(self):
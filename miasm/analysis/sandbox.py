@@ -1,6 +1,7 @@
 from __future__ import print_function
 from builtins import range
 
+import copy
 import os
 import logging
 from argparse import ArgumentParser
@@ -15,6 +16,34 @@ from miasm.jitter.jitload import log_func
 from miasm.core.utils import force_bytes
 
 
+def _copy_state(attributes, shared):
+    """Deep copy of the @attributes dictionary, in which the objects of
+    @shared are kept as is"""
+    memo = dict((id(obj), obj) for obj in shared)
+    return copy.deepcopy(attributes, memo)
+
+
+class SandboxSnapshot(object):
+
+    """
+    Emulation state of a Sandbox, returned by Sandbox.snapshot and restored
+    by Sandbox.restore
+    """
+
+    def __init__(self, memory, cpu_state, os_state, generation):
+        """
+        @memory: dict page address => (size, access, data)
+        @cpu_state: architecture dependent registers state
+        @os_state: list of (object, attribute names, attributes) of the
+        emulated OS state
+        @generation: VM write generation when the snapshot was taken
+        """
+        self.memory = memory
+        self.cpu_state = cpu_state
+        self.os_state = os_state
+        self.generation = generation
+
+
 class Sandbox(object):
 
     """
@@ -54,6 +83,8 @@ class Sandbox(object):
         assert isinstance(fname, basestring)
         self.fname = fname
         self.options = options
+        # Last restored snapshot and the VM write generation after it
+        self._last_restored = None
         if custom_methods is None:
             custom_methods = {}
         for cls in self.classes:
@@ -146,6 +177,99 @@ class Sandbox(object):
         prepare_cb(self.CALL_FINISH_ADDR, *args)
         self.jitter.continue_run()
 
+    def _os_shared_objects(self):
+        """Objects referenced by the OS state which are not copied in
+        snapshots"""
+        shared = [obj for obj, _ in self._os_state()]
+        shared += list(viewvalues(getattr(self, "name2module", {})))
+        return shared
+
+    def snapshot(self):
+        """
+        Return a SandboxSnapshot of the current emulation state: memory
+        pages, registers and emulated OS state.
+
+        The snapshot is meant to be taken once the (slow) sandbox
+        initialisation is done, and restored with the `restore` method before
+        each new run, for instance with different inputs.
+
+        Only the registers returned by the jitter `get_gpreg` (and the
+        architecture specific ones of `_get_cpu_state`) are saved.
+        """
+        generation = self.jitter.vm.get_write_generation()
+        memory = {}
+        for addr, page in viewitems(self.jitter.vm.get_all_memory()):
+            memory[addr] = (page["size"], page["access"], page["data"])
+        shared = self._os_shared_objects()
+        os_state = []
+        for obj, names in self._os_state():
+            if names is None:
+                attributes = vars(obj)
+            else:
+                attributes = dict((name, getattr(obj, name)) for name in names)
+            os_state.append((obj, names, _copy_state(attributes, shared)))
+        return SandboxSnapshot(
+            memory, self._get_cpu_state(), os_state, generation
+        )
+
+    def restore(self, snapshot):
+        """
+        Restore the emulation state saved in @snapshot, which must have been
+        taken on this sandbox. The snapshot can be restored several times.
+
+        Only the memory pages written since the snapshot, or since its last
+        restoration, are written back, using the VM pages write generation:
+        the jitted blocks of untouched code stay valid, so restarting is
+        almost free.
+        @snapshot: SandboxSnapshot instance
+        """
+        vm = self.jitter.vm
+        jit = self.jitter.jit
+
+        # Pages written after this generation may differ from the snapshot
+        generation = snapshot.generation
+        if (self._last_restored is not None and
+                self._last_restored[0] is snapshot):
+            generation = self._last_restored[1]
+
+        # Memory
+        removed = []
+        for addr, size, access, page_generation in vm.get_memory_pages():
+            saved = snapshot.memory.get(addr)
+            if saved is None or saved[0] != size:
+                # Page allocated after the snapshot
+                vm.remove_memory_page(addr)
+                removed.append((addr, addr + size))
+                continue
+            _, saved_access, data = saved
+            if page_generation > generation:
+                vm.set_mem(addr, data)
+            if access != saved_access:
+                vm.set_mem_access(addr, saved_access)
+        for addr, (size, access, data) in viewitems(snapshot.memory):
+            if not vm.is_mapped(addr, size):
+                vm.add_memory_page(addr, access, data, "Restored page")
+                removed.append((addr, addr + size))
+        # Remove the jitted blocks of the rewritten and removed ranges
+        removed += vm.get_memory_write()
+        jit.updt_automod_code_range(vm, removed)
+        vm.set_exception(0)
+        self._last_restored = (snapshot, vm.get_write_generation())
+
+        # CPU
+        self._set_cpu_state(snapshot.cpu_state)
+        self.jitter.cpu.set_exception(0)
+        self.jitter.run = False
+
+        # OS
+        shared = self._os_shared_objects()
+        for obj, names, attributes in snapshot.os_state:
+            attributes = _copy_state(attributes, shared)
+            if names is None:
+                vars(obj).clear()
+            for name, value in viewitems(attributes):
+                setattr(obj, name, value)
+
 
 
 class OS(object):
@@ -157,6 +281,13 @@ class OS(object):
     def __init__(self, custom_methods, **kwargs):
         pass
 
+    def _os_state(self):
+        """
+        Return the emulated OS state, saved by Sandbox.snapshot, as a list of
+        (object, attribute names); None stands for all the object attributes
+        """
+        return []
+
     @classmethod
     def update_parser(cls, parser):
         pass
@@ -175,6 +306,14 @@ class Arch(object):
         self.machine = Machine(self._ARCH_)
         self.jitter = self.machine.jitter(self.options.jitter)
 
+    def _get_cpu_state(self):
+        """Return the registers state, saved by Sandbox.snapshot"""
+        return {"gpreg": self.jitter.cpu.get_gpreg()}
+
+    def _set_cpu_state(self, state):
+        """Restore the registers @state"""
+        self.jitter.cpu.set_gpreg(state["gpreg"])
+
     @classmethod
     def update_parser(cls, parser):
         pass
@@ -188,10 +327,16 @@ class OS_Win(OS):
         "ws2_32.dll", 'advapi32.dll', "psapi.dll",
     ]
     modules_path = "win_dll"
+    # If set (or with the --cache-dlls option), the DLLs are parsed once, in
+    # a PeImageCache shared by the sandboxes of the process. Their PE
+    # instances (values of name2module) are then shared too: patching one of
+    # them affects the next sandboxes loading this DLL
+    cache_dlls = False
+    _dll_cache = None
 
     def __init__(self, custom_methods, *args, **kwargs):
         from miasm.jitter.loader.pe import vm_load_pe, vm_load_pe_libs,\
-            preload_pe, libimp_pe, vm_load_pe_and_dependencies
+            preload_pe, libimp_pe, vm_load_pe_and_dependencies, PeImageCache
         from miasm.os_dep import win_api_x86_32, win_api_x86_32_seh
         methods = dict((name, func) for name, func in viewitems(win_api_x86_32.__dict__))
         methods.update(custom_methods)
@@ -206,6 +351,12 @@ class OS_Win(OS):
         self.name2module = {}
         fname_basename = os.path.basename(self.fname).lower()
 
+        image_cache = None
+        if self.cache_dlls or getattr(self.options, "cache_dlls", False):
+            if OS_Win._dll_cache is None:
+                OS_Win._dll_cache = PeImageCache()
+            image_cache = OS_Win._dll_cache
+
         # Load main pe
         with open(self.fname, "rb") as fstream:
             self.pe = vm_load_pe(
@@ -229,6 +380,7 @@ class OS_Win(OS):
                     libs,
                     self.modules_path,
                     winobjs=win_api_x86_32.winobjs,
+                    image_cache=image_cache,
                     **kwargs
                 )
             )
@@ -245,6 +397,7 @@ class OS_Win(OS):
                 libs,
                 self.modules_path,
                 winobjs=win_api_x86_32.winobjs,
+                image_cache=image_cache,
                 **kwargs
             )
 
@@ -268,6 +421,15 @@ class OS_Win(OS):
         self.entry_point = self.pe.rva2virt(
             self.pe.Opthdr.AddressOfEntryPoint)
 
+    def _os_state(self):
+        from miasm.os_dep import win_api_x86_32, win_api_x86_32_seh
+        return [
+            (win_api_x86_32.winobjs, None),
+            (win_api_x86_32, ["temp_num"]),
+            (win_api_x86_32_seh, ["seh_count"]),
+            (self.libs, None),
+        ]
+
     @classmethod
     def update_parser(cls, parser):
         parser.add_argument('-o', "--load-hdr", action="store_true",
@@ -278,6 +440,9 @@ class OS_Win(OS):
                             help="Load base dll (path './win_dll')")
         parser.add_argument('-r', "--parse-resources",
                             action="store_true", help="Load resources")
+        parser.add_argument("--cache-dlls", action="store_true",
+                            help="Share the parsed DLLs between the sandboxes "
+                            "of the process")
 
 
 class OS_Linux(OS):
@@ -316,6 +481,10 @@ class OS_Linux(OS):
              self.argv += self.options.command_line
         self.envp = self.options.environment_vars
 
+    def _os_state(self):
+        from miasm.os_dep import linux_stdlib
+        return [(linux_stdlib.linobjs, None), (self.libs, None)]
+
     @classmethod
     def update_parser(cls, parser):
         parser.add_argument('-c', '--command-line',
@@ -363,6 +532,10 @@ class OS_Linux_str(OS):
              self.argv += self.options.command_line
         self.envp = self.options.environment_vars
 
+    def _os_state(self):
+        from miasm.os_dep import linux_stdlib
+        return [(linux_stdlib.linobjs, None), (self.libs, None)]
+
     @classmethod
     def update_parser(cls, parser):
         parser.add_argument('-c', '--command-line',
@@ -398,6 +571,27 @@ class Arch_x86(Arch):
         self.jitter.stack_base = self.STACK_BASE
         self.jitter.init_stack()
 
+    def _get_cpu_state(self):
+        """Return the registers state and the segment bases. The x87 FPU
+        state (float_st*, float_c*, float_stack_ptr, ...) is not available
+        from the jitter CPU, and thus not saved"""
+        state = super(Arch_x86, self)._get_cpu_state()
+        # Segment bases are not part of the general purpose registers. Save
+        # the bases of all the selectors, loaded or not
+        state["segm_base"] = self.jitter.cpu.get_segm_bases()
+        return state
+
+    def _set_cpu_state(self, state):
+        super(Arch_x86, self)._set_cpu_state(state)
+        cpu = self.jitter.cpu
+        segm_base = state["segm_base"]
+        # Reset the bases set since the snapshot
+        for selector in cpu.get_segm_bases():
+            if selector not in segm_base:
+                cpu.set_segm_base(selector, 0)
+        for selector, base in viewitems(segm_base):
+            cpu.set_segm_base(selector, base)
+
     @classmethod
     def update_parser(cls, parser):
         parser.add_argument('-s', "--usesegm", action="store_true",
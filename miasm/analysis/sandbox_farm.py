@@ -0,0 +1,525 @@
+"""Batch emulation of binaries with Sandbox, across worker processes.
+
+Jobs are described by SandboxJob instances and run by a SandboxFarm:
+
+farm = SandboxFarm(processes=4, timeout=60, max_instructions=10000000)
+jobs = [SandboxJob(Sandbox_Win_x86_32, fname, ["-q", "-l"])
+        for fname in fnames]
+for result in farm.run(jobs):
+    print(result.job_id, result.reason, len(result.api_calls))
+
+Results are streamed back as jobs complete. Each worker process runs several
+jobs: architectures, disassembly and lifting caches are kept warm between
+jobs, Windows sandboxes share their parsed DLLs (see OS_Win.cache_dlls), and
+jobs are preferably sent to a worker which has already emulated their
+architecture. Compiled blocks of the gcc jitter are shared through its on-disk
+cache.
+
+A job exceeding its timeout is stopped by killing its worker, which is then
+replaced by a fresh one. Each worker sends its results through its own pipe,
+so that killing it cannot corrupt the results of the other workers.
+"""
+
+from __future__ import print_function
+from collections import deque
+import copy
+import logging
+import pickle
+import sys
+import time
+import traceback
+from multiprocessing import Pipe, Process, Queue, cpu_count
+
+from future.utils import viewitems
+
+try:
+    from multiprocessing.connection import wait as _wait_connections
+except ImportError:
+    # Python 2
+    _wait_connections = None
+
+try:
+    import resource
+except ImportError:
+    # Memory limits are not available on this platform
+    resource = None
+
+
+log = logging.getLogger("sandbox_farm")
+console_handler = logging.StreamHandler()
+console_handler.setFormatter(logging.Formatter("[%(levelname)-8s]: %(message)s"))
+log.addHandler(console_handler)
+log.setLevel(logging.WARNING)
+
+
+# Exit reasons
+EXIT_FINISHED = "finished"  # The emulation ended normally
+EXIT_BUDGET = "budget"      # The instruction budget has been exhausted
+EXIT_TIMEOUT = "timeout"    # The job has been killed on timeout
+EXIT_MEMORY = "memory"      # The memory limit has been reached
+EXIT_ERROR = "error"        # An exception has been raised
+EXIT_CRASHED = "crashed"    # The worker process died during the job
+
+# Maximum time, in seconds, between two checks of the workers state
+POLL_INTERVAL = 0.5
+
+
+class SandboxJob(object):
+    """Emulation of a binary by a Sandbox"""
+
+    def __init__(self, sandbox_cls, fname, options=None, custom_methods=None,
+                 timeout=None, max_instructions=None, memory_limit=None,
+                 dump_memory=None, job_id=None):
+        """
+        @sandbox_cls: Sandbox subclass (ie. Sandbox_Win_x86_32)
+        @fname: str file name of the binary
+        @options: list of command line arguments for sandbox_cls.parser(),
+        or the parsed namespace
+        @custom_methods: (optional) { str => func } for custom API
+        implementations. The functions must be picklable (ie. defined at a
+        module top level)
+        @timeout: (optional) maximum duration of the job, in seconds
+        @max_instructions: (optional) maximum number of emulated instructions
+        @memory_limit: (optional) maximum address space of the process
+        running the job, in bytes
+        @dump_memory: (optional) True to dump every memory page at the end of
+        the emulation, or list of (address, size) regions to dump
+        @job_id: (optional) identifier of the job in its result, default to
+        @fname
+        """
+        self.sandbox_cls = sandbox_cls
+        self.fname = fname
+        self.options = options
+        self.custom_methods = custom_methods
+        self.timeout = timeout
+        self.max_instructions = max_instructions
+        self.memory_limit = memory_limit
+        self.dump_memory = dump_memory
+        self.job_id = fname if job_id is None else job_id
+
+    @property
+    def arch(self):
+        "Architecture name of the job"
+        return self.sandbox_cls._ARCH_
+
+    def get_options(self):
+        "Return the parsed options of the sandbox"
+        if self.options is None or isinstance(self.options, (list, tuple)):
+            parser = self.sandbox_cls.parser()
+            return parser.parse_args(list(self.options or []))
+        return self.options
+
+    def __repr__(self):
+        return "<%s %r %s>" % (
+            self.__class__.__name__,
+            self.job_id,
+            self.sandbox_cls.__name__
+        )
+
+
+class SandboxResult(object):
+    """Outcome of a SandboxJob"""
+
+    def __init__(self, job_id, reason, elapsed=0., instructions=None,
+                 api_calls=None, memory=None, pc=None, error=None):
+        """
+        @job_id: identifier of the job
+        @reason: exit reason, one of the EXIT_* constants
+        @elapsed: duration of the job, in seconds
+        @instructions: number of emulated instructions, if counted
+        @api_calls: list of (function name, stub address) of the emulated
+        API calls, in call order
+        @memory: { address => bytes } of the dumped memory regions
+        @pc: program counter at the end of the emulation
+        @error: traceback or description of the error, if any
+        """
+        self.job_id = job_id
+        self.reason = reason
+        self.elapsed = elapsed
+        self.instructions = instructions
+        self.api_calls = [] if api_calls is None else api_calls
+        self.memory = {} if memory is None else memory
+        self.pc = pc
+        self.error = error
+
+    def __repr__(self):
+        return "<%s %r %s %.2fs>" % (
+            self.__class__.__name__,
+            self.job_id,
+            self.reason,
+            self.elapsed
+        )
+
+
+class InstructionBudget(object):
+    """Jitter execution callback counting the emulated instructions, and
+    stopping the emulation once @max_instructions is reached.
+
+    Blocks are run one by one to be counted, which slows the emulation down.
+    """
+
+    def __init__(self, max_instructions):
+        self.max_instructions = max_instructions
+        self.instructions = 0
+        self.exhausted = False
+
+    def install(self, jitter):
+        "Count the instructions emulated by @jitter"
+        jitter.jit.set_options(max_exec_per_call=1)
+        jitter.exec_cb = self
+
+    def __call__(self, jitter):
+        pc = jitter.pc
+        jit = jitter.jit
+        if pc in jitter.breakpoints_handler.callbacks:
+            # Breakpoints may redirect the execution (ie. API stubs)
+            return True
+        if pc not in jit.offset_to_jitted_func:
+            # JiT the block now to know its length
+            jit.disasm_and_jit_block(pc, jitter.vm)
+        loc_key = jitter.ir_arch.loc_db.get_offset_location(pc)
+        block = jit.loc_key_to_block.get(loc_key)
+        count = len(block.lines) if block is not None and block.lines else 1
+        if self.instructions + count > self.max_instructions:
+            self.exhausted = True
+            jitter.run = False
+            return False
+        self.instructions += count
+        return True
+
+
+def _reset_os_state():
+    """Reset the emulated OS global states, possibly modified by a previous
+    job in the same process"""
+    win_api = sys.modules.get("miasm.os_dep.win_api_x86_32")
+    if win_api is not None:
+        win_api.winobjs.__init__()
+    linux_stdlib = sys.modules.get("miasm.os_dep.linux_stdlib")
+    if linux_stdlib is not None:
+        linux_stdlib.linobjs.__init__()
+
+
+def _record_api_calls(jitter):
+    """Wrap the API implementations of @jitter to log their calls; return the
+    list of (function name, stub address) filled during the emulation"""
+    api_calls = []
+    if not hasattr(jitter, "user_globals"):
+        return api_calls
+
+    def wrap(name, func):
+        def record_call(jitter):
+            api_calls.append((name, jitter.pc))
+            return func(jitter)
+        return record_call
+
+    jitter.user_globals = dict(
+        (name, wrap(name, func) if callable(func) else func)
+        for name, func in viewitems(jitter.user_globals)
+    )
+    return api_calls
+
+
+def _dump_memory(vm, regions):
+    """Return { address => bytes } of the memory @regions of @vm; if @regions
+    is True, dump every memory page"""
+    if regions is True:
+        return dict(
+            (address, page["data"])
+            for address, page in viewitems(vm.get_all_memory())
+        )
+    memory = {}
+    for address, size in regions:
+        if vm.is_mapped(address, size):
+            memory[address] = vm.get_mem(address, size)
+        else:
+            log.warning("Cannot dump unmapped region 0x%x (0x%x bytes)",
+                        address, size)
+    return memory
+
+
+def _set_memory_limit(limit):
+    """Limit the address space of the current process to @limit bytes (None
+    for unlimited); return the previous limit"""
+    if resource is None:
+        if limit is not None:
+            log.warning("Memory limit unsupported on this platform")
+        return None
+    previous = resource.getrlimit(resource.RLIMIT_AS)
+    if limit is None:
+        limit = previous[1]
+    resource.setrlimit(resource.RLIMIT_AS, (limit, previous[1]))
+    return previous[0]
+
+
+def run_job(job, lifting_caches=None):
+    """Run @job in the current process and return its SandboxResult.
+    The job timeout is only enforced by SandboxFarm.
+
+    @job: SandboxJob instance
+    @lifting_caches: (optional) dict architecture name => LiftingCache,
+    updated with the lifting cache of the job architecture, to be reused by
+    the next jobs
+    """
+    start = time.time()
+    sandbox = None
+    budget = None
+    api_calls = []
+    error = None
+    memory = {}
+    previous_limit = None
+    if job.memory_limit is not None:
+        previous_limit = _set_memory_limit(job.memory_limit)
+    try:
+        _reset_os_state()
+        sandbox = job.sandbox_cls(
+            job.fname, job.get_options(), job.custom_methods
+        )
+        jitter = sandbox.jitter
+
+        # Reuse the liftings of previous jobs
+        if lifting_caches is not None:
+            lifting_cache = lifting_caches.get(job.arch)
+            if lifting_cache is None:
+                lifting_caches[job.arch] = jitter.ir_arch.enable_lifting_cache()
+            else:
+                jitter.ir_arch.lifting_cache = lifting_cache
+
+        api_calls = _record_api_calls(jitter)
+        if job.max_instructions is not None:
+            budget = InstructionBudget(job.max_instructions)
+            budget.install(jitter)
+
+        sandbox.run()
+        reason = EXIT_BUDGET if budget is not None and budget.exhausted \
+                 else EXIT_FINISHED
+        if job.dump_memory:
+            memory = _dump_memory(jitter.vm, job.dump_memory)
+    except MemoryError:
+        reason = EXIT_MEMORY
+        error = traceback.format_exc()
+    except Exception:
+        reason = EXIT_ERROR
+        error = traceback.format_exc()
+    finally:
+        if job.memory_limit is not None:
+            _set_memory_limit(previous_limit)
+
+    return SandboxResult(
+        job.job_id,
+        reason,
+        elapsed=time.time() - start,
+        instructions=budget.instructions if budget is not None else None,
+        api_calls=api_calls,
+        memory=memory,
+        pc=getattr(sandbox.jitter, "pc", None) if sandbox is not None else None,
+        error=error,
+    )
+
+
+def _wait(connections, timeout):
+    """Return the @connections with data to read, or which have been closed
+    by the other side, waiting for at most @timeout seconds"""
+    if _wait_connections is not None:
+        return _wait_connections(connections, timeout)
+    deadline = time.time() + timeout
+    while True:
+        ready = [connection for connection in connections if connection.poll()]
+        if ready or time.time() >= deadline:
+            return ready
+        time.sleep(min(0.01, max(0, deadline - time.time())))
+
+
+def _worker_main(job_queue, result_conn):
+    """Worker process: run jobs from @job_queue until a None job, sending
+    their SandboxResult through @result_conn"""
+    from miasm.analysis.sandbox import OS_Win
+    # Jobs of a worker share their DLLs
+    OS_Win.cache_dlls = True
+    lifting_caches = {}
+    while True:
+        job = job_queue.get()
+        if job is None:
+            break
+        result = run_job(job, lifting_caches)
+        result_conn.send(result)
+
+
+class _Worker(object):
+    """Worker process handled by a SandboxFarm"""
+
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+        self.job_queue = Queue()
+        # Results are only received by the farm
+        self.result_conn, result_conn = Pipe(duplex=False)
+        self.process = Process(
+            target=_worker_main,
+            args=(self.job_queue, result_conn)
+        )
+        self.process.daemon = True
+        self.process.start()
+        # Only the worker keeps the sending end: the pipe is closed if it dies
+        result_conn.close()
+        # Current job, its start time and deadline
+        self.job = None
+        self.start = None
+        self.deadline = None
+        # Architectures already emulated by the worker
+        self.archs = set()
+
+    def submit(self, job):
+        "Run @job in the worker"
+        self.job = job
+        self.start = time.time()
+        self.deadline = None
+        if job.timeout is not None:
+            self.deadline = self.start + job.timeout
+        self.job_queue.put(job)
+
+    def done(self):
+        "Mark the current job as done"
+        self.archs.add(self.job.arch)
+        self.job = None
+        self.start = self.deadline = None
+
+    def receive(self):
+        """Return the result of the current job, None if the worker died
+        before sending it"""
+        try:
+            return self.result_conn.recv()
+        except EOFError:
+            # Wait for the process end, to report its exit code
+            self.process.join(POLL_INTERVAL)
+            return None
+
+    def kill(self):
+        "Stop the worker process, whatever it is doing"
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.result_conn.close()
+
+    def stop(self, timeout=1):
+        "Ask the worker to end once idle, kill it after @timeout seconds"
+        if self.process.is_alive():
+            self.job_queue.put(None)
+            self.process.join(timeout)
+        self.kill()
+
+
+class SandboxFarm(object):
+    """Run SandboxJob instances across a pool of worker processes"""
+
+    def __init__(self, processes=None, timeout=None, max_instructions=None,
+                 memory_limit=None):
+        """
+        @processes: (optional) number of worker processes, default to the
+        number of CPUs
+        @timeout, @max_instructions, @memory_limit: default limits, for jobs
+        without their own (see SandboxJob)
+        """
+        self.processes = processes if processes else cpu_count()
+        self.timeout = timeout
+        self.max_instructions = max_instructions
+        self.memory_limit = memory_limit
+        self._next_worker_id = 0
+
+    def _new_worker(self, workers):
+        "Start a new worker in @workers"
+        worker = _Worker(self._next_worker_id)
+        workers[worker.worker_id] = worker
+        self._next_worker_id += 1
+        return worker
+
+    def _prepare(self, job):
+        "Return a copy of @job with the farm default limits"
+        job = copy.copy(job)
+        for name in ["timeout", "max_instructions", "memory_limit"]:
+            if getattr(job, name) is None:
+                setattr(job, name, getattr(self, name))
+        return job
+
+    def _dispatch(self, pending, workers):
+        """Submit @pending jobs to idle @workers, preferring workers which
+        already emulated the job architecture. Yield the results of jobs
+        which cannot be sent"""
+        idle = [worker for worker in workers.values() if worker.job is None]
+        while pending and idle:
+            job = self._prepare(pending.popleft())
+            try:
+                pickle.dumps(job, -1)
+            except Exception:
+                yield SandboxResult(
+                    job.job_id, EXIT_ERROR, error=traceback.format_exc()
+                )
+                continue
+            worker = next(
+                (worker for worker in idle if job.arch in worker.archs),
+                idle[0]
+            )
+            idle.remove(worker)
+            worker.submit(job)
+
+    def run(self, jobs):
+        """Run @jobs, yielding their SandboxResult as they complete
+        @jobs: iterable of SandboxJob instances
+        """
+        pending = deque(jobs)
+        workers = {}
+        for _ in range(min(self.processes, len(pending))):
+            self._new_worker(workers)
+
+        try:
+            while True:
+                for result in self._dispatch(pending, workers):
+                    yield result
+                busy = [
+                    worker for worker in workers.values()
+                    if worker.job is not None
+                ]
+                if not busy:
+                    break
+
+                # Wait for results, or the next deadline
+                wait = POLL_INTERVAL
+                deadlines = [
+                    worker.deadline for worker in busy
+                    if worker.deadline is not None
+                ]
+                if deadlines:
+                    wait = max(0, min(wait, min(deadlines) - time.time()))
+                conn_to_worker = dict(
+                    (worker.result_conn, worker) for worker in busy
+                )
+                for conn in _wait(list(conn_to_worker), wait):
+                    worker = conn_to_worker[conn]
+                    result = worker.receive()
+                    if result is not None:
+                        worker.done()
+                        yield result
+
+                # Kill jobs on timeout, and replace dead workers
+                now = time.time()
+                for worker in busy:
+                    if worker.job is None:
+                        continue
+                    if worker.deadline is not None and now >= worker.deadline:
+                        reason = EXIT_TIMEOUT
+                        error = "Timeout after %.2fs" % (now - worker.start)
+                    elif not worker.process.is_alive():
+                        reason = EXIT_CRASHED
+                        error = "Worker exited with code %r" % (
+                            worker.process.exitcode
+                        )
+                    else:
+                        continue
+                    job, start = worker.job, worker.start
+                    worker.kill()
+                    del workers[worker.worker_id]
+                    self._new_worker(workers)
+                    yield SandboxResult(
+                        job.job_id, reason, elapsed=now - start, error=error
+                    )
+        finally:
+            for worker in workers.values():
+                worker.stop()
@@ -56,6 +56,7 @@ class instruction_mep(instruction):
           on mnemonics
         - it must be implemented !
     """
+    __slots__ = []
 
     # Default delay slot
     # Note:
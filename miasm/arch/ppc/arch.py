@@ -68,6 +68,7 @@ class additional_info(object):
 
 
 class instruction_ppc(instruction):
+    __slots__ = []
     delayslot = 0
 
     def __init__(self, *args, **kargs):
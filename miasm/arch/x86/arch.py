@@ -3,6 +3,7 @@
 from __future__ import print_function
 from builtins import range
 import re
+import sys
 
 from future.utils import viewitems
 
@@ -796,6 +797,13 @@ class mn_x86(cls_mn):
             self.g1.value = infos.g1.value
             self.g2.value = infos.g2.value
 
+    @classmethod
+    def asm_info_key(cls, instr):
+        info = instr.additional_info
+        if info is None:
+            return None
+        return (info.g1.value, info.g2.value)
+
     def reset_class(self):
         super(mn_x86, self).reset_class()
         if hasattr(self, "opmode"):
@@ -1662,6 +1670,11 @@ def gen_modrm_form():
     byte2modrm[32] = db_afs_32
     byte2modrm[64] = db_afs_64
 
+    return byte2modrm
+
+
+def gen_modrm2byte(byte2modrm):
+    """Build the reverse of @byte2modrm, used by the assembler"""
     modrm2byte = {16: defaultdict(list),
                   32: defaultdict(list),
                   64: defaultdict(list),
@@ -1678,9 +1691,31 @@ def gen_modrm_form():
                 modrm_f = tuple(sorted(viewitems(modrm_f), key=str))
                 modrm2byte[size][modrm_f].append((i, j))
 
-    return byte2modrm, modrm2byte
+    return modrm2byte
+
+byte2modrm = gen_modrm_form()
+_modrm2byte = None
+
+
+def get_modrm2byte():
+    """Return the modrm to bytes table, built on first use as it is only
+    needed to assemble instructions"""
+    global _modrm2byte
+    if _modrm2byte is None:
+        _modrm2byte = gen_modrm2byte(byte2modrm)
+    return _modrm2byte
+
 
-byte2modrm, modrm2byte = gen_modrm_form()
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        # The module attribute modrm2byte is built on first access (PEP 562)
+        if name == "modrm2byte":
+            return get_modrm2byte()
+        raise AttributeError(
+            "module %r has no attribute %r" % (__name__, name)
+        )
+else:
+    modrm2byte = get_modrm2byte()
 
 
 # ret is modr; ret is displacement
@@ -1981,6 +2016,7 @@ class x86_rm_arg(x86_arg):
         return self.expr is not None
 
     def gen_cand(self, v_cand, admode):
+        modrm2byte = get_modrm2byte()
         if not admode in modrm2byte:
             # XXX TODO: 64bit
             return
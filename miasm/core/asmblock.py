@@ -3,8 +3,10 @@
 from builtins import map
 from builtins import range
 import logging
+import multiprocessing
 import warnings
-from collections import namedtuple
+from array import array
+from collections import deque, namedtuple
 from builtins import int as int_types
 
 from future.utils import viewitems, viewvalues
@@ -13,6 +15,7 @@ from miasm.expression.expression import ExprId, ExprInt, get_expr_locs
 from miasm.expression.expression import LocKey
 from miasm.expression.simplifications import expr_simp
 from miasm.core.utils import Disasm_Exception, pck
+from miasm.core.bin_stream import bin_stream_str
 from miasm.core.graph import DiGraph, DiGraphSimplifier, MatchGraphJoker
 from miasm.core.interval import interval
 from miasm.core.locationdb import LocationDB
@@ -24,6 +27,17 @@ console_handler.setFormatter(logging.Formatter("[%(levelname)-8s]: %(message)s")
 log_asmblock.addHandler(console_handler)
 log_asmblock.setLevel(logging.WARNING)
 
+# Array type of instructions offsets ('q' is not available in Python 2)
+try:
+    array("q")
+    OFFSETS_TYPECODE = "q"
+except ValueError:
+    OFFSETS_TYPECODE = "l"
+
+# Default size of the chunks disassembled by each process of
+# disasmEngine.dis_linear_parallel
+DIS_LINEAR_CHUNK_SIZE = 0x100000
+
 
 class AsmRaw(object):
 
@@ -307,6 +321,11 @@ class AsmCFG(DiGraph):
     AsmCFGPending = namedtuple("AsmCFGPending",
                                ["waiter", "constraint"])
 
+    # Columnar view of the instructions, see AsmCFG.to_columns
+    AsmCFGColumns = namedtuple("AsmCFGColumns",
+                               ["loc_keys", "blocks", "offsets", "lengths",
+                                "mnemonic_ids", "mnemonics"])
+
     def __init__(self, loc_db=None, *args, **kwargs):
         super(AsmCFG, self).__init__(*args, **kwargs)
         # Edges -> constraint
@@ -592,6 +611,42 @@ class AsmCFG(DiGraph):
         """
         return self._loc_key_to_block.get(loc_key, None)
 
+    def to_columns(self):
+        """Return a columnar view of the instructions of the graph, for bulk
+        analysis, as an AsmCFGColumns with one entry per instruction in:
+        - blocks: index of the instruction block in loc_keys
+        - offsets: instruction offset, -1 if unknown
+        - lengths: instruction length, 0 if unknown
+        - mnemonic_ids: index of the instruction name in mnemonics
+
+        Columns are arrays; loc_keys and mnemonics are lists. AsmRaw lines
+        have an empty mnemonic.
+        """
+        loc_keys = []
+        blocks = array("I")
+        offsets = array(OFFSETS_TYPECODE)
+        lengths = array("I")
+        mnemonic_ids = array("I")
+        mnemonics = []
+        mnemonic_to_id = {}
+        for block in self.blocks:
+            block_id = len(loc_keys)
+            loc_keys.append(block.loc_key)
+            for line in block.lines:
+                name = getattr(line, "name", "")
+                mnemonic_id = mnemonic_to_id.get(name)
+                if mnemonic_id is None:
+                    mnemonic_id = mnemonic_to_id[name] = len(mnemonics)
+                    mnemonics.append(name)
+                offset = getattr(line, "offset", None)
+                length = getattr(line, "l", None)
+                blocks.append(block_id)
+                offsets.append(-1 if offset is None else offset)
+                lengths.append(0 if length is None else length)
+                mnemonic_ids.append(mnemonic_id)
+        return self.AsmCFGColumns(loc_keys, blocks, offsets, lengths,
+                                  mnemonic_ids, mnemonics)
+
     def sanity_check(self):
         """Do sanity checks on blocks' constraints:
         * no pendings
@@ -632,10 +687,12 @@ class AsmCFG(DiGraph):
                                    "(%s)" % (loc_key,
                                              pred_next))
 
-    def guess_blocks_size(self, mnemo):
+    def guess_blocks_size(self, mnemo, asm_cache=None):
         """Asm and compute max block size
         Add a 'size' and 'max_size' attribute on each block
-        @mnemo: metamn instance"""
+        @mnemo: metamn instance
+        @asm_cache: (optional) dictionary filled with the assembled
+        instructions candidates, see cached_conservative_asm"""
         for block in self.blocks:
             size = 0
             for instr in block.lines:
@@ -664,6 +721,9 @@ class AsmCFG(DiGraph):
                         l = len(candidates[-1])
                     except:
                         l = mnemo.max_instruction_len
+                    else:
+                        if asm_cache is not None:
+                            asm_cache[(id(instr), tuple(instr.args))] = candidates
                     data = None
                 instr.data = data
                 instr.l = l
@@ -745,17 +805,25 @@ def conservative_asm(mnemo, instr, symbols, conservative):
     Try to keep original instruction bytes if it exists
     """
     candidates = mnemo.asm(instr, symbols)
+    return select_asm_candidate(instr, candidates, conservative), candidates
+
+
+def select_asm_candidate(instr, candidates, conservative):
+    """
+    Select the encoding of @instr among its @candidates;
+    Try to keep original instruction bytes if it exists
+    """
     if not candidates:
         raise ValueError('cannot asm:%s' % str(instr))
     if not hasattr(instr, "b"):
-        return candidates[0], candidates
+        return candidates[0]
     if instr.b in candidates:
-        return instr.b, candidates
+        return instr.b
     if conservative:
         for c in candidates:
             if len(c) == len(instr.b):
-                return c, candidates
-    return candidates[0], candidates
+                return c
+    return candidates[0]
 
 
 def fix_expr_val(expr, symbols):
@@ -845,7 +913,20 @@ class BlockChain(object):
         """Best effort merge two block chains
         Return the list of resulting blockchains"""
         self.blocks += chain.blocks
-        self.place()
+        if chain.pinned or not self.pinned:
+            self.place()
+            return [self]
+        # Appended blocks only extend the chain: update its bounds as place()
+        # computes them, without re-placing the whole chain
+        self.max_size += chain.max_size
+        for block in chain.blocks:
+            size = block.max_size + \
+                (block.alignment - block.max_size) % block.alignment
+            self.offset_max += size
+            if self.pinned_block_idx:
+                # offset_min also accounts for the blocks after a pinned block
+                # which is not the first one
+                self.offset_min -= size
         return [self]
 
     def fix_blocks(self, modified_loc_keys):
@@ -958,7 +1039,7 @@ def get_blockchains_address_interval(blockChains, dst_interval):
         chain_interval = interval([(chain.offset_min, chain.offset_max - 1)])
         if chain_interval not in dst_interval:
             raise ValueError('Chain placed out of destination interval')
-        allocated_interval += chain_interval
+        allocated_interval.add(chain.offset_min, chain.offset_max - 1)
     return allocated_interval
 
 
@@ -1023,9 +1104,42 @@ def get_block_loc_keys(block):
     return symbols
 
 
-def assemble_block(mnemo, block, loc_db, conservative=False):
+def cached_conservative_asm(mnemo, instr, loc_db, conservative, asm_cache):
+    """
+    Asm instruction, whose arguments are already resolved, using @asm_cache
+    @asm_cache: dictionary (instruction id, resolved arguments) -> candidates,
+    or None to disable caching
+    """
+    if asm_cache is None:
+        return conservative_asm(mnemo, instr, loc_db, conservative)[0]
+    key = (id(instr), tuple(instr.args))
+    candidates = asm_cache.get(key)
+    if candidates is None:
+        candidates = mnemo.asm(instr, loc_db)
+        asm_cache[key] = candidates
+    return select_asm_candidate(instr, candidates, conservative)
+
+
+def is_offset_dependent(block):
+    """Return True if the assembly of @block may depend on its own offset"""
+    for instr in block.lines:
+        if isinstance(instr, AsmRaw):
+            if isinstance(instr.raw, list):
+                return True
+            continue
+        if instr.dstflow():
+            return True
+        for arg in instr.args:
+            if get_expr_locs(arg):
+                return True
+    return False
+
+
+def assemble_block(mnemo, block, loc_db, conservative=False, asm_cache=None):
     """Assemble a @block using @loc_db
     @conservative: (optional) use original bytes when possible
+    @asm_cache: (optional) dictionary used to cache instructions encodings
+    across calls, see cached_conservative_asm
     """
     offset_i = 0
 
@@ -1054,9 +1168,9 @@ def assemble_block(mnemo, block, loc_db, conservative=False):
             instr.fixDstOffset()
 
         old_l = instr.l
-        cached_candidate, _ = conservative_asm(
+        cached_candidate = cached_conservative_asm(
             mnemo, instr, loc_db,
-            conservative
+            conservative, asm_cache
         )
         if len(cached_candidate) != instr.l:
             # The output instruction length is different from the one we guessed
@@ -1066,9 +1180,9 @@ def assemble_block(mnemo, block, loc_db, conservative=False):
             instr.args = instr.resolve_args_with_symbols(loc_db)
             if instr.dstflow():
                 instr.fixDstOffset()
-            cached_candidate, _ = conservative_asm(
+            cached_candidate = cached_conservative_asm(
                 mnemo, instr, loc_db,
-                conservative
+                conservative, asm_cache
             )
             assert len(cached_candidate) == instr.l
 
@@ -1083,9 +1197,12 @@ def assemble_block(mnemo, block, loc_db, conservative=False):
         offset_i += instr.l
 
 
-def asmblock_final(mnemo, asmcfg, blockChains, loc_db, conservative=False):
+def asmblock_final(mnemo, asmcfg, blockChains, loc_db, conservative=False,
+                   asm_cache=None):
     """Resolve and assemble @blockChains using @loc_db until fixed point is
-    reached"""
+    reached
+    @asm_cache: (optional) instructions encodings cache, see
+    cached_conservative_asm"""
 
     log_asmblock.debug("asmbloc_final")
 
@@ -1097,10 +1214,15 @@ def asmblock_final(mnemo, asmcfg, blockChains, loc_db, conservative=False):
         for loc_key in loc_keys:
             blocks_using_loc_key.setdefault(loc_key, set()).add(block)
 
-    block2chain = {}
-    for chain in blockChains:
-        for block in chain.blocks:
-            block2chain[block] = chain
+    # Blocks whose assembly does not depend on their own offset are not
+    # re-assembled when they are moved
+    offset_dependent_blocks = set(
+        block for block in asmcfg.blocks if is_offset_dependent(block)
+    )
+
+    # Instructions encodings, shared by every assembly round
+    if asm_cache is None:
+        asm_cache = {}
 
     # Init worklist
     blocks_to_rework = set(asmcfg.blocks)
@@ -1116,7 +1238,7 @@ def asmblock_final(mnemo, asmcfg, blockChains, loc_db, conservative=False):
         for loc_key in modified_loc_keys:
             # Retrieve block with modified reference
             mod_block = asmcfg.loc_key_to_block(loc_key)
-            if mod_block is not None:
+            if mod_block in offset_dependent_blocks:
                 blocks_to_rework.add(mod_block)
 
             # Enqueue blocks referencing a modified loc_key
@@ -1131,7 +1253,7 @@ def asmblock_final(mnemo, asmcfg, blockChains, loc_db, conservative=False):
 
         while blocks_to_rework:
             block = blocks_to_rework.pop()
-            assemble_block(mnemo, block, loc_db, conservative)
+            assemble_block(mnemo, block, loc_db, conservative, asm_cache)
 
 
 def asm_resolve_final(mnemo, asmcfg, loc_db, dst_interval=None):
@@ -1140,7 +1262,8 @@ def asm_resolve_final(mnemo, asmcfg, loc_db, dst_interval=None):
 
     asmcfg.sanity_check()
 
-    asmcfg.guess_blocks_size(mnemo)
+    asm_cache = {}
+    asmcfg.guess_blocks_size(mnemo, asm_cache)
     blockChains = group_constrained_blocks(loc_db, asmcfg)
     resolved_blockChains = resolve_symbol(
         blockChains,
@@ -1148,9 +1271,10 @@ def asm_resolve_final(mnemo, asmcfg, loc_db, dst_interval=None):
         dst_interval
     )
 
-    asmblock_final(mnemo, asmcfg, resolved_blockChains, loc_db)
+    asmblock_final(mnemo, asmcfg, resolved_blockChains, loc_db,
+                   asm_cache=asm_cache)
     patches = {}
-    output_interval = interval()
+    placements = []
 
     for block in asmcfg.blocks:
         offset = loc_db.get_location_offset(block.loc_key)
@@ -1160,15 +1284,30 @@ def asm_resolve_final(mnemo, asmcfg, loc_db, dst_interval=None):
                 continue
             assert len(instr.data) == instr.l
             patches[offset] = instr.data
-            instruction_interval = interval([(offset, offset + instr.l - 1)])
-            if not (instruction_interval & output_interval).empty:
-                raise RuntimeError("overlapping bytes %X" % int(offset))
-            output_interval = output_interval.union(instruction_interval)
+            placements.append((offset, offset + instr.l))
             instr.offset = offset
             offset += instr.l
+
+    # Check overlaps on instructions sorted by offset
+    placements.sort()
+    for (_, prev_stop), (start, _) in zip(placements, placements[1:]):
+        if start < prev_stop:
+            raise RuntimeError("overlapping bytes %X" % int(start))
     return patches
 
 
+def _dis_linear_chunk(task):
+    """Process pool worker of disasmEngine.dis_linear_parallel
+    Return the chunk end offset and its linear sweep instructions
+    @task: (arch, attrib, data, chunk_start, chunk_stop, step, endianness)
+    """
+    arch, attrib, data, chunk_start, chunk_stop, step, endianness = task
+    bs = bin_stream_str(data, base_address=chunk_start)
+    bs.endianness = endianness
+    mdis = disasmEngine(arch, attrib, bs)
+    return chunk_stop, list(mdis.dis_linear(chunk_start, chunk_stop, step))
+
+
 class disasmEngine(object):
 
     """Disassembly engine, taking care of disassembler options and mutli-block
@@ -1477,3 +1616,99 @@ class disasmEngine(object):
 
         instr = block.lines[0]
         return instr
+
+    def dis_linear(self, start, stop, step=None):
+        """Linear sweep disassembly: iterate on the instructions decoded one
+        after the other from offset @start, without building blocks
+        Instructions starting before @stop are returned. On a decoding error,
+        the sweep resyncs @step bytes further.
+        @start: first offset to disassemble
+        @stop: end offset (excluded)
+        @step: (optional) resync step, default to the architecture alignment
+        """
+        if step is None:
+            step = getattr(self.arch, "alignment", 1)
+        offset = start
+        while offset < stop:
+            try:
+                instr = self.arch.dis(self.bin_stream, self.attrib, offset)
+            except (Disasm_Exception, IOError) as error:
+                log_asmblock.debug(error)
+                offset += step
+                continue
+            yield instr
+            offset += instr.l
+
+    def dis_linear_parallel(self, start, stop, step=None,
+                            chunk_size=DIS_LINEAR_CHUNK_SIZE, processes=None):
+        """Same as dis_linear, the range being split in chunks of @chunk_size
+        bytes disassembled by a pool of @processes processes
+
+        Chunks are read from the bin_stream by the caller and at most two
+        chunks per process are in flight, so that memory stays bounded by the
+        chunk size rather than by the range size.
+        A chunk sweep starting out of sync with the sweep of the previous
+        chunk is resynchronised locally, so the result is identical to
+        dis_linear.
+        @processes: (optional) number of processes, default to the CPU count
+        """
+        if step is None:
+            step = getattr(self.arch, "alignment", 1)
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        max_len = getattr(self.arch, "max_instruction_len", chunk_size)
+
+        def read_chunk(chunk_start):
+            chunk_stop = min(chunk_start + chunk_size, stop)
+            data = self.bin_stream.getbytes(
+                chunk_start,
+                chunk_stop - chunk_start
+            )
+            # Let the last instructions overlap the next chunk, up to the
+            # end of the stream
+            for length in range(max_len, 0, -1):
+                try:
+                    data += self.bin_stream.getbytes(chunk_stop, length)
+                except IOError:
+                    continue
+                break
+            return (self.arch, self.attrib, data, chunk_start, chunk_stop,
+                    step, self.bin_stream.endianness)
+
+        chunk_starts = iter(range(start, stop, chunk_size))
+        pending = deque()
+        pool = multiprocessing.Pool(processes)
+        try:
+            offset = start
+            while True:
+                # Keep the pool busy, within a bounded window
+                while len(pending) < 2 * processes:
+                    chunk_start = next(chunk_starts, None)
+                    if chunk_start is None:
+                        break
+                    pending.append(
+                        pool.apply_async(
+                            _dis_linear_chunk,
+                            (read_chunk(chunk_start),)
+                        )
+                    )
+                if not pending:
+                    break
+                chunk_stop, instrs = pending.popleft().get()
+                offset_to_instr = dict(
+                    (instr.offset, instr) for instr in instrs
+                )
+                while offset < chunk_stop:
+                    instr = offset_to_instr.get(offset)
+                    if instr is None:
+                        # Out of sync with the chunk sweep
+                        instr = next(self.dis_linear(offset, offset + 1, step),
+                                     None)
+                    if instr is None:
+                        offset += step
+                        continue
+                    # Share decoded parts with the current process ones
+                    yield self.arch.intern_instruction(instr)
+                    offset += instr.l
+        finally:
+            pool.terminate()
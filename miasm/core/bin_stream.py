@@ -16,6 +16,8 @@
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #
 
+from binascii import hexlify
+
 from builtins import str
 from future.utils import PY3
 
@@ -95,26 +97,16 @@ class bin_stream(object):
         if not temp:
             raise IOError('cannot get bytes')
 
-        # Init
-        start = start % 8
-        out = 0
-        while n:
-            # Get needed bits, working on maximum 8 bits at a time
-            cur_byte_idx = start // 8
-            new_bits = ord(temp[cur_byte_idx:cur_byte_idx + 1])
-            to_keep = 8 - start % 8
-            new_bits &= (1 << to_keep) - 1
-            cur_len = min(to_keep, n)
-            new_bits >>= (to_keep - cur_len)
-
-            # Update output
-            out <<= cur_len
-            out |= new_bits
-
-            # Update counters
-            n -= cur_len
-            start += cur_len
-        return out
+        if len(temp) < byte_stop - byte_start:
+            raise IOError('cannot get bytes')
+
+        # Extract the bits from the big endian integer made of read bytes
+        if PY3:
+            out = int.from_bytes(temp, "big")
+        else:
+            out = int(hexlify(temp), 16)
+        out >>= byte_stop * 8 - (start + n)
+        return out & ((1 << n) - 1)
 
     def get_u8(self, addr, endianness=None):
         """
@@ -285,6 +277,9 @@ class bin_stream_elf(bin_stream_container):
 
 class bin_stream_vm(bin_stream):
 
+    # Guest memory is cached by pages of PAGE_SIZE bytes
+    PAGE_SIZE = 0x1000
+
     def __init__(self, vm, offset=0, base_offset=0):
         self.offset = offset
         self.base_offset = base_offset
@@ -293,13 +288,44 @@ class bin_stream_vm(bin_stream):
             self.endianness = LITTLE_ENDIAN
         else:
             self.endianness = BIG_ENDIAN
+        # page address -> memoryview on its content, None if not fully mapped
+        self._pages = {}
+        # The cached pages are valid as long as the VmMngr write generation
+        # is unchanged, ie. no memory has been written, mapped or unmapped
+        self._generation = None
 
     def getlen(self):
         return 0xFFFFFFFFFFFFFFFF
 
+    def _get_page(self, page):
+        """Return the memoryview on the cached page at address @page, or None
+        if the page is not fully mapped"""
+        generation = self.vm.get_write_generation()
+        if generation != self._generation:
+            self._pages.clear()
+            self._generation = generation
+        else:
+            try:
+                return self._pages[page]
+            except KeyError:
+                pass
+        if self.vm.is_mapped(page, self.PAGE_SIZE):
+            data = memoryview(self.vm.get_mem(page, self.PAGE_SIZE))
+        else:
+            data = None
+        self._pages[page] = data
+        return data
+
     def _getbytes(self, start, l=1):
+        addr = start + self.base_offset
+        page = addr - addr % self.PAGE_SIZE
+        if 0 <= l and addr - page + l <= self.PAGE_SIZE:
+            data = self._get_page(page)
+            if data is not None:
+                return data[addr - page:addr - page + l].tobytes()
+        # Read across pages or from a partially mapped page
         try:
-            s = self.vm.get_mem(start + self.base_offset, l)
+            s = self.vm.get_mem(addr, l)
         except:
             raise IOError('cannot get mem ad', hex(start))
         return s
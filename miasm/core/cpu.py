@@ -14,7 +14,7 @@ import pyparsing
 from miasm.core.utils import decode_hex
 import miasm.expression.expression as m2_expr
 from miasm.core.bin_stream import bin_stream, bin_stream_str
-from miasm.core.utils import Disasm_Exception
+from miasm.core.utils import Disasm_Exception, BoundedDict
 from miasm.expression.simplifications import expr_simp
 from miasm.core.locationdb import LocationDB
 
@@ -28,6 +28,11 @@ console_handler.setFormatter(logging.Formatter("[%(levelname)-8s]: %(message)s")
 log.addHandler(console_handler)
 log.setLevel(logging.WARN)
 
+# Maximum number of assembled instructions kept by each architecture
+ASM_CACHE_SIZE = 10000
+# Maximum number of decoded instructions templates kept by each architecture
+DIS_CACHE_SIZE = 10000
+
 
 class bitobj(object):
 
@@ -923,6 +928,13 @@ def getfieldindexby_name(fields, fname):
 class metamn(type):
 
     def __new__(mcs, name, bases, dct):
+        if name.startswith('mn_'):
+            # (mnemonic name, arguments count) -> mnemonic classes
+            dct.setdefault('all_mn_name_args', defaultdict(list))
+            # Assembled instructions, see cls_mn.asm
+            dct.setdefault('asm_cache', BoundedDict(ASM_CACHE_SIZE))
+            # Decoded instructions templates, see cls_mn.intern_instruction
+            dct.setdefault('dis_cache', BoundedDict(DIS_CACHE_SIZE))
         if name == "cls_mn" or name.startswith('mn_'):
             return type.__new__(mcs, name, bases, dct)
         alias = dct.get('alias', False)
@@ -966,6 +978,7 @@ class metamn(type):
             i = c()
             i.init_class()
             bases[0].all_mn_inst[c].append(i)
+            bases[0].all_mn_name_args[(c.name, len(i.args))].append(c)
             add_candidate(bases, c)
             # gen byte lookup
             o = ""
@@ -979,7 +992,7 @@ class metamn(type):
 
 
 class instruction(object):
-    __slots__ = ["name", "mode", "args",
+    __slots__ = ["name", "mode", "_args",
                  "l", "b", "offset", "data",
                  "additional_info", "delayslot"]
 
@@ -992,6 +1005,37 @@ class instruction(object):
         self.l = None
         self.b = None
 
+    @property
+    def args(self):
+        """Instruction arguments (list of Expr)
+
+        Arguments may be stored as a tuple shared between instructions
+        decoded from the same bytes: the list is only built on first access.
+        """
+        args = self._args
+        if args.__class__ is tuple:
+            args = self._args = list(args)
+        return args
+
+    @args.setter
+    def args(self, args):
+        self._args = args
+
+    def __getstate__(self):
+        # Subclasses shadow some slots (such as delayslot) with class
+        # attributes: only save the slots actually set on the instance
+        state = {}
+        for name in instruction.__slots__:
+            try:
+                state[name] = instruction.__dict__[name].__get__(self)
+            except AttributeError:
+                pass
+        return state
+
+    def __setstate__(self, state):
+        for name, value in viewitems(state):
+            instruction.__dict__[name].__set__(self, value)
+
     def gen_args(self, args):
         out = ', '.join([str(x) for x in args])
         return out
@@ -1268,6 +1312,7 @@ class cls_mn(with_metaclass(metamn, object)):
             instr.b = cls.getbytes(bs, offset_o, instr.l)
             instr.offset = offset_o
             instr.get_info(c)
+            cls.intern_instruction(instr)
             if c.alias:
                 alias = True
             out.append(instr)
@@ -1290,6 +1335,26 @@ class cls_mn(with_metaclass(metamn, object)):
             )
         return out[0]
 
+    @classmethod
+    def intern_instruction(cls, instr):
+        """Share the decoded parts of @instr (arguments and bytes) with the
+        instructions previously decoded from the same bytes, whatever their
+        offsets
+
+        The arguments are shared as a tuple, see instruction.args. The
+        additional information is mutable (and modified by the semantics), so
+        each instruction keeps its own.
+        @instr: freshly decoded instruction
+        """
+        key = (instr.mode, instr.b)
+        template = cls.dis_cache.get(key)
+        args = tuple(instr._args)
+        if template is None or template[0] != instr.name or template[1] != args:
+            template = (instr.name, args, instr.b)
+            cls.dis_cache[key] = template
+        _, instr.args, instr.b = template
+        return instr
+
     @classmethod
     def fromstring(cls, text, loc_db, mode = None):
         global total_scans
@@ -1388,11 +1453,23 @@ class cls_mn(with_metaclass(metamn, object)):
         Re asm instruction by searching mnemo using name and args. We then
         can modify args and get the hex of a modified instruction
         """
-        clist = cls.all_mn_name[instr.name]
+        args = instr.resolve_args_with_symbols(symbols)
+        key = (
+            instr.name,
+            instr.mode,
+            cls.asm_info_key(instr),
+            tuple(instr.args),
+            tuple(args),
+        )
+        vals = cls.asm_cache.get(key)
+        if vals is not None:
+            return list(vals)
+
+        # Only consider mnemonics with the same number of arguments
+        clist = cls.all_mn_name_args[(instr.name, len(instr.args))]
         clist = [x for x in clist]
         vals = []
         candidates = []
-        args = instr.resolve_args_with_symbols(symbols)
 
         for cc in clist:
 
@@ -1424,7 +1501,14 @@ class cls_mn(with_metaclass(metamn, object)):
             log.debug('asm multiple args ret default')
 
         vals = cls.filter_asm_candidates(instr, candidates)
-        return vals
+        cls.asm_cache[key] = vals
+        return list(vals)
+
+    @classmethod
+    def asm_info_key(cls, instr):
+        """Return a hashable summary of the @instr additional information
+        used by the assembler"""
+        return None
 
     @classmethod
     def filter_asm_candidates(cls, instr, candidates):
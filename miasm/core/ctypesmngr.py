@@ -32,6 +32,11 @@ class CTypeBase(object):
         self.__repr = str(self)
         self.__hash = hash(self.__repr)
 
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # String hashes may be salted per process: recompute it
+        self.__hash = hash(self.__repr)
+
     @property
     def _typerepr(self):
         return self.__repr
@@ -338,9 +343,34 @@ class CAstTypes(object):
         self._typedefs = dict(knowntypedefs)
         self.cpt = 0
         self.loc_to_decl_info = {}
-        self.parser = c_parser.CParser()
         self._cpt_decl = 0
+        # Incremented on each type modification
+        self.generation = 0
+        self._init_rules()
+
+    def __getstate__(self):
+        """The pycparser instance and the rules are not serialised: a types
+        database can be saved (pickled) and reloaded without re-parsing the C
+        headers"""
+        state = dict(self.__dict__)
+        for name in ["_parser", "ast_to_typeid_rules", "ast_parse_rules"]:
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_rules()
+
+    @property
+    def parser(self):
+        """pycparser instance, built on first use"""
+        if self._parser is None:
+            self._parser = c_parser.CParser()
+        return self._parser
 
+    def _init_rules(self):
+        """Initialise the (non serialised) pycparser related attributes"""
+        self._parser = None
 
         self.ast_to_typeid_rules = {
             c_ast.Struct: self.ast_to_typeid_struct,
@@ -400,6 +430,7 @@ class CAstTypes(object):
             assert self._types[type_id] == type_obj
         else:
             self._types[type_id] = type_obj
+            self.generation += 1
 
     def add_typedef(self, type_new, type_src):
         """Add new typedef
@@ -407,6 +438,7 @@ class CAstTypes(object):
         @type_src: CTypeBase instance of the target type"""
         assert isinstance(type_src, CTypeBase)
         self._typedefs[type_new] = type_src
+        self.generation += 1
 
     def get_type(self, type_id):
         """Get ObjC corresponding to the @type_id
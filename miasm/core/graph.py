@@ -19,6 +19,9 @@ class DiGraph(object):
         self._nodes_succ = {}
         # N -> Nodes N2 with a edge (N2 -> N)
         self._nodes_pred = {}
+        # Cache of (head, is_postdominator) -> DominatorTree, reset
+        # on graph modification
+        self._dominator_trees = {}
 
     def __repr__(self):
         out = []
@@ -70,6 +73,7 @@ class DiGraph(object):
         """
         if node in self._nodes:
             return False
+        self._dominator_trees.clear()
         self._nodes.add(node)
         self._nodes_succ[node] = []
         self._nodes_pred[node] = []
@@ -79,6 +83,7 @@ class DiGraph(object):
         """Delete the @node of the graph; Also delete every edge to/from this
         @node"""
 
+        self._dominator_trees.clear()
         if node in self._nodes:
             self._nodes.remove(node)
         for pred in self.predecessors(node):
@@ -91,6 +96,7 @@ class DiGraph(object):
             self.add_node(src)
         if not dst in self._nodes:
             self.add_node(dst)
+        self._dominator_trees.clear()
         self._edges.append((src, dst))
         self._nodes_succ[src].append(dst)
         self._nodes_pred[dst].append(src)
@@ -102,6 +108,7 @@ class DiGraph(object):
             self.add_edge(src, dst)
 
     def del_edge(self, src, dst):
+        self._dominator_trees.clear()
         self._edges.remove((src, dst))
         self._nodes_succ[src].remove(dst)
         self._nodes_pred[dst].remove(src)
@@ -338,69 +345,104 @@ class DiGraph(object):
 
 
     @staticmethod
-    def _compute_generic_dominators(head, reachable_cb, prev_cb, next_cb):
-        """Generic algorithm to compute either the dominators or postdominators
-        of the graph.
+    def _compute_generic_idoms(head, prev_cb, next_cb):
+        """Generic algorithm to compute either the immediate dominators or
+        immediate postdominators of the graph.
+        Return a tuple (idoms, order), with idoms a dictionary node -> immediate
+        (post)dominator (@head excluded) and order the list of nodes reachable
+        from @head in reverse postorder.
+
+        Source: Cooper, Keith D., Timothy J. Harvey, and Ken Kennedy.
+        "A simple, fast dominance algorithm."
+        Software Practice & Experience 4 (2001)
+
         @head: the head/leaf of the graph
-        @reachable_cb: sons/parents of the head/leaf
         @prev_cb: return predecessors/successors of a node
         @next_cb: return successors/predecessors of a node
         """
 
-        nodes = set(reachable_cb(head))
-        dominators = {}
-        for node in nodes:
-            dominators[node] = set(nodes)
-
-        dominators[head] = set([head])
-        todo = set(nodes)
-
+        # Reverse postorder
+        order = []
+        done = set([head])
+        todo = [(head, iter(next_cb(head)))]
         while todo:
-            node = todo.pop()
-
-            # Heads state must not be changed
-            if node == head:
-                continue
-
-            # Compute intersection of all predecessors'dominators
-            new_dom = None
-            for pred in prev_cb(node):
-                if not pred in nodes:
-                    continue
-                if new_dom is None:
-                    new_dom = set(dominators[pred])
-                new_dom.intersection_update(dominators[pred])
-
-            # We are not a head to we have at least one dominator
-            assert(new_dom is not None)
-
-            new_dom.update(set([node]))
-
-            # If intersection has changed, add sons to the todo list
-            if new_dom == dominators[node]:
-                continue
-
-            dominators[node] = new_dom
-            for succ in next_cb(node):
-                todo.add(succ)
-        return dominators
+            node, sons = todo[-1]
+            for son in sons:
+                if son not in done:
+                    done.add(son)
+                    todo.append((son, iter(next_cb(son))))
+                    break
+            else:
+                todo.pop()
+                order.append(node)
+        order.reverse()
+        rank = {node: index for index, node in enumerate(order)}
+
+        idoms = {head: head}
+        modified = True
+        while modified:
+            modified = False
+            for node in order[1:]:
+                new_idom = None
+                for pred in prev_cb(node):
+                    # Skip unreachable or not yet processed predecessors
+                    if pred not in idoms:
+                        continue
+                    if new_idom is None:
+                        new_idom = pred
+                        continue
+                    # Intersect
+                    finger1, finger2 = pred, new_idom
+                    while finger1 != finger2:
+                        while rank[finger1] > rank[finger2]:
+                            finger1 = idoms[finger1]
+                        while rank[finger2] > rank[finger1]:
+                            finger2 = idoms[finger2]
+                    new_idom = finger1
+                if idoms.get(node, None) != new_idom:
+                    idoms[node] = new_idom
+                    modified = True
+        del idoms[head]
+        return idoms, order
+
+    def _get_generic_dominator_tree(self, head, post):
+        key = (head, post)
+        tree = self._dominator_trees.get(key, None)
+        if tree is not None:
+            return tree
+        if post:
+            nodes = set(self.reachable_parents(head))
+            idoms, order = self._compute_generic_idoms(head,
+                                                       self.successors_iter,
+                                                       self.predecessors_iter)
+        else:
+            nodes = set(self.reachable_sons(head))
+            idoms, order = self._compute_generic_idoms(head,
+                                                       self.predecessors_iter,
+                                                       self.successors_iter)
+        # Keep the historical (reachable nodes set) iteration order
+        idoms = {node: idoms[node] for node in nodes if node != head}
+        tree = DominatorTree(head, idoms, order)
+        self._dominator_trees[key] = tree
+        return tree
+
+    def get_dominator_tree(self, head):
+        """Return the DominatorTree of the graph rooted at @head. The result
+        is cached until the graph is modified"""
+        return self._get_generic_dominator_tree(head, False)
+
+    def get_postdominator_tree(self, leaf):
+        """Return the postdominators DominatorTree of the graph rooted at
+        @leaf. The result is cached until the graph is modified"""
+        return self._get_generic_dominator_tree(leaf, True)
 
     def compute_dominators(self, head):
         """Compute the dominators of the graph"""
-        return self._compute_generic_dominators(head,
-                                                self.reachable_sons,
-                                                self.predecessors_iter,
-                                                self.successors_iter)
+        return self.get_dominator_tree(head).get_dominators_sets()
 
     def compute_postdominators(self, leaf):
         """Compute the postdominators of the graph"""
-        return self._compute_generic_dominators(leaf,
-                                                self.reachable_parents,
-                                                self.successors_iter,
-                                                self.predecessors_iter)
-
-
-
+        return self.get_postdominator_tree(leaf).get_dominators_sets()
 
     def compute_dominator_tree(self, head):
         """
@@ -488,27 +530,11 @@ class DiGraph(object):
 
     def compute_immediate_dominators(self, head):
         """Compute the immediate dominators of the graph"""
-        dominators = self.compute_dominators(head)
-        idoms = {}
-
-        for node in dominators:
-            for predecessor in self.walk_dominators(node, dominators):
-                if predecessor in dominators[node] and node != predecessor:
-                    idoms[node] = predecessor
-                    break
-        return idoms
+        return dict(self.get_dominator_tree(head).idoms)
 
     def compute_immediate_postdominators(self,tail):
         """Compute the immediate postdominators of the graph"""
-        postdominators = self.compute_postdominators(tail)
-        ipdoms = {}
-
-        for node in postdominators:
-            for successor in self.walk_postdominators(node, postdominators):
-                if successor in postdominators[node] and node != successor:
-                    ipdoms[node] = successor
-                    break
-        return ipdoms
+        return dict(self.get_postdominator_tree(tail).idoms)
 
     def compute_dominance_frontier(self, head):
         """
@@ -518,7 +544,7 @@ class DiGraph(object):
         "A simple, fast dominance algorithm."
         Software Practice & Experience 4 (2001), p. 9
         """
-        idoms = self.compute_immediate_dominators(head)
+        idoms = self.get_dominator_tree(head).idoms
         frontier = {}
 
         for node in idoms:
@@ -775,6 +801,101 @@ class DiGraph(object):
                 successor = new_node
             self.add_uniq_edge(new_node, successor)
 
+class DominatorTree(object):
+    """
+    Dominator (or postdominator) tree of a DiGraph, see
+    DiGraph.get_dominator_tree and DiGraph.get_postdominator_tree.
+
+    Nodes are numbered in a depth first walk of the tree, so that dominance
+    queries are answered in constant time.
+    """
+
+    def __init__(self, head, idoms, order):
+        """
+        @head: root of the tree
+        @idoms: dictionary node -> immediate dominator (@head excluded)
+        @order: nodes of the tree in reverse postorder of the original graph
+        """
+        self._head = head
+        self._idoms = idoms
+        self._order = order
+        self._children = {}
+        for node in order[1:]:
+            self._children.setdefault(idoms[node], []).append(node)
+
+        # Preorder / postorder numbering of the tree
+        self._pre = {}
+        self._post = {}
+        counter = 0
+        todo = [(head, iter(self._children.get(head, [])))]
+        self._pre[head] = counter
+        while todo:
+            node, sons = todo[-1]
+            counter += 1
+            for son in sons:
+                self._pre[son] = counter
+                todo.append((son, iter(self._children.get(son, []))))
+                break
+            else:
+                todo.pop()
+                self._post[node] = counter
+
+    head = property(lambda self: self._head)
+
+    @property
+    def idoms(self):
+        """Dictionary node -> immediate dominator (head excluded)"""
+        return self._idoms
+
+    def __contains__(self, node):
+        return node in self._pre
+
+    def __iter__(self):
+        """Iterate on the nodes, in reverse postorder of the original graph"""
+        return iter(self._order)
+
+    def __len__(self):
+        return len(self._order)
+
+    def get_idom(self, node):
+        """Return the immediate dominator of @node, or None for the head"""
+        return self._idoms.get(node, None)
+
+    def get_children(self, node):
+        """Return the nodes immediately dominated by @node"""
+        return list(self._children.get(node, []))
+
+    def dominates(self, node_a, node_b):
+        """Return True if @node_a dominates @node_b (a node dominates
+        itself)"""
+        if node_a not in self._pre or node_b not in self._pre:
+            return False
+        return (self._pre[node_a] <= self._pre[node_b] and
+                self._post[node_b] <= self._post[node_a])
+
+    def strictly_dominates(self, node_a, node_b):
+        """Return True if @node_a dominates @node_b and is not @node_b"""
+        return node_a != node_b and self.dominates(node_a, node_b)
+
+    def walk_dominators(self, node):
+        """Iterate on the dominators of @node, from its immediate dominator to
+        the head"""
+        node = self._idoms.get(node, None)
+        while node is not None:
+            yield node
+            node = self._idoms.get(node, None)
+
+    def get_dominators_sets(self):
+        """Return a dictionary node -> set of its dominators (including
+        itself)"""
+        dominators = {self._head: set([self._head])}
+        for node in self._order[1:]:
+            node_doms = set(dominators[self._idoms[node]])
+            node_doms.add(node)
+            dominators[node] = node_doms
+        return dominators
+
+
 class DiGraphSimplifier(object):
 
     """Wrapper on graph simplification passes.
@@ -1,4 +1,5 @@
 from __future__ import print_function
+from bisect import bisect_left, bisect_right
 
 INT_EQ = 0      # Equivalent
 INT_B_IN_A = 1  # B in A
@@ -8,6 +9,9 @@ INT_JOIN = 3    # Overlap
 INT_JOIN_AB = 4 # B starts at the end of A
 INT_JOIN_BA = 5 # A starts at the end of B
 
+# Upper bound of any interval bound, used to bisect on (start, stop) couples
+INT_INF = float("inf")
+
 
 def cmp_interval(inter1, inter2):
     """Compare @inter1 and @inter2 and returns the associated INT_* case
@@ -35,7 +39,10 @@ def cmp_interval(inter1, inter2):
 class interval(object):
     """Stands for intervals with integer bounds
 
-    Offers common methods to work with interval"""
+    Offers common methods to work with interval
+
+    Bounds are kept as a sorted list of disjoint, non adjacent (start, stop)
+    couples, so point and overlap queries are bisections"""
 
     def __init__(self, bounds=None):
         """Instance an interval object
@@ -60,32 +67,15 @@ class interval(object):
         Return a cannonizes list of intervals
         @tmp: list of (int, int)
         """
-        tmp = sorted([x for x in tmp if x[0] <= x[1]])
         out = []
-        if not tmp:
-            return out
-        out.append(tmp.pop())
-        while tmp:
-            x = tmp.pop()
-            rez = cmp_interval(out[-1], x)
-
-            if rez == INT_EQ:
-                continue
-            elif rez == INT_DISJOIN:
-                out.append(x)
-            elif rez == INT_B_IN_A:
-                continue
-            elif rez in [INT_JOIN, INT_JOIN_AB, INT_JOIN_BA, INT_A_IN_B]:
-                u, v = x
-                while out and cmp_interval(out[-1], (u, v)) in [
-                    INT_JOIN, INT_JOIN_AB, INT_JOIN_BA, INT_A_IN_B]:
-                    u = min(u, out[-1][0])
-                    v = max(v, out[-1][1])
-                    out.pop()
-                out.append((u, v))
+        for start, stop in sorted(x for x in tmp if x[0] <= x[1]):
+            if out and start <= out[-1][1] + 1:
+                # Overlapping or adjacent intervals are merged
+                if stop > out[-1][1]:
+                    out[-1] = (out[-1][0], stop)
             else:
-                raise ValueError('unknown state', rez)
-        return out[::-1]
+                out.append((start, stop))
+        return out
 
     def cannon(self):
         "Apply .cannon_list() on self contained intervals"
@@ -102,22 +92,69 @@ class interval(object):
             o = "[]"
         return o
 
+    def _index(self, offset):
+        """Return the index of the last interval starting at or before
+        @offset (-1 if none)"""
+        return bisect_right(self.intervals, (offset, INT_INF)) - 1
+
     def __contains__(self, other):
         if isinstance(other, interval):
-            for intervalB in other.intervals:
-                is_in = False
-                for intervalA in self.intervals:
-                    if cmp_interval(intervalA, intervalB) in [INT_EQ, INT_B_IN_A]:
-                        is_in = True
-                        break
-                if not is_in:
+            for start, stop in other.intervals:
+                # @other is cannon: each of its intervals must be included in
+                # a single interval of self
+                index = self._index(start)
+                if index < 0 or self.intervals[index][1] < stop:
                     return False
             return True
         else:
-            for intervalA in self.intervals:
-                if intervalA[0] <= other <= intervalA[1]:
-                    return True
+            index = self._index(other)
+            return index >= 0 and self.intervals[index][1] >= other
+
+    def overlaps(self, start, stop):
+        """Return True iff [@start, @stop] shares at least one element with
+        self
+        @start, @stop: int
+        """
+        if start > stop:
             return False
+        index = self._index(stop)
+        return index >= 0 and self.intervals[index][1] >= start
+
+    def add(self, start, stop):
+        """In-place union with [@start, @stop]
+        @start, @stop: int
+        """
+        if start > stop:
+            return
+        intervals = self.intervals
+        # Intervals overlapping or adjacent to [start, stop] are merged
+        first = bisect_left(intervals, (start,))
+        if first > 0 and intervals[first - 1][1] >= start - 1:
+            first -= 1
+        last = bisect_right(intervals, (stop + 1, INT_INF))
+        if first < last:
+            start = min(start, intervals[first][0])
+            stop = max(stop, intervals[last - 1][1])
+        intervals[first:last] = [(start, stop)]
+
+    def remove(self, start, stop):
+        """In-place difference with [@start, @stop]
+        @start, @stop: int
+        """
+        if start > stop:
+            return
+        intervals = self.intervals
+        first = self._index(start)
+        if first < 0 or intervals[first][1] < start:
+            first += 1
+        last = bisect_right(intervals, (stop, INT_INF))
+        remaining = []
+        if first < last:
+            if intervals[first][0] < start:
+                remaining.append((intervals[first][0], start - 1))
+            if intervals[last - 1][1] > stop:
+                remaining.append((stop + 1, intervals[last - 1][1]))
+        intervals[first:last] = remaining
 
     def __eq__(self, i):
         return self.intervals == i.intervals
@@ -133,6 +170,7 @@ class interval(object):
 
         if isinstance(other, interval):
             other = other.intervals
+        # Both lists are sorted: the sort in cannon_list is linear
         other = interval(self.intervals + other)
         return other
 
@@ -142,54 +180,27 @@ class interval(object):
         @other: interval instance
         """
 
-        to_test = self.intervals[:]
-        i = -1
-        to_del = other.intervals[:]
-        while i < len(to_test) - 1:
-            i += 1
-            x = to_test[i]
-            if x[0] > x[1]:
-                del to_test[i]
-                i -= 1
-                continue
-
-            while to_del and to_del[0][1] < x[0]:
-                del to_del[0]
-
-            for y in to_del:
-                if y[0] > x[1]:
-                    break
-                rez = cmp_interval(x, y)
-                if rez == INT_DISJOIN:
-                    continue
-                elif rez == INT_EQ:
-                    del to_test[i]
-                    i -= 1
-                    break
-                elif rez == INT_A_IN_B:
-                    del to_test[i]
-                    i -= 1
-                    break
-                elif rez == INT_B_IN_A:
-                    del to_test[i]
-                    i1 = (x[0], y[0] - 1)
-                    i2 = (y[1] + 1, x[1])
-                    to_test[i:i] = [i1, i2]
-                    i -= 1
-                    break
-                elif rez in [INT_JOIN_AB, INT_JOIN_BA]:
-                    continue
-                elif rez == INT_JOIN:
-                    del to_test[i]
-                    if x[0] < y[0]:
-                        to_test[i:i] = [(x[0], y[0] - 1)]
-                    else:
-                        to_test[i:i] = [(y[1] + 1, x[1])]
-                    i -= 1
+        if not isinstance(other, interval):
+            other = interval(other)
+        to_del = other.intervals
+        out = []
+        index = 0
+        for start, stop in self.intervals:
+            # Skip removed intervals located before the current one
+            while index < len(to_del) and to_del[index][1] < start:
+                index += 1
+            cur = index
+            while cur < len(to_del) and to_del[cur][0] <= stop:
+                del_start, del_stop = to_del[cur]
+                if del_start > start:
+                    out.append((start, del_start - 1))
+                start = max(start, del_stop + 1)
+                if del_stop > stop:
                     break
-                else:
-                    raise ValueError('unknown state', rez)
-        return interval(to_test)
+                cur += 1
+            if start <= stop:
+                out.append((start, stop))
+        return interval(out)
 
     def intersection(self, other):
         """
@@ -197,36 +208,22 @@ class interval(object):
         @other: interval instance
         """
 
+        if not isinstance(other, interval):
+            other = interval(other)
+        intervals_a, intervals_b = self.intervals, other.intervals
         out = []
-        for x in self.intervals:
-            if x[0] > x[1]:
-                continue
-            for y in other.intervals:
-                rez = cmp_interval(x, y)
-
-                if rez == INT_DISJOIN:
-                    continue
-                elif rez == INT_EQ:
-                    out.append(x)
-                    continue
-                elif rez == INT_A_IN_B:
-                    out.append(x)
-                    continue
-                elif rez == INT_B_IN_A:
-                    out.append(y)
-                    continue
-                elif rez == INT_JOIN_AB:
-                    continue
-                elif rez == INT_JOIN_BA:
-                    continue
-                elif rez == INT_JOIN:
-                    if x[0] < y[0]:
-                        out.append((y[0], x[1]))
-                    else:
-                        out.append((x[0], y[1]))
-                    continue
-                else:
-                    raise ValueError('unknown state', rez)
+        index_a, index_b = 0, 0
+        while index_a < len(intervals_a) and index_b < len(intervals_b):
+            start_a, stop_a = intervals_a[index_a]
+            start_b, stop_b = intervals_b[index_b]
+            start, stop = max(start_a, start_b), min(stop_a, stop_b)
+            if start <= stop:
+                out.append((start, stop))
+            # Move forward on the interval ending first
+            if stop_a < stop_b:
+                index_a += 1
+            else:
+                index_b += 1
         return interval(out)
 
 
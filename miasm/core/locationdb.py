@@ -1,4 +1,5 @@
 import warnings
+from bisect import bisect_left
 from builtins import int as int_types
 
 from functools import reduce
@@ -52,17 +53,79 @@ class LocationDB(object):
     """
 
     def __init__(self):
-        # Known LocKeys
-        self._loc_keys = set()
+        # Locations are identified by their LocKey.key, an integer id. Per-id
+        # information is stored in compact arrays, LocKey instances being
+        # built on demand
+
+        # id -> 1 if the location exists, 0 once removed
+        self._alive = bytearray()
+        # id -> offset, None if none
+        self._offsets = []
 
         # Association tables
-        self._loc_key_to_offset = {}
-        self._loc_key_to_names = {}
-        self._name_to_loc_key = {}
-        self._offset_to_loc_key = {}
+        self._key_to_names = {}
+        self._name_to_key = {}
+        self._offset_to_key = {}
+
+        # Sorted known offsets, for range queries (None if to rebuild)
+        self._sorted_offsets = []
+        # Frozenset of the alive LocKeys (None if to rebuild)
+        self._loc_keys = None
 
-        # Counter for new LocKey generation
-        self._loc_key_num = 0
+    def is_known(self, loc_key):
+        """Return True iff @loc_key is a location of this LocationDB
+        @loc_key: LocKey instance
+        """
+        key = loc_key.key
+        return 0 <= key < len(self._alive) and self._alive[key] == 1
+
+    def _new_keys(self, offsets):
+        """Create one location per offset of the list @offsets (an offset may
+        be None) and return the id of the first one. Offsets must be unknown
+        and distinct"""
+        first_key = len(self._offsets)
+        self._offsets.extend(offsets)
+        self._alive.extend(b"\x01" * len(offsets))
+        self._loc_keys = None
+        new_offsets = [offset for offset in offsets if offset is not None]
+        self._offset_to_key.update(
+            (offset, key)
+            for key, offset in enumerate(offsets, first_key)
+            if offset is not None
+        )
+        sorted_offsets = self._sorted_offsets
+        if sorted_offsets is not None and new_offsets:
+            if ((not sorted_offsets or sorted_offsets[-1] < new_offsets[0]) and
+                new_offsets == sorted(new_offsets)):
+                sorted_offsets += new_offsets
+            else:
+                # Rebuild the index on next query
+                self._sorted_offsets = None
+        return first_key
+
+    def _set_offset(self, key, offset):
+        """Associate the unknown offset @offset to the location @key"""
+        self._offsets[key] = offset
+        self._offset_to_key[offset] = key
+        sorted_offsets = self._sorted_offsets
+        if sorted_offsets is not None:
+            if not sorted_offsets or sorted_offsets[-1] < offset:
+                sorted_offsets.append(offset)
+            else:
+                self._sorted_offsets = None
+
+    def _unset_offset(self, key):
+        """Disassociate the location @key from its offset, if any"""
+        offset = self._offsets[key]
+        if offset is None:
+            return
+        self._offsets[key] = None
+        del self._offset_to_key[offset]
+        sorted_offsets = self._sorted_offsets
+        if sorted_offsets and sorted_offsets[-1] == offset:
+            sorted_offsets.pop()
+        else:
+            self._sorted_offsets = None
 
     def get_location_offset(self, loc_key):
         """
@@ -70,7 +133,9 @@ class LocationDB(object):
         @loc_key: LocKey instance
         """
         assert isinstance(loc_key, LocKey)
-        return self._loc_key_to_offset.get(loc_key)
+        if not self.is_known(loc_key):
+            return None
+        return self._offsets[loc_key.key]
 
     def get_location_names(self, loc_key):
         """
@@ -78,7 +143,7 @@ class LocationDB(object):
         @loc_key: LocKey instance
         """
         assert isinstance(loc_key, LocKey)
-        return frozenset(self._loc_key_to_names.get(loc_key, set()))
+        return frozenset(self._key_to_names.get(loc_key.key, set()))
 
     def get_name_location(self, name):
         """
@@ -86,7 +151,10 @@ class LocationDB(object):
         @name: target name
         """
         name = force_bytes(name)
-        return self._name_to_loc_key.get(name)
+        key = self._name_to_key.get(name)
+        if key is None:
+            return None
+        return LocKey(key)
 
     def get_or_create_name_location(self, name):
         """
@@ -94,7 +162,7 @@ class LocationDB(object):
         @name: target name
         """
         name = force_bytes(name)
-        loc_key = self._name_to_loc_key.get(name)
+        loc_key = self.get_name_location(name)
         if loc_key is not None:
             return loc_key
         return self.add_location(name=name)
@@ -104,18 +172,38 @@ class LocationDB(object):
         Return the LocKey of @offset if any, None otherwise.
         @offset: target offset
         """
-        return self._offset_to_loc_key.get(offset)
+        key = self._offset_to_key.get(offset)
+        if key is None:
+            return None
+        return LocKey(key)
 
     def get_or_create_offset_location(self, offset):
         """
         Return the LocKey of @offset if any, create one otherwise.
         @offset: target offset
         """
-        loc_key = self._offset_to_loc_key.get(offset)
+        loc_key = self.get_offset_location(offset)
         if loc_key is not None:
             return loc_key
         return self.add_location(offset=offset)
 
+    def get_range_locations(self, start, stop):
+        """
+        Return the LocKeys whose offset is in [@start, @stop[, sorted by
+        offset
+        @start, @stop: offsets
+        """
+        if self._sorted_offsets is None:
+            self._sorted_offsets = sorted(self._offset_to_key)
+        sorted_offsets = self._sorted_offsets
+        return [
+            LocKey(self._offset_to_key[offset])
+            for offset in sorted_offsets[
+                bisect_left(sorted_offsets, start):
+                bisect_left(sorted_offsets, stop)
+            ]
+        ]
+
     def get_name_offset(self, name):
         """
         Return the offset of @name if any, None otherwise.
@@ -133,13 +221,13 @@ class LocationDB(object):
         @loc_key: LocKey instance
         """
         name = force_bytes(name)
-        assert loc_key in self._loc_keys
-        already_existing_loc = self._name_to_loc_key.get(name)
-        if already_existing_loc is not None and already_existing_loc != loc_key:
+        assert self.is_known(loc_key)
+        already_existing_key = self._name_to_key.get(name)
+        if already_existing_key is not None and already_existing_key != loc_key.key:
             raise KeyError("%r is already associated to a different loc_key "
-                           "(%r)" % (name, already_existing_loc))
-        self._loc_key_to_names.setdefault(loc_key, set()).add(name)
-        self._name_to_loc_key[name] = loc_key
+                           "(%r)" % (name, LocKey(already_existing_key)))
+        self._key_to_names.setdefault(loc_key.key, set()).add(name)
+        self._name_to_key[name] = loc_key.key
 
     def remove_location_name(self, loc_key, name):
         """Disassociate a name @name from a given @loc_key
@@ -147,16 +235,16 @@ class LocationDB(object):
         @name: str instance
         @loc_key: LocKey instance
         """
-        assert loc_key in self._loc_keys
+        assert self.is_known(loc_key)
         name = force_bytes(name)
-        already_existing_loc = self._name_to_loc_key.get(name)
-        if already_existing_loc is None:
+        already_existing_key = self._name_to_key.get(name)
+        if already_existing_key is None:
             raise KeyError("%r is not already associated" % name)
-        if already_existing_loc != loc_key:
+        if already_existing_key != loc_key.key:
             raise KeyError("%r is already associated to a different loc_key "
-                           "(%r)" % (name, already_existing_loc))
-        del self._name_to_loc_key[name]
-        self._loc_key_to_names[loc_key].remove(name)
+                           "(%r)" % (name, LocKey(already_existing_key)))
+        del self._name_to_key[name]
+        self._key_to_names[loc_key.key].remove(name)
 
     def set_location_offset(self, loc_key, offset, force=False):
         """Associate the offset @offset to an LocKey @loc_key
@@ -164,14 +252,15 @@ class LocationDB(object):
         If @force is set, override silently. Otherwise, if an offset is already
         associated to @loc_key, an error will be raised
         """
-        assert loc_key in self._loc_keys
+        assert self.is_known(loc_key)
         already_existing_loc = self.get_offset_location(offset)
         if already_existing_loc is not None and already_existing_loc != loc_key:
             raise KeyError("%r is already associated to a different loc_key "
                            "(%r)" % (offset, already_existing_loc))
-        already_existing_off = self._loc_key_to_offset.get(loc_key)
-        if (already_existing_off is not None and
-            already_existing_off != offset):
+        already_existing_off = self._offsets[loc_key.key]
+        if already_existing_off == offset:
+            return
+        if already_existing_off is not None:
             if not force:
                 raise ValueError(
                     "%r already has an offset (0x%x). Use 'force=True'"
@@ -180,8 +269,7 @@ class LocationDB(object):
                     ))
             else:
                 self.unset_location_offset(loc_key)
-        self._offset_to_loc_key[offset] = loc_key
-        self._loc_key_to_offset[loc_key] = offset
+        self._set_offset(loc_key.key, offset)
 
     def unset_location_offset(self, loc_key):
         """Disassociate LocKey @loc_key's offset
@@ -189,25 +277,35 @@ class LocationDB(object):
         Fail if there is already no offset associate with it
         @loc_key: LocKey
         """
-        assert loc_key in self._loc_keys
-        already_existing_off = self._loc_key_to_offset.get(loc_key)
-        if already_existing_off is None:
+        assert self.is_known(loc_key)
+        if self._offsets[loc_key.key] is None:
             raise ValueError("%r already has no offset" % (loc_key))
-        del self._offset_to_loc_key[already_existing_off]
-        del self._loc_key_to_offset[loc_key]
+        self._unset_offset(loc_key.key)
 
     def consistency_check(self):
         """Ensure internal structures are consistent with each others"""
-        assert set(self._loc_key_to_names).issubset(self._loc_keys)
-        assert set(self._loc_key_to_offset).issubset(self._loc_keys)
-        assert self._loc_key_to_offset == {v: k for k, v in viewitems(self._offset_to_loc_key)}
+        assert len(self._alive) == len(self._offsets)
+        for key, alive in enumerate(self._alive):
+            assert alive or self._offsets[key] is None
+            assert alive or key not in self._key_to_names
+        assert self._offset_to_key == {
+            offset: key
+            for key, offset in enumerate(self._offsets)
+            if offset is not None
+        }
         assert reduce(
             lambda x, y:x.union(y),
-            viewvalues(self._loc_key_to_names),
+            viewvalues(self._key_to_names),
             set(),
-        ) == set(self._name_to_loc_key)
-        for name, loc_key in viewitems(self._name_to_loc_key):
-            assert name in self._loc_key_to_names[loc_key]
+        ) == set(self._name_to_key)
+        for name, key in viewitems(self._name_to_key):
+            assert name in self._key_to_names[key]
+        if self._sorted_offsets is not None:
+            assert self._sorted_offsets == sorted(self._offset_to_key)
+        if self._loc_keys is not None:
+            assert self._loc_keys == set(
+                LocKey(key) for key, alive in enumerate(self._alive) if alive
+            )
 
     def find_free_name(self, name):
         """
@@ -294,35 +392,50 @@ class LocationDB(object):
                 return offset_loc_key
 
         # No collision, this is a brand new location
-        loc_key = LocKey(self._loc_key_num)
-        self._loc_key_num += 1
-        self._loc_keys.add(loc_key)
+        loc_key = LocKey(len(self._offsets))
+        self._offsets.append(None)
+        self._alive.append(1)
+        self._loc_keys = None
 
         if offset is not None:
-            assert offset not in self._offset_to_loc_key
-            self._offset_to_loc_key[offset] = loc_key
-            self._loc_key_to_offset[loc_key] = offset
+            self._set_offset(loc_key.key, offset)
 
         if name is not None:
-            self._name_to_loc_key[name] = loc_key
-            self._loc_key_to_names[loc_key] = set([name])
+            self._name_to_key[name] = loc_key.key
+            self._key_to_names[loc_key.key] = set([name])
 
         return loc_key
 
+    def add_locations(self, offsets):
+        """Return the list of LocKeys associated to each offset of @offsets,
+        creating the missing locations at once
+        @offsets: iterable of offsets
+        """
+        offset_to_key = self._offset_to_key
+        offsets = [int(offset) for offset in offsets]
+        new_offsets = []
+        seen = set()
+        for offset in offsets:
+            if offset not in offset_to_key and offset not in seen:
+                seen.add(offset)
+                new_offsets.append(offset)
+        self._new_keys(new_offsets)
+        return [LocKey(offset_to_key[offset]) for offset in offsets]
+
     def remove_location(self, loc_key):
         """
         Delete the location corresponding to @loc_key
         @loc_key: LocKey instance
         """
         assert isinstance(loc_key, LocKey)
-        if loc_key not in self._loc_keys:
+        if not self.is_known(loc_key):
             raise KeyError("Unknown loc_key %r" % loc_key)
-        names = self._loc_key_to_names.pop(loc_key, [])
+        names = self._key_to_names.pop(loc_key.key, [])
         for name in names:
-            del self._name_to_loc_key[name]
-        offset = self._loc_key_to_offset.pop(loc_key, None)
-        self._offset_to_loc_key.pop(offset, None)
-        self._loc_keys.remove(loc_key)
+            del self._name_to_key[name]
+        self._unset_offset(loc_key.key)
+        self._alive[loc_key.key] = 0
+        self._loc_keys = None
 
     def pretty_str(self, loc_key):
         """Return a human readable version of @loc_key, according to information
@@ -345,22 +458,27 @@ class LocationDB(object):
 
     @property
     def loc_keys(self):
-        """Return all loc_keys"""
+        """Return all loc_keys, as a frozenset
+        Use is_known to test a single LocKey"""
+        if self._loc_keys is None:
+            self._loc_keys = frozenset(
+                LocKey(key) for key, alive in enumerate(self._alive) if alive
+            )
         return self._loc_keys
 
     @property
     def names(self):
         """Return all known names"""
-        return list(self._name_to_loc_key)
+        return list(self._name_to_key)
 
     @property
     def offsets(self):
         """Return all known offsets"""
-        return list(self._offset_to_loc_key)
+        return list(self._offset_to_key)
 
     def __str__(self):
         out = []
-        for loc_key in self._loc_keys:
+        for loc_key in self.loc_keys:
             names = self.get_location_names(loc_key)
             offset = self.get_location_offset(loc_key)
             out.append(
@@ -375,26 +493,47 @@ class LocationDB(object):
     def merge(self, location_db):
         """Merge with another LocationDB @location_db
 
+        A location of @location_db is merged with the location sharing its
+        offset or one of its names, if any. New locations are created at once.
+
         WARNING: old reference to @location_db information (such as LocKeys)
         must be retrieved from the updated version of this instance. The
         dedicated "get_*" APIs may be used for this task
         """
         # A simple merge is not doable here, because LocKey will certainly
         # collides
-
-        for foreign_loc_key in location_db.loc_keys:
-            foreign_names = location_db.get_location_names(foreign_loc_key)
-            foreign_offset = location_db.get_location_offset(foreign_loc_key)
-            if foreign_names:
-                init_name = list(foreign_names)[0]
-            else:
-                init_name = None
-            loc_key = self.add_location(offset=foreign_offset, name=init_name,
-                                        strict=False)
-            cur_names = self.get_location_names(loc_key)
-            for name in foreign_names:
-                if name not in cur_names and name != init_name:
-                    self.add_location_name(loc_key, name=name)
+        foreign_to_key = {}
+        foreign_new = []
+        new_offsets = []
+        for foreign_key, alive in enumerate(location_db._alive):
+            if not alive:
+                continue
+            offset = location_db._offsets[foreign_key]
+            key = None
+            if offset is not None:
+                key = self._offset_to_key.get(offset)
+            if key is None:
+                for name in location_db._key_to_names.get(foreign_key, []):
+                    key = self._name_to_key.get(name)
+                    if key is not None:
+                        break
+            if key is None:
+                # Brand new location, created in batch below
+                foreign_new.append(foreign_key)
+                new_offsets.append(offset)
+                continue
+            foreign_to_key[foreign_key] = key
+            if offset is not None:
+                self.set_location_offset(LocKey(key), offset)
+
+        first_key = self._new_keys(new_offsets)
+        for index, foreign_key in enumerate(foreign_new):
+            foreign_to_key[foreign_key] = first_key + index
+
+        for foreign_key, names in viewitems(location_db._key_to_names):
+            loc_key = LocKey(foreign_to_key[foreign_key])
+            for name in names:
+                self.add_location_name(loc_key, name)
 
     def canonize_to_exprloc(self, expr):
         """
@@ -414,21 +553,21 @@ class LocationDB(object):
     def items(self):
         """Return all loc_keys"""
         warnings.warn('DEPRECATION WARNING: use "loc_keys" instead of "items"')
-        return list(self._loc_keys)
+        return list(self.loc_keys)
 
     def __getitem__(self, item):
         warnings.warn('DEPRECATION WARNING: use "get_name_location" or '
                       '"get_offset_location"')
-        if item in self._name_to_loc_key:
-            return self._name_to_loc_key[item]
-        if item in self._offset_to_loc_key:
-            return self._offset_to_loc_key[item]
+        if item in self._name_to_key:
+            return LocKey(self._name_to_key[item])
+        if item in self._offset_to_key:
+            return LocKey(self._offset_to_key[item])
         raise KeyError('unknown symbol %r' % item)
 
     def __contains__(self, item):
         warnings.warn('DEPRECATION WARNING: use "get_name_location" or '
                       '"get_offset_location", or ".offsets" or ".names"')
-        return item in self._name_to_loc_key or item in self._offset_to_loc_key
+        return item in self._name_to_key or item in self._offset_to_key
 
     def loc_key_to_name(self, loc_key):
         """[DEPRECATED API], see 'get_location_names'"""
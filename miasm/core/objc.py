@@ -9,6 +9,7 @@ from builtins import zip
 from builtins import int as int_types
 
 import warnings
+from bisect import bisect_left, bisect_right
 from pycparser import c_parser, c_ast
 from functools import total_ordering
 
@@ -266,10 +267,30 @@ class ObjCStruct(ObjC):
         super(ObjCStruct, self).__init__(align, size)
         self._name = name
         self._fields = tuple(fields)
+        self._fields_offsets = None
 
     name = property(lambda self: self._name)
     fields = property(lambda self: self._fields)
 
+    def get_field_at(self, offset):
+        """Return the (name, objtype, offset, size) field containing the byte
+        at @offset, or None
+        @offset: offset (in bytes) from the structure start
+        """
+        if self._fields_offsets is None:
+            # Fields are sorted by offset
+            self._fields_offsets = [field[2] for field in self._fields]
+        index = bisect_right(self._fields_offsets, offset)
+        if not index:
+            return None
+        # Null sized fields may share their offset with the next one
+        start = bisect_left(self._fields_offsets, self._fields_offsets[index - 1])
+        for field in self._fields[start:index]:
+            _, _, field_offset, size = field
+            if field_offset <= offset < field_offset + size:
+                return field
+        return None
+
     def __hash__(self):
         return hash((super(ObjCStruct, self).__hash__(), self._name))
 
@@ -952,17 +973,15 @@ class ExprToAccessC(ExprReducer):
                 # In this case, return the struct*
                 return set([cgenobj])
 
-            for fieldname, subtype, field_offset, size in base_type.fields:
-                if not field_offset <= offset < field_offset + size:
-                    continue
-                fieldptr = CGenField(CGenDeref(cgenobj), fieldname, subtype,
-                                     void_type.align, void_type.size)
-                new_type = self.cgen_access(fieldptr, subtype,
-                                            offset - field_offset,
-                                            deref, lvl + 1)
-                break
-            else:
+            field = base_type.get_field_at(offset)
+            if field is None:
                 return set()
+            fieldname, subtype, field_offset, size = field
+            fieldptr = CGenField(CGenDeref(cgenobj), fieldname, subtype,
+                                 void_type.align, void_type.size)
+            new_type = self.cgen_access(fieldptr, subtype,
+                                        offset - field_offset,
+                                        deref, lvl + 1)
         elif isinstance(base_type, ObjCArray):
             if base_type.objtype.size == 0:
                 missing_definition(base_type.objtype)
@@ -1415,6 +1434,17 @@ class CTypesManager(object):
     def __init__(self, types_ast, leaf_types):
         self.types_ast = types_ast
         self.leaf_types = leaf_types
+        # CType -> resolved ObjC, for the types_ast generation
+        # _objc_cache_generation
+        self._objc_cache = {}
+        self._objc_cache_generation = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        # ObjC may be recursive: do not serialise the cache
+        state["_objc_cache"] = {}
+        state["_objc_cache_generation"] = None
+        return state
 
     @property
     def void_ptr(self):
@@ -1434,6 +1464,9 @@ class CTypesManager(object):
         if type_id in resolved:
             return resolved[type_id]
         type_id = self.types_ast.get_type(type_id)
+        if type_id in resolved:
+            # Typedef of an already resolved type
+            return resolved[type_id]
         fixed = True
         if isinstance(type_id, CTypeId):
             out = self.leaf_types.types.get(type_id, None)
@@ -1525,15 +1558,31 @@ class CTypesManager(object):
     def get_objc(self, type_id):
         """Get the ObjC corresponding to the CType @type_id
         @type_id: CTypeBase instance"""
-        resolved = {}
+        if self._objc_cache_generation != self.types_ast.generation:
+            # Types have been modified since the last resolution
+            self._objc_cache = {}
+            self._objc_cache_generation = self.types_ast.generation
+        out = self._objc_cache.get(type_id, None)
+        if out is not None:
+            return out
+
+        # Resolved types are shared between resolutions, so that each
+        # structure layout is computed once
+        resolved = self._objc_cache
         to_fix = []
-        out = self._get_objc(type_id, resolved, to_fix)
-        # Fix sub objects
-        while to_fix:
-            type_id, objc_to_fix = to_fix.pop()
-            objc = self._get_objc(type_id.target, resolved, to_fix)
-            objc_to_fix.objtype = objc
-        self.check_objc(out)
+        try:
+            out = self._get_objc(type_id, resolved, to_fix)
+            # Fix sub objects
+            while to_fix:
+                fix_type_id, objc_to_fix = to_fix.pop()
+                objc = self._get_objc(fix_type_id.target, resolved, to_fix)
+                objc_to_fix.objtype = objc
+            self.check_objc(out)
+        except Exception:
+            # Do not keep partially resolved objects
+            self._objc_cache = {}
+            raise
+        resolved[type_id] = out
         return out
 
     def check_objc(self, objc, done=None):
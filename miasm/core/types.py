@@ -292,6 +292,21 @@ class Type(object):
         raw = vm.get_mem(addr, self.size)
         return self._unpack(raw)
 
+    def unpack_value(self, raw_str, offset=0):
+        """Deserializes the plain python value of this type (int, tuple, dict
+        for structs, list for arrays) from @raw_str at @offset.
+
+        Used by bulk accessors (see MemType.get_values) to decode a whole
+        object read from memory at once.
+        """
+        return self._unpack(raw_str[offset:offset + self.size])
+
+    def pack_value_into(self, buf, offset, val):
+        """Serializes the plain python value @val (see unpack_value) in the
+        bytearray @buf at @offset.
+        """
+        buf[offset:offset + self.size] = self._pack(val)
+
     @property
     def lval(self):
         """Returns a class with a (vm, addr) constructor that allows to
@@ -362,16 +377,23 @@ class RawStruct(Type):
 
     def __init__(self, fmt):
         self._fmt = fmt
+        self._struct = struct.Struct(fmt)
 
     def _pack(self, fields):
-        return struct.pack(self._fmt, *fields)
+        return self._struct.pack(*fields)
 
     def _unpack(self, raw_str):
-        return struct.unpack(self._fmt, raw_str)
+        return self._struct.unpack(raw_str)
+
+    def unpack_value(self, raw_str, offset=0):
+        return self._struct.unpack_from(raw_str, offset)
+
+    def pack_value_into(self, buf, offset, val):
+        self._struct.pack_into(buf, offset, *val)
 
     @property
     def size(self):
-        return struct.calcsize(self._fmt)
+        return self._struct.size
 
     def __repr__(self):
         return "%s(%s)" % (self.__class__.__name__, self._fmt)
@@ -403,6 +425,27 @@ class Num(RawStruct):
                              "should be 1")
         return upck[0]
 
+    def unpack_value(self, raw_str, offset=0):
+        upck = super(Num, self).unpack_value(raw_str, offset)
+        if len(upck) != 1:
+            raise ValueError("Num format string unpacks to multiple values, "
+                             "should be 1")
+        return upck[0]
+
+    def pack_value_into(self, buf, offset, val):
+        super(Num, self).pack_value_into(buf, offset, [val])
+
+    def _merged_format(self):
+        """Return a (<byte order>, <format>) couple if this Num can be
+        packed along with its neighbours in a single struct format, None
+        otherwise.
+        Only standard sized formats (explicit byte order) can be merged, as
+        native ones are aligned.
+        """
+        if len(self._fmt) != 2 or self._fmt[0] not in "<>!=":
+            return None
+        return self._fmt[0], self._fmt[1]
+
 
 class Ptr(Num):
     """Special case of number of which value indicates the address of a
@@ -568,6 +611,9 @@ class Struct(Type):
         self.name = name
         # generates self._fields and self._fields_desc
         self._gen_fields(fields)
+        # struct.Struct decoding all the fields at once, if any (lazily
+        # computed, see _get_values_struct)
+        self._values_struct = None
 
     def _gen_fields(self, fields):
         """Precompute useful metadata on self.fields."""
@@ -642,6 +688,65 @@ class Struct(Type):
     def get(self, vm, addr):
         return self.lval(vm, addr)
 
+    def _get_values_struct(self):
+        """Return a struct.Struct packing all the fields of this Struct at
+        once, or False if they cannot be merged (non Num or native fields,
+        overlapping fields, ...).
+        """
+        if self._values_struct is not None:
+            return self._values_struct
+        fmt = None
+        offset = 0
+        for name, field in self.fields:
+            merged = None
+            if isinstance(field, Num) and self.get_offset(name) == offset:
+                merged = field._merged_format()
+            if merged is None:
+                fmt = None
+                break
+            byte_order, code = merged
+            if fmt is None:
+                fmt = byte_order
+            elif fmt[0] != byte_order:
+                fmt = None
+                break
+            fmt += code
+            offset += field.size
+        if fmt is None or offset != self.size:
+            self._values_struct = False
+        else:
+            self._values_struct = struct.Struct(fmt)
+        return self._values_struct
+
+    def unpack_value(self, raw_str, offset=0):
+        """Return a {field name: plain python value} dict. Anonymous fields
+        are decoded under their generated name (see the class doc).
+        """
+        values_struct = self._get_values_struct()
+        if values_struct:
+            return dict(zip((name for name, _ in self.fields),
+                            values_struct.unpack_from(raw_str, offset)))
+        return {
+            name: field.unpack_value(raw_str, offset + self.get_offset(name))
+            for name, field in self.fields
+        }
+
+    def pack_value_into(self, buf, offset, val):
+        """@val is a {field name: plain python value} dict; fields missing
+        from @val are left untouched in @buf.
+        """
+        values_struct = self._get_values_struct()
+        if values_struct and len(val) == len(self.fields):
+            values_struct.pack_into(buf, offset,
+                                    *(val[name] for name, _ in self.fields))
+            return
+        for name, field_val in viewitems(val):
+            if name not in self._fields_desc:
+                raise ValueError("'%s' type has no field '%s'" % (self, name))
+            self.get_field_type(name).pack_value_into(
+                buf, offset + self.get_offset(name), field_val
+            )
+
     def get_field(self, vm, addr, name):
         """Get a field value by @name and base structure @addr in @vm VmMngr."""
         if name not in self._fields_desc:
@@ -797,6 +902,48 @@ class Array(Type):
     def get(self, vm, addr):
         return self.lval(vm, addr)
 
+    def unpack_items(self, raw_str, count, offset=0):
+        """Deserializes @count items from @raw_str at @offset, as a list of
+        plain python values (see Type.unpack_value).
+        """
+        field_type = self.field_type
+        if isinstance(field_type, Num):
+            merged = field_type._merged_format()
+            if merged is not None:
+                byte_order, code = merged
+                return list(struct.unpack_from(
+                    "%s%d%s" % (byte_order, count, code), raw_str, offset
+                ))
+        item_size = field_type.size
+        return [field_type.unpack_value(raw_str, offset + i * item_size)
+                for i in range(count)]
+
+    def pack_items_into(self, buf, offset, items):
+        """Serializes the plain python values @items in the bytearray @buf at
+        @offset.
+        """
+        field_type = self.field_type
+        if isinstance(field_type, Num):
+            merged = field_type._merged_format()
+            if merged is not None:
+                byte_order, code = merged
+                struct.pack_into("%s%d%s" % (byte_order, len(items), code),
+                                 buf, offset, *items)
+                return
+        item_size = field_type.size
+        for i, item in enumerate(items):
+            field_type.pack_value_into(buf, offset + i * item_size, item)
+
+    def unpack_value(self, raw_str, offset=0):
+        if not self.is_sized():
+            raise ValueError("%s is unsized, use unpack_items instead" % self)
+        return self.unpack_items(raw_str, self.array_len, offset)
+
+    def pack_value_into(self, buf, offset, val):
+        if len(val) != self.array_len:
+            raise ValueError("Size mismatch in MemSizedArray assignment")
+        self.pack_items_into(buf, offset, val)
+
     @property
     def size(self):
         if self.is_sized():
@@ -923,6 +1070,18 @@ class Bits(Type):
         res_val = (num_val >> self._bit_offset) & val_mask
         return res_val
 
+    def unpack_value(self, raw_str, offset=0):
+        val_mask = (1 << self._bits) - 1
+        num_val = self._num.unpack_value(raw_str, offset)
+        return (num_val >> self._bit_offset) & val_mask
+
+    def pack_value_into(self, buf, offset, val):
+        val_mask = (1 << self._bits) - 1
+        num_val = self._num.unpack_value(buf, offset)
+        num_val &= ~(val_mask << self._bit_offset)
+        num_val |= (val & val_mask) << self._bit_offset
+        self._num.pack_value_into(buf, offset, num_val)
+
     @property
     def size(self):
         return self._num.size
@@ -1321,6 +1480,25 @@ class MemType(with_metaclass(_MetaMemType, object)):
         """
         return self._vm.get_mem(self.get_addr(), self.get_size())
 
+    def get_values(self):
+        """Return the plain python value of this MemType (see
+        Type.unpack_value), read from memory with a single VmMngr access.
+
+        Much faster than walking the fields one by one on big objects, e.g.:
+            values = mystruct.get_values()
+            values["num"], values["other"]
+        """
+        return self._type.unpack_value(self.raw())
+
+    def set_values(self, values):
+        """Set this MemType from the plain python value @values (see
+        Type.pack_value_into) with a single VmMngr read and write. For
+        structures, @values may only contain a subset of the fields.
+        """
+        buf = bytearray(self.raw())
+        self._type.pack_value_into(buf, 0, values)
+        self._vm.set_mem(self.get_addr(), bytes(buf))
+
     def __len__(self):
         return self.get_size()
 
@@ -1657,6 +1835,37 @@ class MemArray(MemType):
                          "raw representation. Use MemSizedArray instead." %
                          self.__class__)
 
+    def _get_bulk_range(self, start, stop):
+        if stop is None:
+            raise ValueError("%s is unsized, an explicit stop index is "
+                             "needed" % self.__class__)
+        if not 0 <= start <= stop:
+            raise IndexError("Invalid range [%s:%s]" % (start, stop))
+        return start, stop
+
+    def get_values(self, start=0, stop=None):
+        """Return the items [@start:@stop] of this array as a list of plain
+        python values (see Type.unpack_value), read with a single VmMngr
+        access.
+        """
+        start, stop = self._get_bulk_range(start, stop)
+        array_type = self.get_type()
+        raw = self._vm.get_mem(self.get_addr(start),
+                               array_type.get_offset(stop - start))
+        return array_type.unpack_items(raw, stop - start)
+
+    def set_values(self, values, start=0):
+        """Set the items of this array from index @start with the plain python
+        values @values, with a single VmMngr read and write.
+        """
+        start, stop = self._get_bulk_range(start, start + len(values))
+        array_type = self.get_type()
+        addr = self.get_addr(start)
+        buf = bytearray(self._vm.get_mem(addr,
+                                         array_type.get_offset(stop - start)))
+        array_type.pack_items_into(buf, 0, values)
+        self._vm.set_mem(addr, bytes(buf))
+
     def __repr__(self):
         return "[%r, ...] [%r]" % (self[0], self.field_type)
 
@@ -1676,6 +1885,13 @@ class MemSizedArray(MemArray):
     def get_size(self):
         return self.get_type().size
 
+    def _get_bulk_range(self, start, stop):
+        if stop is None:
+            stop = self.array_len
+        if not 0 <= start <= stop <= self.array_len:
+            raise IndexError("Invalid range [%s:%s]" % (start, stop))
+        return start, stop
+
     def __iter__(self):
         for i in range(self.get_type().array_len):
             yield self[i]
@@ -176,9 +176,14 @@ def is_function_call(expr):
 
 @total_ordering
 class LocKey(object):
+    __slots__ = ["_key"]
+
     def __init__(self, key):
         self._key = key
 
+    def __reduce__(self):
+        return (LocKey, (self._key,))
+
     key = property(lambda self: self._key)
 
     def __hash__(self):
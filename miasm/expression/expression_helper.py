@@ -132,6 +132,42 @@ def fast_unify(seq, idfun=None):
         result.append(item)
     return result
 
+
+def simp_ops(ops, arity=None):
+    """Decorator declaring the ExprOp operators a simplification applies to,
+    used by the ExpressionSimplifier to only run applicable rules
+
+    @ops: list of operator names; a name ending with '*' matches every
+    operator starting with it (for instance 'zeroExt*')
+    @arity: (optional) number of arguments required by the rule
+
+    Simplifications without declaration are applied on every operator.
+    """
+    def decorator(simp_func):
+        simp_func.simp_ops = tuple(ops)
+        simp_func.simp_arity = arity
+        return simp_func
+    return decorator
+
+
+def simp_op_applies(simp_func, op, arity):
+    """Return True if the simplification @simp_func may modify an ExprOp of
+    operator @op with @arity arguments, according to its simp_ops
+    declaration"""
+    ops = getattr(simp_func, "simp_ops", None)
+    if ops is None:
+        return True
+    rule_arity = getattr(simp_func, "simp_arity", None)
+    if rule_arity is not None and rule_arity != arity:
+        return False
+    for rule_op in ops:
+        if rule_op.endswith("*"):
+            if op.startswith(rule_op[:-1]):
+                return True
+        elif rule_op == op:
+            return True
+    return False
+
 def get_missing_interval(all_intervals, i_min=0, i_max=32):
     """Return a list of missing interval in all_interval
     @all_interval: list of (int, int)
@@ -520,10 +556,24 @@ class CondConstraint(object):
     def __repr__(self):
         return "<%s %s 0>" % (self.expr, self.operator)
 
+    def __eq__(self, other):
+        return (self.__class__ is other.__class__ and
+                self.expr == other.expr)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((self.__class__.__name__, self.expr))
+
     def to_constraint(self):
         """Transform itself into a constraint using Expr"""
         raise NotImplementedError("Abstract method")
 
+    def negate(self):
+        """Return the opposite constraint"""
+        raise NotImplementedError("Abstract method")
+
 
 class CondConstraintZero(CondConstraint):
 
@@ -533,6 +583,9 @@ class CondConstraintZero(CondConstraint):
     def to_constraint(self):
         return m2_expr.ExprAssign(self.expr, m2_expr.ExprInt(0, self.expr.size))
 
+    def negate(self):
+        return CondConstraintNotZero(self.expr)
+
 
 class CondConstraintNotZero(CondConstraint):
 
@@ -543,6 +596,9 @@ class CondConstraintNotZero(CondConstraint):
         cst1, cst2 = m2_expr.ExprInt(0, 1), m2_expr.ExprInt(1, 1)
         return m2_expr.ExprAssign(cst1, m2_expr.ExprCond(self.expr, cst1, cst2))
 
+    def negate(self):
+        return CondConstraintZero(self.expr)
+
 
 ConstrainedValue = collections.namedtuple("ConstrainedValue",
                                           ["constraints", "value"])
@@ -561,68 +617,148 @@ class ConstrainedValues(set):
         return "\n".join(out)
 
 
-def possible_values(expr):
-    """Return possible values for expression @expr, associated with their
-    condition constraint as a ConstrainedValues instance
-    @expr: Expr instance
+def _memoize_iter(iterator):
+    """Return a function returning a new iterator on the elements of
+    @iterator, which is only consumed on demand
     """
+    cache = []
+
+    def gen():
+        index = 0
+        while True:
+            if index == len(cache):
+                try:
+                    cache.append(next(iterator))
+                except StopIteration:
+                    return
+            yield cache[index]
+            index += 1
+    return gen
+
+
+def _add_constraints(constraints, new_constraints):
+    """Return the frozenset of @constraints and @new_constraints, or None if
+    the result is trivially contradictory
+    Trivially true constraints are dropped.
+    """
+    added = []
+    for constraint in new_constraints:
+        if constraint in constraints:
+            continue
+        expr = constraint.expr
+        if expr.is_int():
+            if (int(expr) == 0) == isinstance(constraint, CondConstraintZero):
+                # Always true
+                continue
+            return None
+        if constraint.negate() in constraints:
+            return None
+        added.append(constraint)
+    if not added:
+        return constraints
+    return constraints.union(added)
 
-    consvals = ConstrainedValues()
 
+def _iter_possible_values(expr):
+    """Iterator on the possible values of @expr, see iter_possible_values"""
     # Terminal expression
     if (isinstance(expr, m2_expr.ExprInt) or
         isinstance(expr, m2_expr.ExprId) or
         isinstance(expr, m2_expr.ExprLoc)):
-        consvals.add(ConstrainedValue(frozenset(), expr))
+        yield ConstrainedValue(frozenset(), expr)
     # Unary expression
     elif isinstance(expr, m2_expr.ExprSlice):
-        consvals.update(ConstrainedValue(consval.constraints,
-                                         consval.value[expr.start:expr.stop])
-                        for consval in possible_values(expr.arg))
+        for consval in _iter_possible_values(expr.arg):
+            yield ConstrainedValue(consval.constraints,
+                                   consval.value[expr.start:expr.stop])
     elif isinstance(expr, m2_expr.ExprMem):
-        consvals.update(ConstrainedValue(consval.constraints,
-                                         m2_expr.ExprMem(consval.value,
-                                                         expr.size))
-                        for consval in possible_values(expr.ptr))
+        for consval in _iter_possible_values(expr.ptr):
+            yield ConstrainedValue(consval.constraints,
+                                   m2_expr.ExprMem(consval.value, expr.size))
     elif isinstance(expr, m2_expr.ExprAssign):
-        consvals.update(possible_values(expr.src))
+        for consval in _iter_possible_values(expr.src):
+            yield consval
     # Special case: constraint insertion
     elif isinstance(expr, m2_expr.ExprCond):
-        src1cond = CondConstraintNotZero(expr.cond)
-        src2cond = CondConstraintZero(expr.cond)
-        consvals.update(ConstrainedValue(consval.constraints.union([src1cond]),
-                                         consval.value)
-                        for consval in possible_values(expr.src1))
-        consvals.update(ConstrainedValue(consval.constraints.union([src2cond]),
-                                         consval.value)
-                        for consval in possible_values(expr.src2))
+        for src, cond in [(expr.src1, CondConstraintNotZero(expr.cond)),
+                          (expr.src2, CondConstraintZero(expr.cond))]:
+            if _add_constraints(frozenset(), [cond]) is None:
+                # Branch never taken
+                continue
+            for consval in _iter_possible_values(src):
+                constraints = _add_constraints(consval.constraints, [cond])
+                if constraints is not None:
+                    yield ConstrainedValue(constraints, consval.value)
     # N-ary expression
-    elif isinstance(expr, m2_expr.ExprOp):
-        # For details, see ExprCompose
-        consvals_args = [possible_values(arg) for arg in expr.args]
-        for consvals_possibility in itertools.product(*consvals_args):
-            args_value = [consval.value for consval in consvals_possibility]
-            args_constraint = itertools.chain(*[consval.constraints
-                                                for consval in consvals_possibility])
-            consvals.add(ConstrainedValue(frozenset(args_constraint),
-                                          m2_expr.ExprOp(expr.op, *args_value)))
-    elif isinstance(expr, m2_expr.ExprCompose):
-        # Generate each possibility for sub-argument, associated with the start
-        # and stop bit
-        consvals_args = [
-            list(possible_values(arg))
+    elif isinstance(expr, (m2_expr.ExprOp, m2_expr.ExprCompose)):
+        # Product of each argument possibilities, pruning contradictory
+        # partial products as soon as possible
+        args_consvals = [
+            _memoize_iter(_iter_possible_values(arg))
             for arg in expr.args
         ]
-        for consvals_possibility in itertools.product(*consvals_args):
-            # Merge constraint of each sub-element
-            args_constraint = itertools.chain(*[consval.constraints
-                                                for consval in consvals_possibility])
-            # Gen the corresponding constraints / ExprCompose
-            args = [consval.value for consval in consvals_possibility]
-            consvals.add(
-                ConstrainedValue(frozenset(args_constraint),
-                                 m2_expr.ExprCompose(*args)))
+
+        def product(index, constraints, values):
+            if index == len(args_consvals):
+                if isinstance(expr, m2_expr.ExprOp):
+                    value = m2_expr.ExprOp(expr.op, *values)
+                else:
+                    value = m2_expr.ExprCompose(*values)
+                yield ConstrainedValue(constraints, value)
+                return
+            for consval in args_consvals[index]():
+                new_constraints = _add_constraints(
+                    constraints,
+                    consval.constraints
+                )
+                if new_constraints is None:
+                    continue
+                for out in product(index + 1, new_constraints,
+                                   values + [consval.value]):
+                    yield out
+
+        for consval in product(0, frozenset(), []):
+            yield consval
     else:
         raise RuntimeError("Unsupported type for expr: %s" % type(expr))
 
+
+def iter_possible_values(expr, max_values=None):
+    """Iterate lazily on possible values for expression @expr, associated
+    with their condition constraints, as ConstrainedValue instances
+    Possibilities with trivially contradictory constraints are pruned.
+    @expr: Expr instance
+    @max_values: (optional) stop after this number of possibilities
+    """
+    consvals = _iter_possible_values(expr)
+    if max_values is not None:
+        consvals = itertools.islice(consvals, max_values)
     return consvals
+
+
+def merge_possible_values(consvals):
+    """Merge possibilities sharing the same value: return a dictionary
+    value -> set of constraints frozensets, the value being reached if any
+    of these constraints sets holds
+    Constraints sets including another one of the same value are dropped.
+    @consvals: iterable of ConstrainedValue
+    """
+    value_to_constraints = {}
+    for consval in consvals:
+        alternatives = value_to_constraints.setdefault(consval.value, set())
+        if any(constraints <= consval.constraints
+               for constraints in alternatives):
+            continue
+        for constraints in list(alternatives):
+            if consval.constraints < constraints:
+                alternatives.remove(constraints)
+        alternatives.add(consval.constraints)
+    return value_to_constraints
+
+
+def possible_values(expr):
+    """Return possible values for expression @expr, associated with their
+    condition constraint as a ConstrainedValues instance
+    @expr: Expr instance
+    """
+    return ConstrainedValues(iter_possible_values(expr))
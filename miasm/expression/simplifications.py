@@ -3,13 +3,14 @@
 #                                                                              #
 
 import logging
+import time
 
 from future.utils import viewitems
 
 from miasm.expression import simplifications_common
 from miasm.expression import simplifications_cond
 from miasm.expression import simplifications_explicit
-from miasm.expression.expression_helper import fast_unify
+from miasm.expression.expression_helper import fast_unify, simp_op_applies
 import miasm.expression.expression as m2_expr
 from miasm.expression.expression import ExprVisitorCallbackBottomToTop
 
@@ -124,6 +125,12 @@ class ExpressionSimplifier(ExprVisitorCallbackBottomToTop):
     def __init__(self):
         super(ExpressionSimplifier, self).__init__(self.expr_simp_inner)
         self.expr_simp_cb = {}
+        # Expr class or (ExprOp operator, arity) -> list((position, callback))
+        self.simp_cb_index = {}
+        # If set, record per callback statistics in rule_stats
+        self.profile = False
+        # callback -> [calls, hits, elapsed time in seconds]
+        self.rule_stats = {}
 
     def enable_passes(self, passes):
         """Add passes from @passes
@@ -134,10 +141,39 @@ class ExpressionSimplifier(ExprVisitorCallbackBottomToTop):
 
         # Clear cache of simplifiied expressions when adding a new pass
         self.cache.clear()
+        self.simp_cb_index.clear()
 
         for k, v in viewitems(passes):
             self.expr_simp_cb[k] = fast_unify(self.expr_simp_cb.get(k, []) + v)
 
+    def get_callbacks(self, expression):
+        """Return the list of (position, callback) which may simplify
+        @expression, in the order of the enabled passes.
+
+        ExprOp callbacks are indexed by operator and arity using their
+        simp_ops declaration, so that unrelated rules are never run.
+        """
+        cls = expression.__class__
+        if cls is m2_expr.ExprOp:
+            key = (expression.op, len(expression.args))
+        else:
+            key = cls
+        try:
+            return self.simp_cb_index[key]
+        except KeyError:
+            pass
+        callbacks = [
+            (position, simp_func)
+            for position, simp_func in enumerate(self.expr_simp_cb.get(cls, []))
+            if key is cls or simp_op_applies(simp_func, *key)
+        ]
+        self.simp_cb_index[key] = callbacks
+        return callbacks
+
+    def reset_rule_stats(self):
+        "Reset callbacks statistics"
+        self.rule_stats.clear()
+
     def apply_simp(self, expression):
         """Apply enabled simplifications on expression
         @expression: Expr instance
@@ -145,10 +181,26 @@ class ExpressionSimplifier(ExprVisitorCallbackBottomToTop):
 
         cls = expression.__class__
         debug_level = log_exprsimp.level >= logging.DEBUG
-        for simp_func in self.expr_simp_cb.get(cls, []):
+        profile = self.profile
+        callbacks = self.get_callbacks(expression)
+        index = 0
+        while index < len(callbacks):
+            position, simp_func = callbacks[index]
+            index += 1
             # Apply simplifications
             before = expression
-            expression = simp_func(self, expression)
+            if profile:
+                start = time.time()
+                expression = simp_func(self, expression)
+                stats = self.rule_stats.setdefault(simp_func, [0, 0, 0.0])
+                stats[0] += 1
+                stats[2] += time.time() - start
+                if expression != before:
+                    stats[1] += 1
+            else:
+                expression = simp_func(self, expression)
+            if expression is before:
+                continue
             after = expression
 
             if debug_level and before != after:
@@ -158,8 +210,30 @@ class ExpressionSimplifier(ExprVisitorCallbackBottomToTop):
             if expression.__class__ is not cls:
                 break
 
+            # If the operator changes, go on with the remaining callbacks
+            # applicable to the new one
+            if cls is m2_expr.ExprOp and (
+                    expression.op != before.op or
+                    len(expression.args) != len(before.args)
+            ):
+                callbacks = [
+                    callback for callback in self.get_callbacks(expression)
+                    if callback[0] > position
+                ]
+                index = 0
+
         return expression
 
+    def visit(self, expr, *args, **kwargs):
+        if expr in self.cache:
+            return self.cache[expr]
+        ret = self.visit_inner(expr, *args, **kwargs)
+        self.cache[expr] = ret
+        # The result is in a stable state: mark it as already simplified, so
+        # that it is not simplified again, even as part of another expression
+        self.cache.setdefault(ret, ret)
+        return ret
+
     def expr_simp_inner(self, expression):
         """Apply enabled simplifications on expression and find a stable state
         @expression: Expr instance
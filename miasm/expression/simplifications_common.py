@@ -9,7 +9,7 @@ from miasm.expression.expression import ExprInt, ExprSlice, ExprMem, \
     ExprCond, ExprOp, ExprCompose, TOK_INF_SIGNED, TOK_INF_UNSIGNED, \
     TOK_INF_EQUAL_SIGNED, TOK_INF_EQUAL_UNSIGNED, TOK_EQUAL
 from miasm.expression.expression_helper import parity, op_propag_cst, \
-    merge_sliceto_slice
+    merge_sliceto_slice, simp_ops
 
 
 def simp_cst_propagation(e_s, expr):
@@ -389,6 +389,7 @@ def simp_cst_propagation(e_s, expr):
     return ExprOp(op_name, *args)
 
 
+@simp_ops(["+", "|", "^", "&", "*", "<<", ">>", "a>>"])
 def simp_cond_op_int(_, expr):
     "Extract conditions from operations"
 
@@ -420,6 +421,7 @@ def simp_cond_op_int(_, expr):
                     ExprOp(expr.op, *args2))
 
 
+@simp_ops(["+", "|", "^", "&", "*", "<<", ">>", "a>>"])
 def simp_cond_factor(e_s, expr):
     "Merge similar conditions"
     if not expr.op in ["+", "|", "^", "&", "*", '<<', '>>', 'a>>']:
@@ -711,6 +713,10 @@ def test_cc_eq_args(expr, *sons_op):
     return len(all_args) == 1
 
 
+@simp_ops([
+    "CC_U>=", "CC_U<", "CC_U<=", "CC_U>", "CC_NEG", "CC_POS", "CC_EQ",
+    "CC_NE", "CC_S>", "CC_S>=", "CC_S<", "CC_S<=",
+])
 def simp_cc_conds(_, expr):
     """
     High level simplifications. Example:
@@ -911,6 +917,7 @@ def simp_cond_flag(_, expr):
     return expr
 
 
+@simp_ops(["FLAG_SUB_CF"])
 def simp_sub_cf_zero(_, expr):
     """FLAG_SUB_CF(0, X) => (X)?1:0"""
     if not expr.is_op("FLAG_SUB_CF"):
@@ -940,6 +947,7 @@ def simp_cond_cc_flag(expr_simp, expr):
         return ExprCond(arg, expr.src2, expr.src1)
     return expr
 
+@simp_ops([TOK_EQUAL])
 def simp_cmp_int(expr_simp, expr):
     """
     ({X, 0} == int) => X == int[:]
@@ -1039,6 +1047,7 @@ def simp_cmp_int_arg(_, expr):
 
 
 
+@simp_ops([TOK_EQUAL])
 def simp_cmp_bijective_op(expr_simp, expr):
     """
     A + B == A => A == 0
@@ -1115,6 +1124,7 @@ def simp_cmp_bijective_op(expr_simp, expr):
     return ExprOp(TOK_EQUAL, arg_a, arg_b)
 
 
+@simp_ops(["FLAG_SUBWC_CF"], arity=3)
 def simp_subwc_cf(_, expr):
     """SUBWC_CF(A, B, SUB_CF(C, D)) => SUB_CF({A, C}, {B, D})"""
     if not expr.is_op('FLAG_SUBWC_CF'):
@@ -1129,6 +1139,7 @@ def simp_subwc_cf(_, expr):
     return ExprOp("FLAG_SUB_CF", op1, op2)
 
 
+@simp_ops(["FLAG_SUBWC_OF"], arity=3)
 def simp_subwc_of(_, expr):
     """SUBWC_OF(A, B, SUB_CF(C, D)) => SUB_OF({A, C}, {B, D})"""
     if not expr.is_op('FLAG_SUBWC_OF'):
@@ -1143,6 +1154,7 @@ def simp_subwc_of(_, expr):
     return ExprOp("FLAG_SUB_OF", op1, op2)
 
 
+@simp_ops(["FLAG_SIGN_SUBWC"], arity=3)
 def simp_sign_subwc_cf(_, expr):
     """SIGN_SUBWC(A, B, SUB_CF(C, D)) => SIGN_SUB({A, C}, {B, D})"""
     if not expr.is_op('FLAG_SIGN_SUBWC'):
@@ -1156,6 +1168,7 @@ def simp_sign_subwc_cf(_, expr):
 
     return ExprOp("FLAG_SIGN_SUB", op1, op2)
 
+@simp_ops(["zeroExt*"])
 def simp_double_zeroext(_, expr):
     """A.zeroExt(X).zeroExt(Y) => A.zeroExt(Y)"""
     if not (expr.is_op() and expr.op.startswith("zeroExt")):
@@ -1166,6 +1179,7 @@ def simp_double_zeroext(_, expr):
     arg2 = arg1.args[0]
     return ExprOp(expr.op, arg2)
 
+@simp_ops(["signExt*"])
 def simp_double_signext(_, expr):
     """A.signExt(X).signExt(Y) => A.signExt(Y)"""
     if not (expr.is_op() and expr.op.startswith("signExt")):
@@ -1176,6 +1190,7 @@ def simp_double_signext(_, expr):
     arg2 = arg1.args[0]
     return ExprOp(expr.op, arg2)
 
+@simp_ops([TOK_EQUAL])
 def simp_zeroext_eq_cst(_, expr):
     """A.zeroExt(X) == int => A == int[:A.size]"""
     if not expr.is_op(TOK_EQUAL):
@@ -1208,6 +1223,7 @@ def simp_cond_zeroext(_, expr):
     ret = ExprCond(expr.cond.args[0], expr.src1, expr.src2)
     return ret
 
+@simp_ops([TOK_EQUAL])
 def simp_ext_eq_ext(_, expr):
     """
     A.zeroExt(X) == B.zeroExt(X) => A == B
@@ -1236,6 +1252,7 @@ def simp_cond_eq_zero(_, expr):
     new_expr = ExprCond(arg1, expr.src2, expr.src1)
     return new_expr
 
+@simp_ops([TOK_INF_SIGNED, TOK_INF_EQUAL_SIGNED])
 def simp_sign_inf_zeroext(expr_s, expr):
     """
     /!\ Ensure before: X.zeroExt(X.size) => X
@@ -1282,6 +1299,7 @@ def simp_sign_inf_zeroext(expr_s, expr):
     return ExprOp(TOK_INF_EQUAL_UNSIGNED, src, expr_s(arg2[:src.size]))
 
 
+@simp_ops([TOK_EQUAL])
 def simp_zeroext_and_cst_eq_cst(expr_s, expr):
     """
     A.zeroExt(X) & ... & int == int => A & ... & int[:A.size] == int[:A.size]
@@ -1344,6 +1362,11 @@ def simp_x_and_cst_eq_cst(_, expr):
     cond = ExprOp('&', *arg1.args)
     return ExprCond(cond, expr.src1, expr.src2)
 
+@simp_ops([
+    TOK_EQUAL,
+    TOK_INF_SIGNED, TOK_INF_UNSIGNED,
+    TOK_INF_EQUAL_SIGNED, TOK_INF_EQUAL_UNSIGNED,
+])
 def simp_cmp_int_int(_, expr):
     """
     IntA <s IntB => int
@@ -1385,6 +1408,7 @@ def simp_cmp_int_int(_, expr):
     return ExprInt(ret, 1)
 
 
+@simp_ops(["zeroExt*", "signExt*"])
 def simp_ext_cst(_, expr):
     """
     Int.zeroExt(X) => Int
@@ -1404,6 +1428,7 @@ def simp_ext_cst(_, expr):
 
 
 
+@simp_ops(["zeroExt*", "signExt*"])
 def simp_ext_cond_int(e_s, expr):
     """
     zeroExt(ExprCond(X, Int, Int)) => ExprCond(X, Int, Int)
@@ -1561,6 +1586,7 @@ def simp_cond_eq_1_0(expr_s, expr):
     return cond
 
 
+@simp_ops([TOK_INF_EQUAL_UNSIGNED])
 def simp_cond_inf_eq_unsigned_zero(expr_s, expr):
     """
     (a <=u 0) => a == 0
@@ -1572,6 +1598,7 @@ def simp_cond_inf_eq_unsigned_zero(expr_s, expr):
     return ExprOp(TOK_EQUAL, expr.args[0], expr.args[1])
 
 
+@simp_ops([TOK_INF_SIGNED, TOK_INF_EQUAL_SIGNED])
 def simp_test_signext_inf(expr_s, expr):
     """A.signExt() <s int => A <s int[:]"""
     if not (expr.is_op(TOK_INF_SIGNED) or expr.is_op(TOK_INF_EQUAL_SIGNED)):
@@ -1592,6 +1619,7 @@ def simp_test_signext_inf(expr_s, expr):
     return expr
 
 
+@simp_ops([TOK_INF_UNSIGNED, TOK_INF_EQUAL_UNSIGNED])
 def simp_test_zeroext_inf(expr_s, expr):
     """A.zeroExt() <u int => A <u int[:]"""
     if not (expr.is_op(TOK_INF_UNSIGNED) or expr.is_op(TOK_INF_EQUAL_UNSIGNED)):
@@ -1611,6 +1639,7 @@ def simp_test_zeroext_inf(expr_s, expr):
     return expr
 
 
+@simp_ops(["+"])
 def simp_add_multiple(_, expr):
     """
     X + X => 2 * X
@@ -1682,6 +1711,7 @@ def simp_add_multiple(_, expr):
         return out[0]
     return ExprOp('+', *out)
 
+@simp_ops(["&"], arity=2)
 def simp_compose_and_mask(_, expr):
     """
     {X 0 8, Y 8 32} & 0xFF => zeroExt(X)
@@ -1713,6 +1743,7 @@ def simp_compose_and_mask(_, expr):
             out.append(arg)
     return expr
 
+@simp_ops(["bcdadd_cf"])
 def simp_bcdadd_cf(_, expr):
     """bcdadd(const, const) => decimal"""
     if not(expr.is_op('bcdadd_cf')):
@@ -1738,6 +1769,7 @@ def simp_bcdadd_cf(_, expr):
             carry = 0
     return ExprInt(carry, 1)
 
+@simp_ops(["bcdadd"])
 def simp_bcdadd(_, expr):
     """bcdadd(const, const) => decimal"""
     if not(expr.is_op('bcdadd')):
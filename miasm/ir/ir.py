@@ -17,8 +17,10 @@
 # with this program; if not, write to the Free Software Foundation, Inc.,
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #
+from builtins import int as int_types
 from builtins import zip
 import warnings
+import weakref
 
 from itertools import chain
 from future.utils import viewvalues, viewitems
@@ -27,8 +29,12 @@ import miasm.expression.expression as m2_expr
 from miasm.expression.expression_helper import get_missing_interval
 from miasm.core.asmblock import AsmBlock, AsmConstraint
 from miasm.core.graph import DiGraph
+from miasm.core.locationdb import LocationDB
+from miasm.core.utils import BoundedDict
 from functools import reduce
 
+LIFTING_CACHE_SIZE = 10000
+
 
 def _expr_loc_to_symb(expr, loc_db):
     if not expr.is_loc():
@@ -716,6 +722,414 @@ class DiGraphIR(IRCFG):
         raise NotImplementedError("Deprecated")
 
 
+class LiftingTemplate(object):
+    """Lifted IR of an instruction, in which offset dependent parts are
+    replaced by placeholders
+
+    Placeholders may stand for:
+    - a fresh location, generated again on each instantiation;
+    - an offset location, relative to the instruction offset or absolute;
+    - an integer, relative to the instruction offset.
+    """
+
+    def __init__(self, loc_db, instr):
+        """
+        @loc_db: LocationDB instance used by the lifting
+        @instr: lifted instruction
+        """
+        self.loc_db = loc_db
+        self.offset = instr.offset
+        # Offset and LocationDB of the probe lifting, if any
+        self.probe_offset = None
+        self.probe_loc_db = None
+        self.args_locs = set(
+            expr.loc_key
+            for arg in instr.args
+            for expr in m2_expr.get_expr_locs(arg)
+        )
+        self.fresh = {}
+        self.placeholders = {}
+        self.assignblk = None
+        self.extra_irblocks = []
+        self.except_on_instr = getattr(
+            instr.additional_info, "except_on_instr", None
+        )
+
+    def add_placeholder(self, kind, param, size):
+        """Return the placeholder standing for (@kind, @param) of @size bits"""
+        key = (kind, param, size)
+        placeholder = self.placeholders.get(key)
+        if placeholder is None:
+            placeholder = m2_expr.ExprId(
+                "__lift_%d" % len(self.placeholders),
+                size
+            )
+            self.placeholders[key] = placeholder
+        return placeholder
+
+    def gen_loc(self, loc_key, probe_loc_key=None):
+        """Return the description of the location @loc_key
+        @probe_loc_key: (optional) corresponding location in the probe lifting
+        """
+        if loc_key in self.args_locs:
+            if probe_loc_key is not None and probe_loc_key != loc_key:
+                raise ValueError("Not relocatable")
+            return ("const", loc_key)
+        loc_offset = self.loc_db.get_location_offset(loc_key)
+        if probe_loc_key is None:
+            probe_offset = None
+        else:
+            probe_offset = self.probe_loc_db.get_location_offset(probe_loc_key)
+        if loc_offset is None:
+            if probe_loc_key is not None and probe_offset is not None:
+                raise ValueError("Not relocatable")
+            # Fresh location: keep the bijection between both liftings
+            key = (loc_key, probe_loc_key)
+            if key not in self.fresh:
+                self.fresh[key] = len(self.fresh)
+            return ("fresh", self.fresh[key])
+        if probe_loc_key is None:
+            return ("offset", (True, loc_offset - self.offset))
+        if probe_offset == loc_offset:
+            return ("offset", (False, loc_offset))
+        if probe_offset is not None and \
+           probe_offset - self.probe_offset == loc_offset - self.offset:
+            return ("offset", (True, loc_offset - self.offset))
+        raise ValueError("Not relocatable")
+
+    def gen_expr(self, expr, probe=None):
+        """Return the template of @expr
+        @probe: (optional) corresponding expression in the probe lifting
+        """
+        if probe is not None and (
+                expr.__class__ is not probe.__class__ or
+                expr.size != probe.size
+        ):
+            raise ValueError("Not relocatable")
+        if expr.is_int():
+            if probe is None or probe == expr:
+                return expr
+            mask = int(expr.mask)
+            delta = (self.probe_offset - self.offset) & mask
+            if (int(probe) - int(expr)) & mask != delta:
+                raise ValueError("Not relocatable")
+            return self.add_placeholder(
+                "int",
+                (int(expr) - self.offset) & mask,
+                expr.size
+            )
+        if expr.is_id():
+            if not isinstance(expr.name, m2_expr.LocKey):
+                if probe is not None and probe != expr:
+                    raise ValueError("Not relocatable")
+                return expr
+            # Location used as an identifier
+            kind, param = self.gen_loc(
+                expr.name,
+                None if probe is None else probe.name
+            )
+            if kind != "fresh":
+                raise ValueError("Not relocatable")
+            return self.add_placeholder("fresh_id", param, expr.size)
+        if expr.is_loc():
+            kind, param = self.gen_loc(
+                expr.loc_key,
+                None if probe is None else probe.loc_key
+            )
+            if kind == "const":
+                return expr
+            return self.add_placeholder(kind, param, expr.size)
+        if expr.is_slice() and probe is not None and (
+                expr.start != probe.start or expr.stop != probe.stop
+        ):
+            raise ValueError("Not relocatable")
+        if expr.is_op() and probe is not None and expr.op != probe.op:
+            raise ValueError("Not relocatable")
+
+        # Compound expressions: walk both liftings in parallel
+        args = list(expr.args) if expr.is_op() or expr.is_compose() else []
+        if expr.is_mem():
+            args = [expr.ptr]
+        elif expr.is_slice():
+            args = [expr.arg]
+        elif expr.is_cond():
+            args = [expr.cond, expr.src1, expr.src2]
+        if probe is None:
+            probe_args = [None] * len(args)
+        elif probe.is_mem():
+            probe_args = [probe.ptr]
+        elif probe.is_slice():
+            probe_args = [probe.arg]
+        elif probe.is_cond():
+            probe_args = [probe.cond, probe.src1, probe.src2]
+        else:
+            probe_args = list(probe.args)
+        if len(args) != len(probe_args):
+            raise ValueError("Not relocatable")
+        args = [
+            self.gen_expr(arg, probe_arg)
+            for arg, probe_arg in zip(args, probe_args)
+        ]
+        if expr.is_mem():
+            return m2_expr.ExprMem(args[0], expr.size)
+        if expr.is_slice():
+            return m2_expr.ExprSlice(args[0], expr.start, expr.stop)
+        if expr.is_cond():
+            return m2_expr.ExprCond(*args)
+        if expr.is_op():
+            return m2_expr.ExprOp(expr.op, *args)
+        if expr.is_compose():
+            return m2_expr.ExprCompose(*args)
+        raise ValueError("Not relocatable")
+
+    def gen_assignblk(self, assignblk, probe=None):
+        """Return the template of @assignblk, as a list of
+        (dst, src, dst_is_dynamic, src_is_dynamic)
+        @probe: (optional) corresponding AssignBlock in the probe lifting
+        """
+        items = list(viewitems(assignblk))
+        if probe is None:
+            probe_items = [(None, None)] * len(items)
+        else:
+            probe_items = list(viewitems(probe))
+            if len(items) != len(probe_items):
+                raise ValueError("Not relocatable")
+        out = []
+        for (dst, src), (probe_dst, probe_src) in zip(items, probe_items):
+            dst_tpl = self.gen_expr(dst, probe_dst)
+            src_tpl = self.gen_expr(src, probe_src)
+            out.append((dst_tpl, src_tpl, dst_tpl != dst, src_tpl != src))
+        return out
+
+    def build(self, assignblk, extra_irblocks, probe=None):
+        """Build the template from the lifting (@assignblk, @extra_irblocks)
+        @probe: (optional) lifting of the same instruction at
+        self.probe_offset, used to find offset dependent parts
+
+        Raise a ValueError if the liftings cannot be related.
+        """
+        if probe is None:
+            probe_assignblk = None
+            probe_irblocks = [None] * len(extra_irblocks)
+        else:
+            probe_assignblk, probe_irblocks = probe
+            if len(extra_irblocks) != len(probe_irblocks):
+                raise ValueError("Not relocatable")
+        self.assignblk = self.gen_assignblk(assignblk, probe_assignblk)
+        for irblock, probe_irblock in zip(extra_irblocks, probe_irblocks):
+            if probe_irblock is None:
+                probe_loc_key = None
+                probe_assignblks = [None] * len(irblock)
+            else:
+                probe_loc_key = probe_irblock.loc_key
+                probe_assignblks = probe_irblock.assignblks
+                if len(irblock) != len(probe_assignblks):
+                    raise ValueError("Not relocatable")
+            self.extra_irblocks.append((
+                self.gen_loc(irblock.loc_key, probe_loc_key),
+                [
+                    self.gen_assignblk(assignblk, probe_assignblk)
+                    for assignblk, probe_assignblk in zip(
+                            irblock.assignblks,
+                            probe_assignblks
+                    )
+                ]
+            ))
+
+    def instantiate(self, loc_db, instr):
+        """Return the lifting of @instr from the current template
+        @loc_db: LocationDB instance receiving the new locations
+        @instr: instruction instance, with the same bytes as the template one
+        """
+        offset = instr.offset
+        fresh = [loc_db.add_location() for _ in range(len(self.fresh))]
+
+        def get_loc(kind, param):
+            if kind == "const":
+                return param
+            if kind == "fresh":
+                return fresh[param]
+            relative, value = param
+            if relative:
+                value += offset
+            return loc_db.get_or_create_offset_location(value)
+
+        replace = {}
+        for (kind, param, size), placeholder in viewitems(self.placeholders):
+            if kind == "int":
+                value = m2_expr.ExprInt(offset + param, size)
+            elif kind == "fresh_id":
+                value = m2_expr.ExprId(fresh[param], size)
+            else:
+                value = m2_expr.ExprLoc(get_loc(kind, param), size)
+            replace[placeholder] = value
+
+        def gen_assignblk(items):
+            return AssignBlock(
+                {
+                    dst.replace_expr(replace) if dst_dyn else dst:
+                    src.replace_expr(replace) if src_dyn else src
+                    for dst, src, dst_dyn, src_dyn in items
+                },
+                instr
+            )
+
+        assignblk = gen_assignblk(self.assignblk)
+        extra_irblocks = [
+            IRBlock(
+                get_loc(*loc),
+                [gen_assignblk(items) for items in assignblks]
+            )
+            for loc, assignblks in self.extra_irblocks
+        ]
+        if self.except_on_instr is not None:
+            instr.additional_info.except_on_instr = self.except_on_instr
+        return assignblk, extra_irblocks
+
+
+class LiftingCache(object):
+    """Bounded cache of instructions lifting
+
+    Liftings are keyed on the architecture, the instruction bytes and
+    arguments, and the IR configuration (its boolean, integer and string
+    attributes).
+
+    On its first lifting, an instruction is cached for its offset only. Once
+    the same instruction is lifted at another offset, it is lifted again at
+    the complementary offset (every offset bit flipped) to find its offset
+    dependent parts: if they are all locations or integers relative to the
+    instruction offset, the template is relocated on each hit, whatever the
+    offset. Otherwise, the instruction stays cached per offset.
+
+    In any case, the locations created by the semantic (without offset) are
+    generated again on each hit.
+
+    The IR configuration is read on the first lifting of each IR instance:
+    the cache must be cleared if it is modified afterwards.
+    """
+
+    def __init__(self, max_size=LIFTING_CACHE_SIZE):
+        """
+        @max_size: maximum number of cached templates
+        """
+        self.max_size = max_size
+        self._templates = BoundedDict(max_size)
+        # Key -> first offset of the instruction, None if not relocatable
+        self._offsets = BoundedDict(max_size)
+        # IR instance -> configuration part of the keys
+        self._configs = weakref.WeakKeyDictionary()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        "Ratio of liftings served by the cache"
+        total = self.hits + self.misses
+        if not total:
+            return 0.
+        return float(self.hits) / total
+
+    def clear(self):
+        "Empty the cache and reset its counters"
+        self._templates = BoundedDict(self.max_size)
+        self._offsets = BoundedDict(self.max_size)
+        self._configs = weakref.WeakKeyDictionary()
+        self.hits = 0
+        self.misses = 0
+
+    def get_config(self, ir_arch):
+        """Return the configuration of @ir_arch (its boolean, integer and
+        string attributes) as a hashable value
+        @ir_arch: IntermediateRepresentation instance
+        """
+        config = self._configs.get(ir_arch)
+        if config is None:
+            config = tuple(sorted(
+                (name, value) for name, value in viewitems(vars(ir_arch))
+                if isinstance(value, (bool, int_types, str))
+            ))
+            self._configs[ir_arch] = config
+        return config
+
+    def instr2ir(self, ir_arch, instr):
+        """Return the lifting of @instr, as IntermediateRepresentation.instr2ir
+        @ir_arch: IntermediateRepresentation instance
+        @instr: instruction instance
+        """
+        data = getattr(instr, "b", None)
+        offset = getattr(instr, "offset", None)
+        if data is None or offset is None:
+            return ir_arch.instr2ir_uncached(instr)
+        key = (
+            ir_arch.arch.name, ir_arch.attrib,
+            data, instr.name, tuple(instr.args), self.get_config(ir_arch)
+        )
+        for template_key in [(key, None), (key, offset)]:
+            if template_key in self._templates:
+                self.hits += 1
+                return self._templates[template_key].instantiate(
+                    ir_arch.loc_db, instr
+                )
+
+        self.misses += 1
+        assignblk, extra_irblocks = ir_arch.instr2ir_uncached(instr)
+        template = None
+        if key not in self._offsets:
+            self._offsets[key] = offset
+        elif self._offsets[key] not in [None, offset]:
+            template = self.relocatable_template(
+                ir_arch, instr, assignblk, extra_irblocks
+            )
+            if template is None:
+                self._offsets[key] = None
+        if template is not None:
+            self._templates[(key, None)] = template
+            return assignblk, extra_irblocks
+
+        template = LiftingTemplate(ir_arch.loc_db, instr)
+        try:
+            template.build(assignblk, extra_irblocks)
+        except Exception:
+            # Not cached, the lifting itself is valid
+            return assignblk, extra_irblocks
+        self._templates[(key, offset)] = template
+        return assignblk, extra_irblocks
+
+    def relocatable_template(self, ir_arch, instr, assignblk, extra_irblocks):
+        """Return a template of the lifting (@assignblk, @extra_irblocks) of
+        @instr valid at any offset, or None if offset dependent parts cannot
+        be relocated
+        """
+        offset = instr.offset
+        template = LiftingTemplate(ir_arch.loc_db, instr)
+        if template.args_locs:
+            # Locations of the arguments cannot be relocated
+            return None
+        size = max(ir_arch.pc.size, offset.bit_length())
+        probe_offset = offset ^ ((1 << size) - 1)
+
+        # Lift again at the probe offset, without polluting the LocationDB
+        loc_db = ir_arch.loc_db
+        template.probe_loc_db = LocationDB()
+        ir_arch.loc_db = template.probe_loc_db
+        instr.offset = probe_offset
+        try:
+            probe = ir_arch.instr2ir_uncached(instr)
+        except Exception:
+            # The instruction may not be valid at the probe offset
+            return None
+        finally:
+            instr.offset = offset
+            ir_arch.loc_db = loc_db
+
+        template.probe_offset = probe_offset
+        try:
+            template.build(assignblk, extra_irblocks, probe)
+        except Exception:
+            return None
+        return template
+
+
 class IntermediateRepresentation(object):
     """
     Intermediate representation object
@@ -730,6 +1144,14 @@ class IntermediateRepresentation(object):
         self.attrib = attrib
         self.loc_db = loc_db
         self.IRDst = None
+        self.lifting_cache = None
+
+    def enable_lifting_cache(self, max_size=LIFTING_CACHE_SIZE):
+        """Cache the liftings of instructions, see LiftingCache
+        @max_size: maximum number of cached instructions
+        """
+        self.lifting_cache = LiftingCache(max_size)
+        return self.lifting_cache
 
     def get_ir(self, instr):
         raise NotImplementedError("Abstract Method")
@@ -752,6 +1174,11 @@ class IntermediateRepresentation(object):
         return ircfg
 
     def instr2ir(self, instr):
+        if self.lifting_cache is not None:
+            return self.lifting_cache.instr2ir(self, instr)
+        return self.instr2ir_uncached(instr)
+
+    def instr2ir_uncached(self, instr):
         ir_bloc_cur, extra_irblocks = self.get_ir(instr)
         for index, irb in enumerate(extra_irblocks):
             irs = []
@@ -1,5 +1,6 @@
 from builtins import map
-from miasm.expression.expression import ExprInt
+from miasm.expression.expression import ExprInt, TOK_EQUAL, TOK_INF_SIGNED, \
+    TOK_INF_UNSIGNED, TOK_INF_EQUAL_SIGNED, TOK_INF_EQUAL_UNSIGNED
 from miasm.ir.translators.translator import Translator
 
 
@@ -13,7 +14,23 @@ class TranslatorPython(Translator):
     # Implemented language
     __LANG__ = "Python"
     # Operations translation
-    op_no_translate = ["+", "-", "/", "%", ">>", "<<", "&", "^", "|", "*"]
+    op_no_translate = ["+", "-", "%", ">>", "<<", "&", "^", "|", "*"]
+    op_compare = {
+        TOK_EQUAL: "==",
+        TOK_INF_UNSIGNED: "<",
+        TOK_INF_EQUAL_UNSIGNED: "<=",
+        TOK_INF_SIGNED: "<",
+        TOK_INF_EQUAL_SIGNED: "<=",
+    }
+
+    def to_signed(self, value, size):
+        """Return the Python code interpreting @value, the Python code of an
+        unsigned integer of @size bits, as a signed integer"""
+        return "((%s ^ 0x%x) - 0x%x)" % (
+            value,
+            1 << (size - 1),
+            1 << (size - 1)
+        )
 
     def from_ExprInt(self, expr):
         return str(expr)
@@ -69,8 +86,61 @@ class TranslatorPython(Translator):
                     (" %s " % expr.op).join(args),
                     (1 << expr.size) - 1
                 )
+        elif expr.op == "/":
+            return "(%s // %s)" % (
+                self.from_expr(expr.args[0]),
+                self.from_expr(expr.args[1])
+            )
+
+        elif expr.op == "a>>":
+            return "((%s >> %s) & 0x%x)" % (
+                self.to_signed(self.from_expr(expr.args[0]), expr.size),
+                self.from_expr(expr.args[1]),
+                (1 << expr.size) - 1
+            )
+
+        elif expr.op in ["udiv", "umod"]:
+            return "((%s %s %s) & 0x%x)" % (
+                self.from_expr(expr.args[0]),
+                "//" if expr.op == "udiv" else "%",
+                self.from_expr(expr.args[1]),
+                (1 << expr.size) - 1
+            )
+
+        elif expr.op in self.op_compare:
+            args = list(map(self.from_expr, expr.args))
+            if expr.op in [TOK_INF_SIGNED, TOK_INF_EQUAL_SIGNED]:
+                args = [
+                    self.to_signed(arg, expr.args[0].size) for arg in args
+                ]
+            return "int(%s %s %s)" % (
+                args[0],
+                self.op_compare[expr.op],
+                args[1]
+            )
+
         elif expr.op == "parity":
-            return "(%s & 0x1)" % self.from_expr(expr.args[0])
+            return "((bin(%s & 0xff).count('1') + 1) & 1)" % (
+                self.from_expr(expr.args[0])
+            )
+
+        elif expr.op == "cntleadzeros":
+            return "(%d - (%s).bit_length())" % (
+                expr.size,
+                self.from_expr(expr.args[0])
+            )
+
+        elif expr.op.startswith("zeroExt"):
+            return self.from_expr(expr.args[0])
+
+        elif expr.op.startswith("signExt"):
+            return "(%s & 0x%x)" % (
+                self.to_signed(
+                    self.from_expr(expr.args[0]),
+                    expr.args[0].size
+                ),
+                (1 << expr.size) - 1
+            )
 
         elif expr.op in ["<<<", ">>>"]:
             amount_raw = expr.args[1]
@@ -4,6 +4,17 @@ import miasm.expression.expression as m2_expr
 from miasm.core.utils import BoundedDict
 
 
+# Expr class -> sub-expressions translated before the expression itself
+SUB_EXPRS = {
+    m2_expr.ExprOp: lambda expr: expr.args,
+    m2_expr.ExprCompose: lambda expr: expr.args,
+    m2_expr.ExprMem: lambda expr: (expr.ptr,),
+    m2_expr.ExprSlice: lambda expr: (expr.arg,),
+    m2_expr.ExprCond: lambda expr: (expr.cond, expr.src1, expr.src2),
+    m2_expr.ExprAssign: lambda expr: (expr.dst, expr.src),
+}
+
+
 class Translator(object):
     "Abstract parent class for translators."
 
@@ -41,7 +52,38 @@ class Translator(object):
         """Instance a translator
         @cache_size: (optional) Expr cache size
         """
+        self.cache_size = cache_size
         self._cache = BoundedDict(cache_size)
+        # Expr -> exception of its handler, during a from_expr traversal
+        self._failures = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @classmethod
+    def get_handlers(cls):
+        """Return the Expr class -> handler dictionary of the translator
+        class, built once per class"""
+        handlers = cls.__dict__.get("_handlers")
+        if handlers is None:
+            handlers = {
+                m2_expr.ExprInt: cls.from_ExprInt,
+                m2_expr.ExprId: cls.from_ExprId,
+                m2_expr.ExprLoc: cls.from_ExprLoc,
+                m2_expr.ExprCompose: cls.from_ExprCompose,
+                m2_expr.ExprSlice: cls.from_ExprSlice,
+                m2_expr.ExprOp: cls.from_ExprOp,
+                m2_expr.ExprMem: cls.from_ExprMem,
+                m2_expr.ExprAssign: cls.from_ExprAssign,
+                m2_expr.ExprCond: cls.from_ExprCond
+            }
+            cls._handlers = handlers
+        return handlers
+
+    def cache_clear(self):
+        "Empty the translation cache and reset its counters"
+        self._cache = BoundedDict(self.cache_size)
+        self.cache_hits = 0
+        self.cache_misses = 0
 
     def from_ExprInt(self, expr):
         """Translate an ExprInt
@@ -97,31 +139,89 @@ class Translator(object):
         """
         raise NotImplementedError("Abstract method")
 
+    def translate(self, expr):
+        """Translate @expr according to its type, without using the cache for
+        @expr itself
+        @expr: expression to translate
+        """
+        handlers = self.get_handlers()
+        handler = handlers.get(expr.__class__)
+        if handler is None:
+            for target, handler in viewitems(handlers):
+                if isinstance(expr, target):
+                    break
+            else:
+                raise ValueError("Unhandled type for %s" % expr)
+        return handler(self, expr)
+
     def from_expr(self, expr):
         """Translate an expression according to its type
         @expr: expression to translate
         """
         # Use cache
-        if expr in self._cache:
-            return self._cache[expr]
-
-        # Handle Expr type
-        handlers = {
-            m2_expr.ExprInt: self.from_ExprInt,
-            m2_expr.ExprId: self.from_ExprId,
-            m2_expr.ExprLoc: self.from_ExprLoc,
-            m2_expr.ExprCompose: self.from_ExprCompose,
-            m2_expr.ExprSlice: self.from_ExprSlice,
-            m2_expr.ExprOp: self.from_ExprOp,
-            m2_expr.ExprMem: self.from_ExprMem,
-            m2_expr.ExprAssign: self.from_ExprAssign,
-            m2_expr.ExprCond: self.from_ExprCond
-        }
-        for target, handler in viewitems(handlers):
-            if isinstance(expr, target):
-                ## Compute value and update the internal cache
-                ret = handler(expr)
-                self._cache[expr] = ret
-                return ret
-        raise ValueError("Unhandled type for %s" % expr)
-
+        cache = self._cache
+        try:
+            ret = cache[expr]
+        except KeyError:
+            pass
+        else:
+            self.cache_hits += 1
+            return ret
+
+        failures = self._failures
+        if failures is not None and expr in failures:
+            # Already failed during the current traversal
+            raise failures[expr]
+
+        if failures is None and expr.__class__ in SUB_EXPRS:
+            self._failures = {}
+            try:
+                return self._from_expr_traversal(expr)
+            finally:
+                self._failures = None
+
+        ## Compute value and update the internal cache
+        self.cache_misses += 1
+        ret = self.translate(expr)
+        cache[expr] = ret
+        return ret
+
+    def _from_expr_traversal(self, expr):
+        """Translate @expr and its sub-expressions, see from_expr
+        @expr: expression with sub-expressions to translate
+        """
+        cache = self._cache
+        failures = self._failures
+        # Translate sub-expressions first, in post-order and without
+        # recursion: handlers then find the translation of their
+        # arguments in the cache. Leaves (ExprId, ExprInt, ...) are left
+        # to their parent handler
+        handlers = self.get_handlers()
+        todo = [(expr, False)]
+        while todo:
+            node, ready = todo.pop()
+            if ready:
+                if node is expr:
+                    break
+                self.cache_misses += 1
+                try:
+                    cache[node] = handlers[node.__class__](self, node)
+                except Exception as error:
+                    # Some handlers do not translate each of their
+                    # arguments: only fail if the parent handler needs
+                    # this one, raising the same error again
+                    failures[node] = error
+                continue
+            if node is not expr and (node in cache or node in failures):
+                # Shared sub-expression, already handled
+                continue
+            todo.append((node, True))
+            for sub_expr in reversed(SUB_EXPRS[node.__class__](node)):
+                if sub_expr.__class__ in SUB_EXPRS:
+                    todo.append((sub_expr, False))
+
+        ## Compute value and update the internal cache
+        self.cache_misses += 1
+        ret = self.translate(expr)
+        cache[expr] = ret
+        return ret
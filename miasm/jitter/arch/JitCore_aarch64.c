@@ -49,10 +49,10 @@ reg_dict gpreg_dict[] = {
 	{.name = "SP", .offset = offsetof(struct vm_cpu, SP), .size = 64},
 	{.name = "PC", .offset = offsetof(struct vm_cpu, PC), .size = 64},
 
-	{.name = "zf", .offset = offsetof(struct vm_cpu, zf), .size = 8},
-	{.name = "nf", .offset = offsetof(struct vm_cpu, nf), .size = 8},
-	{.name = "of", .offset = offsetof(struct vm_cpu, of), .size = 8},
-	{.name = "cf", .offset = offsetof(struct vm_cpu, cf), .size = 8},
+	{.name = "zf", .offset = offsetof(struct vm_cpu, zf), .size = 32},
+	{.name = "nf", .offset = offsetof(struct vm_cpu, nf), .size = 32},
+	{.name = "of", .offset = offsetof(struct vm_cpu, of), .size = 32},
+	{.name = "cf", .offset = offsetof(struct vm_cpu, cf), .size = 32},
 
 	{.name = "exception_flags", .offset = offsetof(struct vm_cpu, exception_flags), .size = 32},
 	{.name = "interrupt_num", .offset = offsetof(struct vm_cpu, interrupt_num), .size = 32},
@@ -433,6 +433,34 @@ PyObject* cpu_get_segm_base(JitCpu* self, PyObject* args)
 	return v;
 }
 
+PyObject* cpu_get_segm_bases(JitCpu* self, PyObject* args)
+{
+	/* Return a dict selector -> base, of the non-zero segment bases */
+	PyObject *dict, *key, *value;
+	uint64_t segm_num, segm_base;
+
+	dict = PyDict_New();
+	if (dict == NULL)
+		return NULL;
+	for (segm_num = 0; segm_num < 0x10000; segm_num++) {
+		segm_base = ((struct vm_cpu*)self->cpu)->segm_base[segm_num];
+		if (segm_base == 0)
+			continue;
+		key = PyLong_FromUnsignedLongLong(segm_num);
+		value = PyLong_FromUnsignedLongLong(segm_base);
+		if (key == NULL || value == NULL ||
+		    PyDict_SetItem(dict, key, value) < 0) {
+			Py_XDECREF(key);
+			Py_XDECREF(value);
+			Py_DECREF(dict);
+			return NULL;
+		}
+		Py_DECREF(key);
+		Py_DECREF(value);
+	}
+	return dict;
+}
+
 uint64_t segm2addr(JitCpu* jitcpu, uint64_t segm, uint64_t addr)
 {
 	return addr + ((struct vm_cpu*)jitcpu->cpu)->segm_base[segm & 0xFFFF];
@@ -479,6 +507,8 @@ static PyMethodDef JitCpu_methods[] = {
 	 "X"},
 	{"set_segm_base", (PyCFunction)cpu_set_segm_base, METH_VARARGS,
 	 "X"},
+	{"get_segm_bases", (PyCFunction)cpu_get_segm_bases, METH_NOARGS,
+	 "X"},
 	{"get_exception", (PyCFunction)cpu_get_exception, METH_VARARGS,
 	 "X"},
 	{"set_exception", (PyCFunction)cpu_set_exception, METH_VARARGS,
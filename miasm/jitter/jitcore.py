@@ -111,7 +111,7 @@ class JitCore(object):
 
     def add_block_to_mem_interval(self, vm, block):
         "Update vm to include block addresses in its memory range"
-        self.blocks_mem_interval += interval([(block.ad_min, block.ad_max - 1)])
+        self.blocks_mem_interval.add(block.ad_min, block.ad_max - 1)
 
         vm.reset_code_bloc_pool()
         for a, b in self.blocks_mem_interval:
@@ -222,6 +222,8 @@ class JitCore(object):
 
         # Find concerned blocks
         modified_blocks = set()
+        if not self.blocks_mem_interval.overlaps(ad1, ad2 - 1):
+            return modified_blocks
         for block in viewvalues(self.loc_key_to_block):
             if not block.lines:
                 continue
@@ -1,9 +1,15 @@
 from __future__ import print_function
 from builtins import zip
+import re
+import struct
+
 import miasm.jitter.jitcore as jitcore
-from miasm.expression.expression import ExprInt, ExprLoc
+from miasm.core.utils import decode_hex, encode_hex
+from miasm.expression.expression import ExprId, ExprInt, ExprLoc, ExprOp, \
+    LocKey, get_expr_ids, get_expr_mem
 import miasm.jitter.csts as csts
 from miasm.expression.simplifications import expr_simp_explicit
+from miasm.ir.translators.python import TranslatorPython
 from miasm.jitter.emulatedsymbexec import EmulatedSymbExec
 
 ################################################################################
@@ -11,6 +17,137 @@ from miasm.jitter.emulatedsymbexec import EmulatedSymbExec
 ################################################################################
 
 
+MEM_STRUCTS_LE = {
+    1: struct.Struct("<B"),
+    2: struct.Struct("<H"),
+    4: struct.Struct("<I"),
+    8: struct.Struct("<Q"),
+}
+
+MEM_STRUCTS_BE = {
+    1: struct.Struct(">B"),
+    2: struct.Struct(">H"),
+    4: struct.Struct(">I"),
+    8: struct.Struct(">Q"),
+}
+
+
+def mem_read_le(vmmngr, addr, size):
+    """Read @size bytes at @addr from a little endian @vmmngr"""
+    value = vmmngr.get_mem(addr, size)
+    vmmngr.add_mem_read(addr, size)
+    packer = MEM_STRUCTS_LE.get(size)
+    if packer is not None:
+        return packer.unpack(value)[0]
+    return int(encode_hex(value[::-1]), 16)
+
+
+def mem_read_be(vmmngr, addr, size):
+    """Read @size bytes at @addr from a big endian @vmmngr"""
+    value = vmmngr.get_mem(addr, size)
+    vmmngr.add_mem_read(addr, size)
+    packer = MEM_STRUCTS_BE.get(size)
+    if packer is not None:
+        return packer.unpack(value)[0]
+    return int(encode_hex(value), 16)
+
+
+def _int_to_bytes(value, size):
+    """Return the big endian representation of @value on @size bytes"""
+    content = hex(value).replace("0x", "").replace("L", "")
+    content = "0" * (size * 2 - len(content)) + content
+    return decode_hex(content)
+
+
+def mem_write_le(vmmngr, addr, value, size):
+    """Write @value on @size bytes at @addr in a little endian @vmmngr"""
+    packer = MEM_STRUCTS_LE.get(size)
+    if packer is not None:
+        vmmngr.set_mem(addr, packer.pack(value))
+    else:
+        vmmngr.set_mem(addr, _int_to_bytes(value, size)[::-1])
+
+
+def mem_write_be(vmmngr, addr, value, size):
+    """Write @value on @size bytes at @addr in a big endian @vmmngr"""
+    packer = MEM_STRUCTS_BE.get(size)
+    if packer is not None:
+        vmmngr.set_mem(addr, packer.pack(value))
+    else:
+        vmmngr.set_mem(addr, _int_to_bytes(value, size))
+
+
+class TranslatorJitPython(TranslatorPython):
+    """Translate expressions of a jitted block to Python code
+
+    - ExprId are mapped on local variables of the generated function
+    - ExprMem are read through the mem_read(vmmngr, addr, size) helper
+    - ExprLoc are replaced by their offset, or by a LocKey constant
+    - operators unknown to TranslatorPython are evaluated by the jitter
+      expression simplifier, through the fallback(template, args) helper
+    """
+
+    def __init__(self, loc_db, *args, **kwargs):
+        super(TranslatorJitPython, self).__init__(*args, **kwargs)
+        self.loc_db = loc_db
+        # ExprId -> local name
+        self.local_names = {}
+        # Python object -> constant name
+        self.constants = {}
+
+    def get_local(self, expr):
+        """Return the local variable name associated to the ExprId @expr"""
+        name = self.local_names.get(expr)
+        if name is None:
+            name = "R_%s_%d" % (
+                re.sub(r"\W", "_", expr.name),
+                len(self.local_names)
+            )
+            self.local_names[expr] = name
+        return name
+
+    def get_constant(self, value):
+        """Return the name under which @value is available to the generated
+        code"""
+        name = self.constants.get(value)
+        if name is None:
+            name = "C_%d" % len(self.constants)
+            self.constants[value] = name
+        return name
+
+    def from_ExprId(self, expr):
+        return self.get_local(expr)
+
+    def from_ExprLoc(self, expr):
+        offset = self.loc_db.get_location_offset(expr.loc_key)
+        if offset is not None:
+            return "0x%x" % offset
+        return self.get_constant(expr.loc_key)
+
+    def from_ExprMem(self, expr):
+        return "mem_read(vmmngr, %s, %d)" % (
+            self.from_expr(expr.ptr),
+            expr.size // 8
+        )
+
+    def from_ExprOp(self, expr):
+        try:
+            return super(TranslatorJitPython, self).from_ExprOp(expr)
+        except NotImplementedError:
+            pass
+        template = ExprOp(
+            expr.op,
+            *[
+                ExprId("__arg%d" % index, arg.size)
+                for index, arg in enumerate(expr.args)
+            ]
+        )
+        return "fallback(%s, (%s,))" % (
+            self.get_constant(template),
+            ", ".join(self.from_expr(arg) for arg in expr.args)
+        )
+
+
 class JitCore_Python(jitcore.JitCore):
     "JiT management, using Miasm2 Symbol Execution engine as backend"
 
@@ -29,6 +166,8 @@ class JitCore_Python(jitcore.JitCore):
             sb_expr_simp=expr_simp_explicit
         )
         self.symbexec.enable_emulated_simplifications()
+        # Python source -> code object
+        self._code_cache = {}
 
     def set_cpu_vm(self, cpu, vm):
         self.symbexec.cpu = cpu
@@ -54,156 +193,288 @@ class JitCore_Python(jitcore.JitCore):
             cgen_class = CGen
         return cgen_class(self.ir_arch), has_delayslot
 
-    def add_block(self, asmblock):
-        """Create a python function corresponding to an AsmBlock
+    def engine_read(self, expr):
+        """Return the current value of @expr in the execution engine, as an
+        integer or a LocKey
+        @expr: ExprId not backed by the cpu"""
+        value = self.symbexec.eval_expr(expr)
+        if value.is_int():
+            return int(value)
+        if value.is_loc():
+            return value.loc_key
+        return value
+
+    def engine_write(self, expr, value):
+        """Store @value as the new value of @expr in the execution engine
+        @expr: ExprId not backed by the cpu
+        @value: integer or LocKey"""
+        if isinstance(value, LocKey):
+            value = ExprLoc(value, expr.size)
+        else:
+            value = ExprInt(value, expr.size)
+        self.symbexec.symbols.write(expr, value)
+
+    def eval_op_fallback(self, template, values):
+        """Evaluate the operator @template on concrete @values using the
+        execution engine simplifier
+        @template: ExprOp whose arguments are placeholders
+        @values: tuple of integer or LocKey"""
+        replace = {}
+        for arg, value in zip(template.args, values):
+            if isinstance(value, LocKey):
+                replace[arg] = ExprLoc(value, arg.size)
+            else:
+                replace[arg] = ExprInt(value, arg.size)
+        result = self.symbexec.expr_simp(template.replace_expr(replace))
+        if result.is_int():
+            return int(result)
+        if result.is_loc():
+            offset = self.ir_arch.loc_db.get_location_offset(result.loc_key)
+            if offset is None:
+                return result.loc_key
+            return offset
+        raise RuntimeError("A simplification is missing: %s" % result)
+
+    def gen_python(self, asmblock):
+        """Generate the Python source of a function executing @asmblock
+
+        Returns the source and the constants it depends on
         @asmblock: AsmBlock
         """
 
-        # TODO: merge duplicate code with CGen, llvmconvert
         codegen, has_delayslot = self.arch_specific()
         irblocks_list = codegen.block2assignblks(asmblock)
-        instr_offsets = [line.offset for line in asmblock.lines]
-
         loc_db = self.ir_arch.loc_db
-        local_loc_keys = []
+        cpu = self.symbexec.cpu
+        translator = TranslatorJitPython(loc_db)
+
+        local_index = {}
+        local_offsets = {}
         for irblocks in irblocks_list:
             for irblock in irblocks:
-                local_loc_keys.append(irblock.loc_key)
-
-        def myfunc(cpu):
-            """Execute the function according to cpu and vmmngr states
-            @cpu: JitCpu instance
-            """
-            # Get virtual memory handler
-            vmmngr = cpu.vmmngr
-
-            # Get execution engine (EmulatedSymbExec instance)
-            exec_engine = self.symbexec
-
-            # Refresh CPU values according to @cpu instance
-            exec_engine.update_engine_from_cpu()
-
-            # Get initial loc_key
-            cur_loc_key = asmblock.loc_key
-
-            # Update PC helper
-            update_pc = lambda value: setattr(cpu, self.ir_arch.pc.name, value)
-
-            while True:
-                # Retrieve the expected irblock
-                for instr, irblocks in zip(asmblock.lines, irblocks_list):
-                    for index, irblock in enumerate(irblocks):
-                        if irblock.loc_key == cur_loc_key:
-                            break
-                    else:
-                        continue
-                    break
-                else:
-                    raise RuntimeError("Unable to find the block for %r" % cur_loc_key)
-
-                instr_attrib, irblocks_attributes = codegen.get_attributes(
-                    instr, irblocks, self.log_mn, self.log_regs
-                )
-                irblock_attributes = irblocks_attributes[index]
-
-                # Do IRBlock
-                new_irblock = self.ir_arch.irbloc_fix_regs_for_mode(
-                    irblock, self.ir_arch.attrib
-                )
-                if index == 0:
-                    # Pre code
-                    if instr_attrib.log_mn:
-                        print("%.8X %s" % (
-                            instr_attrib.instr.offset,
-                            instr_attrib.instr.to_string(loc_db)
+                index = len(local_index)
+                local_index[irblock.loc_key] = index
+                offset = loc_db.get_location_offset(irblock.loc_key)
+                if offset is not None:
+                    local_offsets[offset] = index
+
+        def cpu_attr(name):
+            if re.match(r"^[A-Za-z_]\w*$", name):
+                return "cpu.%s" % name
+            return "getattr(cpu, %r)" % name
+
+        written = set()
+        body = []
+
+        def emit(level, line):
+            body.append("    " * level + line)
+
+        def emit_writeback(level):
+            # Filled once all the written ids are known
+            body.append((level, "writeback"))
+
+        def emit_exit(level, offset):
+            emit_writeback(level)
+            emit(level, "%s = %s" % (cpu_attr(self.ir_arch.pc.name), offset))
+            emit(level, "return %s" % offset)
+
+        mem_flag = csts.EXCEPT_DO_NOT_UPDATE_PC & ~csts.EXCEPT_CODE_AUTOMOD
+
+        for instr, irblocks in zip(asmblock.lines, irblocks_list):
+            instr_attrib, irblocks_attributes = codegen.get_attributes(
+                instr, irblocks, self.log_mn, self.log_regs
+            )
+            for irb_index, irblock in enumerate(irblocks):
+                emit(2, "if index == %d:" % local_index[irblock.loc_key])
+                if irb_index == 0 and instr_attrib.log_mn:
+                    emit(3, "print(%s)" % translator.get_constant(
+                        "%.8X %s" % (instr.offset, instr.to_string(loc_db))
+                    ))
+
+                for assignblk, attributes in zip(
+                        irblock, irblocks_attributes[irb_index]
+                ):
+                    # Evaluate sources and destination pointers
+                    temporaries = []
+                    mem_writes = []
+                    direct = []
+                    for dst, src in assignblk.items():
+                        src = self.symbexec.expr_simp(src)
+                        code = translator.from_expr(src)
+                        if dst.is_mem():
+                            ptr = translator.from_expr(
+                                self.symbexec.expr_simp(dst.ptr)
+                            )
+                            tmp = "t%d" % len(temporaries)
+                            temporaries.append((tmp, code))
+                            ptr_tmp = "t%d" % len(temporaries)
+                            temporaries.append((ptr_tmp, ptr))
+                            mem_writes.append((ptr_tmp, tmp, dst.size // 8))
+                            continue
+                        written.add(dst)
+                        name = translator.get_local(dst)
+                        # Sources read the state preceding the assignblk
+                        if (get_expr_ids(src).intersection(assignblk) or
+                                get_expr_mem(src)):
+                            tmp = "t%d" % len(temporaries)
+                            temporaries.append((tmp, code))
+                            direct.append((name, tmp))
+                        else:
+                            direct.append((name, code))
+
+                    for tmp, code in temporaries:
+                        emit(3, "%s = %s" % (tmp, code))
+                    for ptr, value, size in mem_writes:
+                        emit(3, "mem_write(vmmngr, %s, %s, %d)" % (
+                            ptr, value, size
                         ))
 
-                # Exec IRBlock
-                instr = instr_attrib.instr
-
-                for index, assignblk in enumerate(irblock):
-                    attributes = irblock_attributes[index]
-
-                    # Eval current instruction (in IR)
-                    exec_engine.eval_updt_assignblk(assignblk)
-
                     # Check memory access / write exception
-                    # TODO: insert a check between memory reads and writes
                     if attributes.mem_read or attributes.mem_write:
-                        # Restricted exception
-                        flag = ~csts.EXCEPT_CODE_AUTOMOD & csts.EXCEPT_DO_NOT_UPDATE_PC
-                        if (vmmngr.get_exception() & flag != 0):
-                            # Do not update registers
-                            update_pc(instr.offset)
-                            return instr.offset
+                        emit(3, "if vmmngr.get_exception() & 0x%x:" % mem_flag)
+                        # Do not update registers
+                        emit_exit(4, instr.offset)
 
                     # Update registers values
-                    exec_engine.update_cpu_from_engine()
+                    for name, code in direct:
+                        emit(3, "%s = %s" % (name, code))
 
                     # Check post assignblk exception flags
                     if attributes.set_exception:
-                        # Restricted exception
-                        if cpu.get_exception() > csts.EXCEPT_NUM_UPDT_EIP:
-                            # Update PC
-                            update_pc(instr.offset)
-                            return instr.offset
-
-                dst = exec_engine.eval_expr(self.ir_arch.IRDst)
-                if dst.is_int():
-                    loc_key = loc_db.get_or_create_offset_location(int(dst))
-                    dst = ExprLoc(loc_key, dst.size)
-
-                assert dst.is_loc()
-                loc_key = dst.loc_key
-                offset = loc_db.get_location_offset(loc_key)
-                if offset is None:
-                    # Avoid checks on generated label
-                    cur_loc_key = loc_key
-                    continue
+                        emit_writeback(3)
+                        emit(3, "if cpu.get_exception() > 0x%x:" %
+                             csts.EXCEPT_NUM_UPDT_EIP)
+                        emit(4, "%s = %d" % (
+                            cpu_attr(self.ir_arch.pc.name), instr.offset
+                        ))
+                        emit(4, "return %d" % instr.offset)
+
+                # Resolve destination
+                emit(3, "dst = %s" % translator.get_local(self.ir_arch.IRDst))
+                emit(3, "if isinstance(dst, LocKey):")
+                emit(4, "offset = get_location_offset(dst)")
+                emit(4, "if offset is None:")
+                # Avoid checks on generated label
+                emit(5, "index = local_index.get(dst)")
+                emit(5, "continue")
+                emit(3, "else:")
+                emit(4, "offset = dst")
 
                 if instr_attrib.log_regs:
-                    update_pc(offset)
-                    cpu.dump_gpregs_with_attrib(self.ir_arch.attrib)
+                    emit_writeback(3)
+                    emit(3, "%s = offset" % cpu_attr(self.ir_arch.pc.name))
+                    emit(3, "cpu.dump_gpregs_with_attrib(%r)" %
+                         self.ir_arch.attrib)
 
                 # Post-instr checks
                 if instr_attrib.mem_read | instr_attrib.mem_write:
-                    vmmngr.check_memory_breakpoint()
-                    vmmngr.check_invalid_code_blocs()
-                    if vmmngr.get_exception():
-                        update_pc(offset)
-                        return offset
+                    emit(3, "vmmngr.check_memory_breakpoint()")
+                    emit(3, "vmmngr.check_invalid_code_blocs()")
+                    emit(3, "if vmmngr.get_exception():")
+                    emit_exit(4, "offset")
 
                 if instr_attrib.set_exception:
-                    if cpu.get_exception():
-                        update_pc(offset)
-                        return offset
+                    emit_writeback(3)
+                    emit(3, "if cpu.get_exception():")
+                    emit_exit(4, "offset")
 
                 if instr_attrib.mem_read | instr_attrib.mem_write:
-                    vmmngr.reset_memory_access()
+                    emit(3, "vmmngr.reset_memory_access()")
 
                 # Manage resulting address
-                if (loc_key in local_loc_keys and
-                    offset > instr.offset):
-                    # Forward local jump
-                    # Note: a backward local jump has to be promoted to extern,
-                    # for max_exec_per_call support
-                    cur_loc_key = loc_key
-                    continue
+                # Note: a backward local jump has to be promoted to extern,
+                # for max_exec_per_call support
+                emit(3, "if offset > %d and offset in local_offsets:" %
+                     instr.offset)
+                emit(4, "index = local_offsets[offset]")
+                emit(4, "continue")
 
                 # Delay slot
                 if has_delayslot:
-                    delay_slot_set = exec_engine.eval_expr(codegen.delay_slot_set)
-                    if delay_slot_set.is_int() and int(delay_slot_set) != 0:
-                        return int(exec_engine.eval_expr(codegen.delay_slot_dst))
+                    emit(3, "if %s:" % translator.from_expr(
+                        codegen.delay_slot_set
+                    ))
+                    emit_writeback(4)
+                    emit(4, "return %s" % translator.from_expr(
+                        codegen.delay_slot_dst
+                    ))
+
+                # Extern of asmblock
+                emit_writeback(3)
+                emit(3, "return offset")
+
+        # Registers are loaded in locals on entry, and stored back on exit
+        prologue = []
+        writeback = []
+        for expr, name in sorted(
+                translator.local_names.items(), key=lambda item: item[1]
+        ):
+            if hasattr(cpu, expr.name):
+                prologue.append("%s = %s" % (name, cpu_attr(expr.name)))
+                if expr in written:
+                    writeback.append("%s = %s" % (cpu_attr(expr.name), name))
+            else:
+                const = translator.get_constant(expr)
+                prologue.append("%s = engine_read(%s)" % (name, const))
+                if expr in written and expr != self.ir_arch.IRDst:
+                    writeback.append("engine_write(%s, %s)" % (const, name))
+
+        out = ["def jitted_block(cpu):"]
+        out.append("    vmmngr = cpu.vmmngr")
+        out += ["    " + line for line in prologue]
+        out.append("    index = 0")
+        out.append("    while True:")
+        for line in body:
+            if isinstance(line, tuple):
+                level, _ = line
+                out += ["    " * level + wb_line for wb_line in writeback]
+            else:
+                out.append(line)
+        out.append(
+            "        raise RuntimeError("
+            "\"Unable to find the block for %r\" % (dst,))"
+        )
 
-                # Extern of asmblock, must have an offset
-                assert offset is not None
-                return offset
+        constants = dict(
+            (name, value) for value, name in translator.constants.items()
+        )
+        constants["local_index"] = local_index
+        constants["local_offsets"] = local_offsets
+        return "\n".join(out) + "\n", constants
 
-        # Associate myfunc with current loc_key
+    def add_block(self, asmblock):
+        """Create a python function corresponding to an AsmBlock
+        @asmblock: AsmBlock
+        """
+
+        source, constants = self.gen_python(asmblock)
+        code = self._code_cache.get(source)
+        if code is None:
+            code = compile(source, "<jitted block>", "exec")
+            self._code_cache[source] = code
+
+        loc_db = self.ir_arch.loc_db
+        if self.symbexec.vm.is_little_endian():
+            mem_read, mem_write = mem_read_le, mem_write_le
+        else:
+            mem_read, mem_write = mem_read_be, mem_write_be
+
+        namespace = dict(constants)
+        namespace.update({
+            "LocKey": LocKey,
+            "mem_read": mem_read,
+            "mem_write": mem_write,
+            "fallback": self.eval_op_fallback,
+            "engine_read": self.engine_read,
+            "engine_write": self.engine_write,
+            "get_location_offset": loc_db.get_location_offset,
+        })
+        exec(code, namespace)
+
+        # Associate the function with current loc_key
         offset = loc_db.get_location_offset(asmblock.loc_key)
         assert offset is not None
-        self.offset_to_jitted_func[offset] = myfunc
+        self.offset_to_jitted_func[offset] = namespace["jitted_block"]
 
     def exec_wrapper(self, loc_key, cpu, _offset_to_jitted_func, _stop_offsets,
                      _max_exec_per_call):
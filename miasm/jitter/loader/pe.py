@@ -1,4 +1,5 @@
 from builtins import map
+import hashlib
 import os
 import struct
 import logging
@@ -171,21 +172,102 @@ def get_export_name_addr_list(e):
     return out
 
 
-def vm_load_pe(vm, fdata, align_s=True, load_hdr=True, name="", winobjs=None, **kargs):
-    """Load a PE in memory (@vm) from a data buffer @fdata
-    @vm: VmMngr instance
-    @fdata: data buffer to parse
-    @align_s: (optional) If False, keep gaps between section
-    @load_hdr: (optional) If False, do not load the NThdr in memory
-    Return the corresponding PE instance.
+def get_exports_pe(e):
+    """Collect the symbols exported by the given PE, with their redirection.
+    @e: PE instance
+    Returns a list of tuples (symbol name string or ordinal, virtual address,
+    redirection), where redirection is the result of is_redirected_export.
+    """
+    return [
+        (imp_ord_or_name, ad, is_redirected_export(e, ad))
+        for imp_ord_or_name, ad in get_export_name_addr_list(e)
+    ]
+
+
+class PeImage(object):
+
+    """PE parsed by a PeImageCache, with its memory pages and its exports"""
+
+    def __init__(self, pe, pages):
+        """
+        @pe: PE instance
+        @pages: memory pages of @pe, as returned by _get_pe_pages
+        """
+        self.pe = pe
+        self.pages = pages
+        self._exports = None
+
+    @property
+    def exports(self):
+        """Exported symbols of the PE, as returned by get_exports_pe"""
+        if self._exports is None:
+            self._exports = get_exports_pe(self.pe)
+        return self._exports
+
+
+class PeImageCache(object):
 
-    Extra arguments are passed to PE instantiation.
-    If all sections are aligned, they will be mapped on several different pages
-    Otherwise, a big page is created, containing all sections
     """
+    Cache of parsed PE images, keyed by the hash of their content and their
+    loading options. As images are mapped at their preferred base address,
+    the load base is part of the hashed content.
 
-    # Parse and build a PE instance
-    pe = pe_init.PE(fdata, **kargs)
+    A cached image is mapped in a new VmMngr by copying its pages, without
+    parsing nor aligning its sections again, and its exports (names,
+    addresses and redirections) are only computed once.
+
+    Usage:
+    cache = PeImageCache()
+    vm_load_pe_libs(vm, ["kernel32.dll"], libs, "win_dll", image_cache=cache)
+    """
+
+    def __init__(self):
+        self._images = {}
+        self._pe2image = {}
+
+    def get_image(self, fdata, align_s=True, load_hdr=True, **kargs):
+        """Return the PeImage of the PE data buffer @fdata, parsing it if it
+        is not cached yet.
+        See vm_load_pe for the arguments.
+        """
+        key = (
+            hashlib.sha256(fdata).digest(),
+            align_s,
+            load_hdr,
+            repr(sorted(kargs.items())),
+        )
+        image = self._images.get(key)
+        if image is None:
+            pe = pe_init.PE(fdata, **kargs)
+            image = PeImage(pe, _get_pe_pages(pe, align_s, load_hdr))
+            self._images[key] = image
+            self._pe2image[id(pe)] = image
+        return image
+
+    def get_exports(self, pe):
+        """Return the exports of the PE instance @pe, as returned by
+        get_exports_pe. They are cached if @pe comes from this cache"""
+        image = self._pe2image.get(id(pe))
+        if image is None:
+            return get_exports_pe(pe)
+        return image.exports
+
+    def clear(self):
+        """Remove every cached image"""
+        self._images.clear()
+        self._pe2image.clear()
+
+    def __len__(self):
+        return len(self._images)
+
+
+def _get_pe_pages(pe, align_s=True, load_hdr=True):
+    """Compute the memory pages of the PE @pe, as a list of
+    (address, access, data, description, allocated), where @description is
+    None for anonymous pages and @allocated is True if the page must be
+    registered in winobjs.allocated_pages.
+    See vm_load_pe for @align_s and @load_hdr.
+    """
 
     # Check if all section are aligned
     aligned = True
@@ -194,6 +276,7 @@ def vm_load_pe(vm, fdata, align_s=True, load_hdr=True, name="", winobjs=None, **
             aligned = False
             break
 
+    pages = []
     if aligned:
         # Loader NT header
         if load_hdr:
@@ -207,15 +290,13 @@ def vm_load_pe(vm, fdata, align_s=True, load_hdr=True, name="", winobjs=None, **
                 pe.content[:hdr_len] +
                 max(0, (min_len - hdr_len)) * b"\x00"
             )
-
-            if winobjs:
-                winobjs.allocated_pages[pe.NThdr.ImageBase] = (pe.NThdr.ImageBase, len(pe_hdr))
-            vm.add_memory_page(
+            pages.append((
                 pe.NThdr.ImageBase,
                 PAGE_READ | PAGE_WRITE,
                 pe_hdr,
-                "%r: PE Header" % name
-            )
+                "PE Header",
+                True
+            ))
 
         # Align sections size
         if align_s:
@@ -241,23 +322,20 @@ def vm_load_pe(vm, fdata, align_s=True, load_hdr=True, name="", winobjs=None, **
             if section.flags & 0x80000000:
                 attrib |= PAGE_WRITE
 
-            section_addr = pe.rva2virt(section.addr)
-            if winobjs:
-                winobjs.allocated_pages[section_addr] = (section_addr, len(data))
-            vm.add_memory_page(
-                section_addr,
+            pages.append((
+                pe.rva2virt(section.addr),
                 attrib,
                 data,
-                "%r: %r" % (name, section.name)
-            )
+                repr(section.name),
+                True
+            ))
 
-        return pe
+        return pages
 
     # At least one section is not aligned
     log.warning('PE is not aligned, creating big section')
     min_addr = 0 if load_hdr else None
     max_addr = None
-    data = ""
 
     for i, section in enumerate(pe.SHList):
         if i < len(pe.SHList) - 1:
@@ -278,19 +356,58 @@ def vm_load_pe(vm, fdata, align_s=True, load_hdr=True, name="", winobjs=None, **
     log.debug('Min: 0x%x, Max: 0x%x, Size: 0x%x', min_addr, max_addr,
               (max_addr - min_addr))
 
-    # Create only one big section containing the whole PE
-    vm.add_memory_page(
-        min_addr,
-        PAGE_READ | PAGE_WRITE,
-        (max_addr - min_addr) * b"\x00"
-    )
-
-    # Copy each sections content in memory
+    # Create only one big section containing the whole PE, and copy each
+    # sections content in it
+    data = bytearray(max_addr - min_addr)
     for section in pe.SHList:
         log.debug('Map 0x%x bytes to 0x%x', len(section.data),
                   pe.rva2virt(section.addr))
-        vm.set_mem(pe.rva2virt(section.addr), bytes(section.data))
+        offset = pe.rva2virt(section.addr) - min_addr
+        section_data = bytes(section.data)
+        data[offset:offset + len(section_data)] = section_data
+
+    pages.append((min_addr, PAGE_READ | PAGE_WRITE, bytes(data), None, False))
+    return pages
+
+
+def _map_pe_pages(vm, pages, name="", winobjs=None):
+    """Map the @pages computed by _get_pe_pages in @vm"""
+    for addr, access, data, description, allocated in pages:
+        if allocated and winobjs:
+            winobjs.allocated_pages[addr] = (addr, len(data))
+        if description is None:
+            vm.add_memory_page(addr, access, data)
+        else:
+            vm.add_memory_page(
+                addr, access, data, "%r: %s" % (name, description)
+            )
+
+
+def vm_load_pe(vm, fdata, align_s=True, load_hdr=True, name="", winobjs=None,
+               image_cache=None, **kargs):
+    """Load a PE in memory (@vm) from a data buffer @fdata
+    @vm: VmMngr instance
+    @fdata: data buffer to parse
+    @align_s: (optional) If False, keep gaps between section
+    @load_hdr: (optional) If False, do not load the NThdr in memory
+    @image_cache: (optional) PeImageCache instance, used to parse each image
+    only once. The returned PE instance is then shared between loads
+    Return the corresponding PE instance.
 
+    Extra arguments are passed to PE instantiation.
+    If all sections are aligned, they will be mapped on several different pages
+    Otherwise, a big page is created, containing all sections
+    """
+
+    if image_cache is not None:
+        image = image_cache.get_image(fdata, align_s, load_hdr, **kargs)
+        pe, pages = image.pe, image.pages
+    else:
+        # Parse and build a PE instance
+        pe = pe_init.PE(fdata, **kargs)
+        pages = _get_pe_pages(pe, align_s, load_hdr)
+
+    _map_pe_pages(vm, pages, name, winobjs)
     return pe
 
 
@@ -309,7 +426,9 @@ def vm_load_pe_lib(vm, fname_in, libs, lib_path_base, **kargs):
     fname = os.path.join(lib_path_base, fname_in)
     with open(fname, "rb") as fstream:
         pe = vm_load_pe(vm, fstream.read(), name=fname_in, **kargs)
-    libs.add_export_lib(pe, fname_in)
+    image_cache = kargs.get("image_cache")
+    exports = None if image_cache is None else image_cache.get_exports(pe)
+    libs.add_export_lib(pe, fname_in, exports)
     return pe
 
 
@@ -451,7 +570,12 @@ class libimp_pe(libimp):
             self.fad2info[addr] = libad, imp_ord_or_name
 
 
-    def add_export_lib(self, e, name):
+    def add_export_lib(self, e, name, exports=None):
+        """Add the functions exported by the PE @e to the database
+        @e: PE instance
+        @name: library name
+        @exports: (optional) exports of @e, as returned by get_exports_pe
+        """
         if name in self.created_redirected_imports:
             log.error("%r has previously been created due to redirect\
             imports due to %r. Change the loading order.",
@@ -476,16 +600,19 @@ class libimp_pe(libimp):
             self.lib_imp2dstad[ad] = {}
             self.libbase_ad += 0x1000
 
-            ads = get_export_name_addr_list(e)
-            todo = list(ads)
+            if exports is None:
+                exports = get_exports_pe(e)
+            ads = [(imp_ord_or_name, ad) for imp_ord_or_name, ad, _ in exports]
+            todo = list(exports)
+            name_inv = dict(
+                (value, key) for key, value in viewitems(self.name2off)
+            )
             # done = []
             while todo:
                 # for imp_ord_or_name, ad in ads:
-                imp_ord_or_name, ad = todo.pop()
-
                 # if export is a redirection, search redirected dll
                 # and get function real addr
-                ret = is_redirected_export(e, ad)
+                imp_ord_or_name, ad, ret = todo.pop()
                 if ret:
                     exp_dname, exp_fname = ret
                     exp_dname = exp_dname + '.dll'
@@ -514,11 +641,13 @@ class libimp_pe(libimp):
 
                         libad_tmp = self.name2off[exp_dname]
                         ad = self.lib_imp2ad[libad_tmp][exp_fname]
+                        # A new library may have been added
+                        name_inv = dict(
+                            (value, key)
+                            for key, value in viewitems(self.name2off)
+                        )
 
                 self.lib_imp2ad[libad][imp_ord_or_name] = ad
-                name_inv = dict(
-                    (value, key) for key, value in viewitems(self.name2off)
-                )
                 c_name = canon_libname_libfunc(
                     name_inv[libad], imp_ord_or_name)
                 self.fad2cname[ad] = c_name
@@ -596,8 +725,10 @@ def vm_load_pe_and_dependencies(vm, fname, name2module, runtime_lib,
     @runtime_lib: libimp instance
     @lib_path_base: directory of the libraries containing dependencies
 
+    Extra arguments, such as an image_cache, are passed to vm_load_pe
     """
 
+    image_cache = kwargs.get("image_cache")
     todo = [(fname, fname, 0)]
     weight2name = {}
     done = set()
@@ -635,11 +766,13 @@ def vm_load_pe_and_dependencies(vm, fname, name2module, runtime_lib,
             continue
         if pe_obj.DirExport.expdesc == None:
             continue
-        addrs = get_export_name_addr_list(pe_obj)
-        for imp_ord_or_name, ad in addrs:
+        if image_cache is None:
+            exports = get_exports_pe(pe_obj)
+        else:
+            exports = image_cache.get_exports(pe_obj)
+        for imp_ord_or_name, ad, ret in exports:
             # if export is a redirection, search redirected dll
             # and get function real addr
-            ret = is_redirected_export(pe_obj, ad)
             if ret is False:
                 known_export_addresses[(name, imp_ord_or_name)] = ad
             else:
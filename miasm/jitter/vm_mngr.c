@@ -270,6 +270,7 @@ static void memory_page_write(vm_mngr_t* vm_mngr, unsigned int my_size,
 			vm_mngr->exception_flags |= EXCEPT_BREAKPOINT_MEMORY;
 	}
 
+	mpn->write_generation = ++vm_mngr->write_generation;
 	addr = &((unsigned char*)mpn->ad_hp)[ad - mpn->ad];
 
 	/* write fits in a page */
@@ -321,6 +322,7 @@ static void memory_page_write(vm_mngr_t* vm_mngr, unsigned int my_size,
 			if (!mpn)
 				return;
 
+			mpn->write_generation = vm_mngr->write_generation;
 			addr = &((unsigned char*)mpn->ad_hp)[ad - mpn->ad];
 			*((unsigned char*)addr) = src&0xFF;
 			my_size -= 8;
@@ -603,6 +605,7 @@ int vm_write_mem(vm_mngr_t* vm_mngr, uint64_t addr, char *buffer, size_t size)
 	       exit(EXIT_FAILURE);
        }
 
+       vm_mngr->write_generation++;
        /* write is multiple page wide */
        while (size){
 	      mpn = get_memory_page_from_address(vm_mngr, addr, 1);
@@ -618,6 +621,7 @@ int vm_write_mem(vm_mngr_t* vm_mngr, uint64_t addr, char *buffer, size_t size)
 	      }
 	      addr_diff_st = (size_t) addr_diff;
 	      len = MIN(size, mpn->size - addr_diff_st);
+	      mpn->write_generation = vm_mngr->write_generation;
 	      memcpy((char*)mpn->ad_hp + addr_diff_st, buffer, len);
 	      buffer += len;
 	      addr += len;
@@ -689,6 +693,7 @@ struct memory_page_node * create_memory_page_node(uint64_t ad, unsigned int size
 	mpn->size = size;
 	mpn->access = access;
 	mpn->ad_hp = ad_hp;
+	mpn->write_generation = 0;
 	strcpy(mpn->name, name);
 
 	return mpn;
@@ -770,6 +775,7 @@ void reset_memory_page_pool(vm_mngr_t* vm_mngr)
 	free(vm_mngr->memory_pages_array);
 	vm_mngr->memory_pages_array = NULL;
 	vm_mngr->memory_pages_number = 0;
+	vm_mngr->write_generation++;
 }
 
 
@@ -860,6 +866,7 @@ void add_memory_page(vm_mngr_t* vm_mngr, struct memory_page_node* mpn_a)
 
 	vm_mngr->memory_pages_array[i] = *mpn_a;
 	vm_mngr->memory_pages_number ++;
+	vm_mngr->memory_pages_array[i].write_generation = ++vm_mngr->write_generation;
 }
 
 void remove_memory_page(vm_mngr_t* vm_mngr, uint64_t ad)
@@ -886,6 +893,7 @@ void remove_memory_page(vm_mngr_t* vm_mngr, uint64_t ad)
   vm_mngr->memory_pages_array = realloc(vm_mngr->memory_pages_array,
 					sizeof(struct memory_page_node) *
 					(vm_mngr->memory_pages_number));
+  vm_mngr->write_generation++;
 }
 
 /* Return a char* representing the repr of vm_mngr_t object */
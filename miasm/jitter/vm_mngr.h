@@ -94,6 +94,8 @@ struct memory_page_node {
 	uint64_t access;
 	void* ad_hp;
 	char* name;
+	/* Write generation of the last change of the page content */
+	uint64_t write_generation;
 };
 
 struct memory_access {
@@ -129,6 +131,9 @@ typedef struct {
 
 	int write_num;
 
+	/* Incremented on each change of the memory content or mapping */
+	uint64_t write_generation;
+
 }vm_mngr_t;
 
 
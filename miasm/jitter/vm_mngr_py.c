@@ -786,6 +786,38 @@ PyObject* vm_get_memory_write(VmMngr* self, PyObject* args)
 	return result;
 }
 
+PyObject* vm_get_write_generation(VmMngr* self, PyObject* args)
+{
+	return PyLong_FromUnsignedLongLong(self->vm_mngr.write_generation);
+}
+
+PyObject* vm_get_memory_pages(VmMngr* self, PyObject* args)
+{
+	struct memory_page_node * mpn;
+	PyObject *list;
+	PyObject *o;
+	int i;
+
+	list = PyList_New(self->vm_mngr.memory_pages_number);
+	if (list == NULL)
+		return NULL;
+
+	for (i=0;i<self->vm_mngr.memory_pages_number; i++) {
+		mpn = &self->vm_mngr.memory_pages_array[i];
+		o = Py_BuildValue("(KnKK)",
+				  (unsigned long long)mpn->ad,
+				  (Py_ssize_t)mpn->size,
+				  (unsigned long long)mpn->access,
+				  (unsigned long long)mpn->write_generation);
+		if (o == NULL) {
+			Py_DECREF(list);
+			return NULL;
+		}
+		PyList_SET_ITEM(list, i, o);
+	}
+	return list;
+}
+
 
 
 static PyObject *
@@ -929,6 +961,13 @@ static PyMethodDef VmMngr_methods[] = {
 	 "get_memory_read() -> Retrieve last instruction READ access\n"
 	 "This function is only valid in a memory breakpoint callback."
 	},
+	{"get_write_generation",(PyCFunction)vm_get_write_generation, METH_NOARGS,
+	 "get_write_generation() -> Return a counter incremented on each change of "
+	 "the memory content or mapping"},
+	{"get_memory_pages",(PyCFunction)vm_get_memory_pages, METH_NOARGS,
+	 "get_memory_pages() -> Return the list of (address, size, access, "
+	 "write generation) of the memory pages, without their content. The "
+	 "write generation is the one of the last change of the page content"},
 	{"get_memory_write",(PyCFunction)vm_get_memory_write, METH_VARARGS,
 	 "get_memory_write() -> Retrieve last instruction WRITE access\n"
 	 "This function is only valid in a memory breakpoint callback."
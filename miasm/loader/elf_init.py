@@ -2,6 +2,8 @@
 
 from __future__ import print_function
 from builtins import range
+from bisect import bisect_right
+from collections import MutableMapping
 import logging
 import struct
 
@@ -166,6 +168,143 @@ class WNhdr(StructWrapper):
     wrapped = elf.Nhdr
 
 
+class WrappedTable(object):
+    """Lazy sequence of @wrapper instances over the raw entries of a table
+    section (symbols, relocations, ...).
+
+    Entries are only unpacked into their wrapper on access, then cached, so
+    that huge tables do not cost one Python object per entry up front.
+    The first @nfields fields of the wrapped structure are also available
+    as raw tuples (see raw/iter_raw) to build indexes without wrappers.
+    """
+
+    def __init__(self, parent, wrapper, sex, size, content, entsize,
+                 nfields=None):
+        self.parent = parent
+        self.wrapper = wrapper
+        self.sex, self.size = sex, size
+        self.entsize = entsize
+        fields = wrapper.wrapped._fields
+        if nfields is not None:
+            fields = fields[:nfields]
+        fields = cstruct.fix_size(fields, size)
+        self._raw_struct = struct.Struct(
+            ("<" if sex == 1 else ">") + "".join(ftype for _, ftype in fields)
+        )
+        self._raw_names = [name for name, _ in fields]
+        data = bytes(content)
+        if entsize:
+            self._count = (len(data) + entsize - 1) // entsize
+        else:
+            self._count = 0
+        # Pad the last entry, as a truncated entry is parsed as zero-extended
+        padded_len = self._count * entsize + self._raw_struct.size
+        self._data = data + b"\x00" * (padded_len - len(data))
+        self._entries = {}
+
+    def __len__(self):
+        return self._count
+
+    def _check_index(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("table index out of range")
+        return index
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[index] for index in range(*item.indices(self._count))]
+        index = self._check_index(item)
+        entry = self._entries.get(index)
+        if entry is None:
+            offset = index * self.entsize
+            entry = self.wrapper(
+                self.parent, self.sex, self.size,
+                self._data[offset:offset + self.entsize]
+            )
+            self._entries[index] = entry
+        return entry
+
+    def __setitem__(self, item, value):
+        self._entries[self._check_index(item)] = value
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self[index]
+
+    def field_index(self, name):
+        "Return the position of field @name in the raw tuples"
+        return self._raw_names.index(name)
+
+    def raw(self, index):
+        "Return the raw fields tuple of the entry @index"
+        index = self._check_index(index)
+        return self._raw_struct.unpack_from(self._data, index * self.entsize)
+
+    def iter_raw(self):
+        "Iterate over the raw fields tuples of all entries"
+        unpack_from = self._raw_struct.unpack_from
+        data, entsize = self._data, self.entsize
+        for index in range(self._count):
+            yield unpack_from(data, index * entsize)
+
+
+class TableIndex(MutableMapping):
+    """Mapping from keys to the entries of a WrappedTable @table
+
+    The key of each entry is computed by @keyfunc(index, raw_entry) (entries
+    with a None key are not indexed) the first time the mapping is used. As
+    in a dictionary filled in table order, the last entry of a key wins.
+    """
+
+    def __init__(self, table, keyfunc):
+        self.table = table
+        self.keyfunc = keyfunc
+        self._index = None
+        self._values = {}
+
+    @property
+    def index(self):
+        "key -> entry position, built on demand"
+        if self._index is None:
+            keyfunc = self.keyfunc
+            index = {}
+            for i, raw in enumerate(self.table.iter_raw()):
+                key = keyfunc(i, raw)
+                if key is not None:
+                    index[key] = i
+            self._index = index
+        return self._index
+
+    def __getitem__(self, key):
+        if key in self._values:
+            return self._values[key]
+        return self.table[self.index[key]]
+
+    def __setitem__(self, key, value):
+        self.index.pop(key, None)
+        self._values[key] = value
+
+    def __delitem__(self, key):
+        if key in self._values:
+            del self._values[key]
+        else:
+            del self.index[key]
+
+    def __contains__(self, key):
+        return key in self._values or key in self.index
+
+    def __iter__(self):
+        for key in self.index:
+            yield key
+        for key in self._values:
+            yield key
+
+    def __len__(self):
+        return len(self.index) + len(self._values)
+
+
 class ContentManager(object):
 
     def __get__(self, owner, x):
@@ -375,21 +514,24 @@ class StrTable(Section):
 
     def parse_content(self, sex, size):
         self.sex, self.size = sex, size
-        self.res = {}
-        c = self.content
-        q = 0
-        index = 0
-        l = len(c)
-        while index < l:
-            p = c.find(b"\x00", index)
-            if p < 0:
-                log.warning("Missing trailing 0 for string [%s]" % c)  # XXX
-                p = len(c) - index
-            self.res[index] = c[index:p]
-            # print q, c[:p]
-            index = p + 1
-            # q += p+1
-            # c = c[p+1:]
+        self._res = None
+
+    @property
+    def res(self):
+        "offset -> string, for every string of the table (built on demand)"
+        if self._res is None:
+            self._res = {}
+            c = bytes(self.content)
+            index = 0
+            l = len(c)
+            while index < l:
+                p = c.find(b"\x00", index)
+                if p < 0:
+                    log.warning("Missing trailing 0 for string [%s]" % c)  # XXX
+                    p = l
+                self._res[index] = c[index:p]
+                index = p + 1
+        return self._res
 
     def get_name(self, ofs):
         return self.content[ofs:self.content.find(b'\x00', start=ofs)]
@@ -420,24 +562,79 @@ class SymTable(Section):
 
     def parse_content(self, sex, size):
         self.sex, self.size = sex, size
-        c = self.content
-        self.symtab = []
-        self.symbols = {}
-        sz = self.sh.entsize
-        index = 0
-        l = len(c)
         if size == 32:
             WSym = WSym32
         elif size == 64:
             WSym = WSym64
         else:
             ValueError('unknown size')
-        while index < l:
-            s = c[index:index + sz]
-            index += sz
-            sym = WSym(self, sex, size, s)
-            self.symtab.append(sym)
-            self[sym.name] = sym
+        self.symtab = WrappedTable(self, WSym, sex, size, self.content,
+                                   self.sh.entsize)
+        name_idx = self.symtab.field_index("name")
+        self.symbols = TableIndex(
+            self.symtab,
+            lambda index, raw: self.linksection.get_name(raw[name_idx])
+        )
+        self._addr_index = None
+
+    def symbol_name(self, index):
+        "Return the name of the symbol @index without building its wrapper"
+        return self.linksection.get_name(
+            self.symtab.raw(index)[self.symtab.field_index("name")]
+        )
+
+    def _get_addr_index(self):
+        """Build (on first call) the list of defined symbols, sorted by
+        address, as a (values, sizes, indexes) tuple"""
+        if self._addr_index is None:
+            symtab = self.symtab
+            value_idx = symtab.field_index("value")
+            size_idx = symtab.field_index("size")
+            info_idx = symtab.field_index("info")
+            shndx_idx = symtab.field_index("shndx")
+            entries = []
+            for index, raw in enumerate(symtab.iter_raw()):
+                if raw[shndx_idx] == 0:
+                    # SHN_UNDEF
+                    continue
+                if raw[info_idx] & 0xF in [elf.STT_SECTION, elf.STT_FILE]:
+                    continue
+                entries.append((raw[value_idx], index, raw[size_idx]))
+            entries.sort()
+            self._addr_index = (
+                [value for value, _, _ in entries],
+                [size for _, _, size in entries],
+                [index for _, index, _ in entries],
+            )
+        return self._addr_index
+
+    def getsymbolsbyvalue(self, value):
+        "Return the list of defined symbols whose value is @value"
+        values, _, indexes = self._get_addr_index()
+        stop = bisect_right(values, value)
+        out = []
+        while stop > 0 and values[stop - 1] == value:
+            stop -= 1
+            out.append(self.symtab[indexes[stop]])
+        out.reverse()
+        return out
+
+    def getsymbolbyvad(self, ad):
+        """Return the defined symbol containing the address @ad, or None
+        Only symbols starting at the nearest value below or equal to @ad are
+        considered"""
+        values, sizes, indexes = self._get_addr_index()
+        pos = bisect_right(values, ad)
+        if pos == 0:
+            return None
+        value = values[pos - 1]
+        start = pos
+        while start > 0 and values[start - 1] == value:
+            start -= 1
+        for i in range(start, pos):
+            if value == ad or ad < value + sizes[i]:
+                return self.symtab[indexes[i]]
+        return None
 
     def __getitem__(self, item):
         if isinstance(item, bytes):
@@ -467,23 +664,26 @@ class RelTable(Section):
         self.sex, self.size = sex, size
         if size == 32:
             WRel = WRel32
+            sym_shift = 8
         elif size == 64:
             WRel = WRel64
+            sym_shift = 32
         else:
             ValueError('unknown size')
-        c = self.content
-        self.reltab = []
-        self.rel = {}
-        sz = self.sh.entsize
-
-        idx = 0
-        while len(c) > sz*idx:
-            s = c[sz*idx:sz*(idx+1)]
-            idx += 1
-            rel = WRel(self, sex, size, s)
-            self.reltab.append(rel)
-            if rel.parent.linksection != self.parent.shlist[0]:
-                self.rel[rel.sym] = rel
+        # Only (offset, info) are common to all relocation structures
+        self.reltab = WrappedTable(self, WRel, sex, size, self.content,
+                                   self.sh.entsize, nfields=2)
+        if self.linksection != self.parent.shlist[0]:
+            info_idx = self.reltab.field_index("info")
+
+            def get_sym(index, raw):
+                symtab = self.linksection
+                if not isinstance(symtab, SymTable):
+                    return None
+                return symtab.symbol_name(raw[info_idx] >> sym_shift)
+            self.rel = TableIndex(self.reltab, get_sym)
+        else:
+            self.rel = {}
 
 
 class RelATable(RelTable):
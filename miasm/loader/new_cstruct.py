@@ -67,6 +67,13 @@ def real_fmt(fmt, wsize):
 all_cstructs = {}
 
 
+def is_basic_type(ffmt):
+    "Return True if the field format @ffmt is a struct module type"
+    return ffmt in type2realtype or (
+        isinstance(ffmt, str) and re.match(r'\d+s', ffmt) is not None
+    )
+
+
 class Cstruct_Metaclass(type):
     field_suffix = "_value"
 
@@ -85,10 +92,96 @@ class Cstruct_Metaclass(type):
                                   dct.pop("del_" + fname, None))
 
         o = super(Cstruct_Metaclass, cls).__new__(cls, name, bases, dct)
+        # (sex, wsize) -> compiled layout
+        o._layouts = {}
         if name != "CStruct":
             all_cstructs[name] = o
         return o
 
+    def get_layout(cls, sex, wsize):
+        """Return the layout of the structure for the endianness @sex ('<' or
+        '>') and the word size @wsize, compiled on first use.
+
+        The layout is a list of (Struct, fields, attribute names): runs of
+        consecutive fixed size fields are merged into a single precompiled
+        struct.Struct; other fields (arrays, strings, sub structures,
+        callbacks) have a None Struct and are handled one by one.
+        """
+        key = (sex, wsize)
+        layout = cls._layouts.get(key)
+        if layout is not None:
+            return layout
+        layout = []
+        run = []
+
+        def flush_run():
+            if not run:
+                return
+            fmt = sex + "".join(real_fmt(field[1], wsize) for field in run)
+            attrs = [field[0] + cls.field_suffix for field in run]
+            layout.append((struct.Struct(fmt), list(run), attrs))
+            del run[:]
+
+        for field in cls._fields:
+            if len(field) == 2 and is_basic_type(field[1]):
+                run.append(field)
+                continue
+            flush_run()
+            layout.append((None, [field], [field[0] + cls.field_suffix]))
+        flush_run()
+        cls._layouts[key] = layout
+        return layout
+
+    def unpack_field(cls, c, field, s, of1, parent_head, _sex, _wsize):
+        """Unpack the field @field of the structure @c from @s at @of1
+        Return the field value and the offset following it"""
+        cpt = None
+        if len(field) == 2:
+            fname, ffmt = field
+        elif len(field) == 3:
+            fname, ffmt, cpt = field
+        if is_basic_type(ffmt):
+            # basic types
+            fmt = real_fmt(ffmt, _wsize)
+            if cpt:
+                value = []
+                i = 0
+                while i < cpt(c):
+                    of2 = of1 + struct.calcsize(fmt)
+                    value.append(struct.unpack(c.sex + fmt, s[of1:of2])[0])
+                    of1 = of2
+                    i += 1
+                of2 = of1
+            else:
+                of2 = of1 + struct.calcsize(fmt)
+                if not (0 <= of1 < len(s) and 0 <= of2 < len(s)):
+                    raise RuntimeError("not enough data")
+                value = struct.unpack(c.sex + fmt, s[of1:of2])[0]
+        elif ffmt == "sz":  # null terminated special case
+            of2 = s.find(b'\x00', of1)
+            if of2 == -1:
+                raise ValueError('no null char in string!')
+            of2 += 1
+            value = s[of1:of2 - 1]
+        elif ffmt in all_cstructs:
+            # sub structures
+            if cpt:
+                value, l = all_cstructs[ffmt].unpack_array(
+                    s, cpt(c), of1, parent_head, _sex, _wsize)
+                for v in value:
+                    v.parent = c
+            else:
+                value, l = all_cstructs[ffmt].unpack_l(
+                    s, of1, parent_head, _sex, _wsize)
+                value.parent = c
+            of2 = of1 + l
+        elif isinstance(ffmt, tuple):
+            f_get, f_set = ffmt
+            value, of2 = f_get(c, s, of1)
+        else:
+            raise ValueError('unknown class', ffmt)
+        return value, of2
+
     def unpack_l(cls, s, off=0, parent_head=None, _sex=None, _wsize=None):
         if _sex is None and _wsize is None:
             # get sex and size from parent
@@ -104,61 +197,17 @@ class Cstruct_Metaclass(type):
         c.parent_head = parent_head
 
         of1 = off
-        for field in c._fields:
-            cpt = None
-            if len(field) == 2:
-                fname, ffmt = field
-            elif len(field) == 3:
-                fname, ffmt, cpt = field
-            if ffmt in type2realtype or (isinstance(ffmt, str) and re.match(r'\d+s', ffmt)):
-                # basic types
-                if cpt:
-                    value = []
-                    i = 0
-                    while i < cpt(c):
-                        fmt = real_fmt(ffmt, _wsize)
-                        of2 = of1 + struct.calcsize(fmt)
-                        value.append(struct.unpack(c.sex + fmt, s[of1:of2])[0])
-                        of1 = of2
-                        i += 1
-                else:
-                    fmt = real_fmt(ffmt, _wsize)
-                    of2 = of1 + struct.calcsize(fmt)
-                    if not (0 <= of1 < len(s) and 0 <= of2 < len(s)):
-                        raise RuntimeError("not enough data")
-                    value = struct.unpack(c.sex + fmt, s[of1:of2])[0]
-            elif ffmt == "sz":  # null terminated special case
-                of2 = s.find(b'\x00', of1)
-                if of2 == -1:
-                    raise ValueError('no null char in string!')
-                of2 += 1
-                value = s[of1:of2 - 1]
-            elif ffmt in all_cstructs:
-                of2 = of1
-                # sub structures
-                if cpt:
-                    value = []
-                    i = 0
-                    while i < cpt(c):
-                        v, l = all_cstructs[ffmt].unpack_l(
-                            s, of1, parent_head, _sex, _wsize)
-                        v.parent = c
-                        value.append(v)
-                        of2 = of1 + l
-                        of1 = of2
-                        i += 1
-                else:
-                    value, l = all_cstructs[ffmt].unpack_l(
-                        s, of1, parent_head, _sex, _wsize)
-                    value.parent = c
-                    of2 = of1 + l
-            elif isinstance(ffmt, tuple):
-                f_get, f_set = ffmt
-                value, of2 = f_get(c, s, of1)
+        for fstruct, fields, attrs in cls.get_layout(c.sex, _wsize):
+            if fstruct is None:
+                value, of2 = cls.unpack_field(c, fields[0], s, of1,
+                                              parent_head, _sex, _wsize)
+                setattr(c, attrs[0], value)
             else:
-                raise ValueError('unknown class', ffmt)
+                of2 = of1 + fstruct.size
+                if not (0 <= of1 < len(s) and 0 <= of2 < len(s)):
+                    raise RuntimeError("not enough data")
+                c.__dict__.update(zip(attrs, fstruct.unpack(s[of1:of2])))
             of1 = of2
-            setattr(c, fname + c.__class__.field_suffix, value)
 
         return c, of2 - off
 
@@ -167,6 +216,47 @@ class Cstruct_Metaclass(type):
                             parent_head=parent_head, _sex=_sex, _wsize=_wsize)
         return c
 
+    def unpack_array(cls, s, count, off=0, parent_head=None, _sex=None,
+                     _wsize=None):
+        """Unpack @count contiguous structures from @s at @off
+        Return the list of structures and their total length
+
+        Structures made of fixed size fields only are decoded from a single
+        slice of @s.
+        """
+        if _sex is None and _wsize is None:
+            if parent_head is not None:
+                _sex = parent_head._sex
+                _wsize = parent_head._wsize
+            else:
+                _sex = 0
+                _wsize = 32
+        sex = cls._packformat if cls._packformat else sex_types[_sex]
+        layout = cls.get_layout(sex, _wsize)
+        if len(layout) != 1 or layout[0][0] is None:
+            # Variable layout: unpack structures one by one
+            out = []
+            of1 = off
+            for _ in range(count):
+                c, l = cls.unpack_l(s, of1, parent_head, _sex, _wsize)
+                out.append(c)
+                of1 += l
+            return out, of1 - off
+
+        if count <= 0:
+            return [], 0
+        fstruct, _, attrs = layout[0]
+        length = count * fstruct.size
+        if not (0 <= off < len(s) and 0 <= off + length < len(s)):
+            raise RuntimeError("not enough data")
+        out = []
+        for values in fstruct.iter_unpack(s[off:off + length]):
+            c = cls(_sex=_sex, _wsize=_wsize)
+            c.parent_head = c if parent_head is None else parent_head
+            c.__dict__.update(zip(attrs, values))
+            out.append(c)
+        return out, length
+
 
 class CStruct(with_metaclass(Cstruct_Metaclass, object)):
     _packformat = ""
@@ -198,54 +288,66 @@ class CStruct(with_metaclass(Cstruct_Metaclass, object)):
             for k, v in viewitems(kargs):
                 self.__dict__[k + self.__class__.field_suffix] = v
 
-    def pack(self):
-        out = b''
-        for field in self._fields:
-            cpt = None
-            if len(field) == 2:
-                fname, ffmt = field
-            elif len(field) == 3:
-                fname, ffmt, cpt = field
-
-            value = getattr(self, fname + self.__class__.field_suffix)
-            if ffmt in type2realtype or (isinstance(ffmt, str) and re.match(r'\d+s', ffmt)):
-                # basic types
-                fmt = real_fmt(ffmt, self._wsize)
-                if cpt == None:
+    def pack_field(self, field):
+        "Return the packed value of the field @field"
+        cpt = None
+        if len(field) == 2:
+            fname, ffmt = field
+        elif len(field) == 3:
+            fname, ffmt, cpt = field
+
+        value = getattr(self, fname + self.__class__.field_suffix)
+        if is_basic_type(ffmt):
+            # basic types
+            fmt = real_fmt(ffmt, self._wsize)
+            if cpt == None:
+                if value == None:
+                    o = struct.calcsize(fmt) * b"\x00"
+                elif ffmt.endswith('s'):
+                    new_value = force_bytes(value)
+                    o = struct.pack(self.sex + fmt, new_value)
+                else:
+                    o = struct.pack(self.sex + fmt, value)
+            else:
+                o = b""
+                for v in value:
                     if value == None:
-                        o = struct.calcsize(fmt) * b"\x00"
-                    elif ffmt.endswith('s'):
-                        new_value = force_bytes(value)
-                        o = struct.pack(self.sex + fmt, new_value)
+                        o += struct.calcsize(fmt) * b"\x00"
                     else:
-                        o = struct.pack(self.sex + fmt, value)
-                else:
-                    o = b""
-                    for v in value:
-                        if value == None:
-                            o += struct.calcsize(fmt) * b"\x00"
-                        else:
-                            o += struct.pack(self.sex + fmt, v)
-
-            elif ffmt == "sz":  # null terminated special case
-                o = value + b'\x00'
-            elif ffmt in all_cstructs:
-                # sub structures
-                if cpt == None:
-                    o = bytes(value)
-                else:
-                    o = b""
-                    for v in value:
-                        o += bytes(v)
-            elif isinstance(ffmt, tuple):
-                f_get, f_set = ffmt
-                o = f_set(self, value)
-
+                        o += struct.pack(self.sex + fmt, v)
+
+        elif ffmt == "sz":  # null terminated special case
+            o = value + b'\x00'
+        elif ffmt in all_cstructs:
+            # sub structures
+            if cpt == None:
+                o = bytes(value)
             else:
-                raise ValueError('unknown class', ffmt)
-            out += o
+                o = b"".join(bytes(v) for v in value)
+        elif isinstance(ffmt, tuple):
+            f_get, f_set = ffmt
+            o = f_set(self, value)
 
-        return out
+        else:
+            raise ValueError('unknown class', ffmt)
+        return o
+
+    def pack(self):
+        out = []
+        for fstruct, fields, attrs in self.__class__.get_layout(self.sex,
+                                                                self._wsize):
+            if fstruct is not None:
+                try:
+                    out.append(
+                        fstruct.pack(*(getattr(self, attr) for attr in attrs))
+                    )
+                    continue
+                except struct.error:
+                    # None or non bytes values: pack the run field by field
+                    pass
+            for field in fields:
+                out.append(self.pack_field(field))
+        return b"".join(out)
 
     def __bytes__(self):
         return self.pack()
@@ -291,22 +291,27 @@ class struct_array(object):
         self.l = []
         self.cls = target_class
         self.end = None
-        i = 0
         if not raw:
             return
 
-        while (num == None) or (num and i < num):
+        if num is not None:
+            self.l, _ = cstr.unpack_array(raw, num, off,
+                                          target_class.parent_head,
+                                          target_class.parent_head._sex,
+                                          target_class.parent_head._wsize)
+            return
+
+        # Null terminated array
+        while True:
             entry, length = cstr.unpack_l(raw, off,
                                           target_class.parent_head,
                                           target_class.parent_head._sex,
                                           target_class.parent_head._wsize)
-            if num == None:
-                if raw[off:off + length] == b'\x00' * length:
-                    self.end = b'\x00' * length
-                    break
+            if raw[off:off + length] == b'\x00' * length:
+                self.end = b'\x00' * length
+                break
             self.l.append(entry)
             off += length
-            i += 1
 
     def __bytes__(self):
         out = b"".join(bytes(x) for x in self.l)
@@ -0,0 +1,62 @@
+import hashlib
+import os
+import tempfile
+
+from miasm.core.utils import decode_hex
+from miasm.analysis.machine import Machine
+from miasm.analysis.binary import Container
+from miasm.analysis.analysis_db import AnalysisDB
+
+# Initial data: from 'samples/simple_test.bin'
+data = decode_hex("5589e583ec10837d08007509c745fc01100000eb73837d08017709c745fc02100000eb64837d08057709c745fc03100000eb55837d080774138b450801c083f80e7509c745fc04100000eb3c8b450801c083f80e7509c745fc05100000eb298b450883e03085c07409c745fc06100000eb16837d08427509c745fc07100000eb07c745fc081000008b45fcc9c3")
+# Container digests are computed on first access, from the parsed bytes
+for fname in [os.path.join("..", "os_dep", "linux", "test_env.x86_32"),
+              os.path.join("..", "..", "example", "samples", "box_upx.exe")]:
+    with open(fname, "rb") as fdesc:
+        raw = fdesc.read()
+    cont = Container.from_string(raw)
+    assert cont._digest is None
+    assert cont.digest == hashlib.sha256(raw).hexdigest()
+
+cont = Container.from_string(data)
+assert cont.digest == hashlib.sha256(data).hexdigest()
+machine = Machine("x86_32")
+mdis = machine.dis_engine(cont.bin_stream, loc_db=cont.loc_db)
+asmcfg = mdis.dis_multiblock(0)
+ir_arch = machine.ira(mdis.loc_db)
+ircfg = ir_arch.new_ircfg_from_asmcfg(asmcfg)
+
+fdesc, path = tempfile.mkstemp(suffix=".sqlite")
+os.close(fdesc)
+try:
+    analysis_db = AnalysisDB(path, cont)
+    assert analysis_db.load(0) is None
+    analysis_db.save(0, asmcfg, ircfg)
+    assert analysis_db.offsets() == [0]
+    analysis_db.close()
+
+    # Reload from another instance
+    analysis_db = AnalysisDB(path, Container.from_string(data))
+    asmcfg_db, ircfg_db = analysis_db.load(0)
+    assert str(asmcfg_db) == str(asmcfg)
+    assert len(ircfg_db.blocks) == len(ircfg.blocks)
+    # Loaded graphs share the same LocationDB
+    assert asmcfg_db.loc_db is ircfg_db.loc_db
+    assert asmcfg_db.loc_db.get_offset_location(0) in asmcfg_db.heads()
+
+    # Other versions are not shared
+    assert AnalysisDB(path, cont, version="0.0").load(0) is None
+
+    # Patched bytes invalidate the function
+    analysis_db.container.bin_stream.bin = data[:-1] + b"\x90"
+    assert analysis_db.load(0) is None
+    assert analysis_db.offsets() == []
+
+    analysis_db.save(0, asmcfg)
+    asmcfg_db, ircfg_db = analysis_db.load(0)
+    assert ircfg_db is None
+    analysis_db.invalidate()
+    assert analysis_db.offsets() == []
+    analysis_db.close()
+finally:
+    os.remove(path)
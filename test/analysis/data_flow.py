@@ -5,7 +5,9 @@ from future.utils import viewitems
 
 from miasm.expression.expression import ExprId, ExprInt, ExprAssign, ExprMem
 from miasm.core.locationdb import LocationDB
-from miasm.analysis.data_flow import DeadRemoval, ReachingDefinitions, DiGraphDefUse
+from miasm.analysis.data_flow import DeadRemoval, ReachingDefinitions, \
+    DiGraphDefUse, DiGraphLivenessIRA, BitsetIndex, BitsetDataFlow
+from miasm.core.graph import DiGraph
 from miasm.ir.analysis import ira
 from miasm.ir.ir import IRBlock, AssignBlock
 
@@ -665,6 +667,90 @@ G17_EXP_IRB0 = gen_irblock(LBL0, [[],
 for irb in [G17_EXP_IRB0]:
     G17_EXP_IRA.add_irblock(irb)
 
+# Reference implementations: previous fix point algorithms
+
+def ref_reaching_definitions(ircfg):
+    """Reaching definitions, iterating on all the blocks until the fix point"""
+    reaching = {}
+    modified = True
+    while modified:
+        modified = False
+        for block in list(ircfg.blocks.values()):
+            predecessor_state = {}
+            for pred in ircfg.predecessors(block.loc_key):
+                if pred not in ircfg.blocks:
+                    continue
+                pred_defs = reaching.get((pred, len(ircfg.blocks[pred])), {})
+                for lval, definitions in viewitems(pred_defs):
+                    predecessor_state.setdefault(lval, set()).update(definitions)
+            if reaching.get((block.loc_key, 0)) == predecessor_state:
+                continue
+            modified = True
+            reaching[(block.loc_key, 0)] = predecessor_state
+            for index, assignblk in enumerate(block):
+                defs = dict(reaching[(block.loc_key, index)])
+                for lval in assignblk:
+                    defs[lval] = set([(block.loc_key, index)])
+                reaching[(block.loc_key, index + 1)] = defs
+    return reaching
+
+
+def ref_useful_assignments(deadrm, ircfg, defuse, reaching_defs):
+    """Useful definitions, walking the parents of each useful node"""
+    useful = set()
+    for block_lbl, block in viewitems(ircfg.blocks):
+        useful.update(deadrm.get_block_useful_destinations(block))
+        successors = ircfg.successors(block_lbl)
+        if any(successor not in ircfg.blocks for successor in successors):
+            useful.update(
+                deadrm.add_def_for_incomplete_leaf(block, ircfg, reaching_defs)
+            )
+        elif not successors:
+            useful.update(
+                deadrm.find_out_regs_definitions_from_block(block, ircfg)
+            )
+    out = set()
+    for node in useful:
+        out.update(defuse.reachable_parents(node))
+    return out
+
+
+def ref_liveness(liveness):
+    """Liveness, back propagating the modified blocks until the fix point"""
+    todo = set(liveness.blocks)
+    while todo:
+        node = todo.pop()
+        infos = liveness.blocks[node].infos
+        modified = False
+        for i in reversed(range(len(infos))):
+            new_vars = infos[i].gen.union(
+                infos[i].var_out.difference(infos[i].kill)
+            )
+            if infos[i].var_in != new_vars:
+                modified = True
+                infos[i].var_in = new_vars
+            if i > 0 and infos[i - 1].var_out != infos[i].var_in:
+                modified = True
+                infos[i - 1].var_out = set(infos[i].var_in)
+        if not modified:
+            continue
+        for pred in liveness.predecessors(node):
+            if pred not in liveness.blocks:
+                continue
+            parent_info = liveness.blocks[pred].infos[-1]
+            if infos[0].var_in == parent_info.var_out:
+                continue
+            parent_info.var_out = infos[0].var_in.union(parent_info.var_out)
+            todo.add(pred)
+
+
+def liveness_infos(liveness):
+    return dict(
+        (node, [(info.var_in, info.var_out) for info in block.infos])
+        for node, block in viewitems(liveness.blocks)
+    )
+
+
 # Beginning  of tests
 
 for test_nb, test in enumerate([(G1_IRA, G1_EXP_IRA),
@@ -696,6 +782,18 @@ for test_nb, test in enumerate([(G1_IRA, G1_EXP_IRA),
     reaching_defs = ReachingDefinitions(g_ira)
     defuse = DiGraphDefUse(reaching_defs, deref_mem=True)
 
+    # Solver results match the previous algorithms ones
+    assert dict(reaching_defs) == ref_reaching_definitions(g_ira)
+    assert set(deadrm.get_useful_assignments(g_ira, defuse, reaching_defs)) == \
+        ref_useful_assignments(deadrm, g_ira, defuse, reaching_defs)
+    liveness = DiGraphLivenessIRA(g_ira)
+    liveness.init_var_info(IRA)
+    liveness.compute_liveness()
+    liveness_ref = DiGraphLivenessIRA(g_ira)
+    liveness_ref.init_var_info(IRA)
+    ref_liveness(liveness_ref)
+    assert liveness_infos(liveness) == liveness_infos(liveness_ref)
+
     # # Simplify graph
     deadrm(g_ira)
 
@@ -708,3 +806,69 @@ for test_nb, test in enumerate([(G1_IRA, G1_EXP_IRA),
     for lbl, irb in viewitems(g_ira.blocks):
         exp_irb = g_exp_ira.blocks[lbl]
         assert exp_irb.assignblks == irb.assignblks
+
+
+# Generic solver, on a graph with an irreducible loop, an unreachable node
+# and a node outside of the analysed ones
+class TestFlow(BitsetDataFlow):
+    """Reaching "definitions" of the letters of the node names"""
+
+    def __init__(self, graph, nodes, forward):
+        self.forward = forward
+        super(TestFlow, self).__init__(graph, nodes)
+        self.letters = BitsetIndex()
+
+    def get_gen_kill(self, node):
+        gen = self.letters.to_bits((node, letter) for letter in node)
+        kill = self.letters.to_bits(
+            (other, letter)
+            for other in self.nodes for letter in node if letter in other
+        )
+        return gen, kill & ~gen
+
+    def get_boundary(self, node):
+        if node == "start":
+            return self.letters.to_bits([("boundary", "s")])
+        return 0
+
+
+def ref_flow(flow):
+    """Fix point iterating on all the nodes"""
+    state_in = dict((node, 0) for node in flow.nodes)
+    state_out = dict((node, 0) for node in flow.nodes)
+    gen_kill = dict((node, flow.get_gen_kill(node)) for node in flow.nodes)
+    modified = True
+    while modified:
+        modified = False
+        for node in flow.nodes:
+            bits = flow.get_boundary(node)
+            for prev in flow._prev_nodes(node):
+                if prev in flow.nodes:
+                    bits |= state_out[prev]
+            gen, kill = gen_kill[node]
+            out = gen | (bits & ~kill)
+            if (bits, out) != (state_in[node], state_out[node]):
+                state_in[node], state_out[node] = bits, out
+                modified = True
+    return state_in, state_out
+
+
+graph = DiGraph()
+for src, dst in [("start", "ab"), ("start", "bc"), ("ab", "bc"),
+                 ("bc", "ab"), ("bc", "cd"), ("cd", "start"),
+                 ("cd", "out"), ("out", "ad"), ("dead", "ad"),
+                 ("ad", "start")]:
+    graph.add_uniq_edge(src, dst)
+nodes = [node for node in graph.nodes() if node != "out"]
+for forward in [True, False]:
+    flow = TestFlow(graph, nodes, forward)
+    order = flow.get_order()
+    assert sorted(order) == sorted(nodes)
+    flow.solve()
+    assert (flow.state_in, flow.state_out) == ref_flow(flow)
+
+letters = BitsetIndex()
+assert letters.to_bits("ab") == 0b11
+assert letters.get_bit("c") == 2 and "c" in letters and len(letters) == 3
+assert letters.to_set(0b101) == set("ac")
+assert list(letters.iter_elements(0)) == []
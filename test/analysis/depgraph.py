@@ -1177,6 +1177,14 @@ for test_nb, test in enumerate([(G1_IRA, G1_INPUT),
             open("graph_test_%02d_%02d.dot" % (test_nb + 1, i),
                  "w").write(dg2graph(result.graph))
 
+        # Batch API: block summaries are shared, results must be the same
+        lead = list(depnodes)[0]
+        query = (lead.loc_key, set(depnode.element for depnode in depnodes),
+                 lead.line_nb)
+        for batch_results in g_dep.get_batch([query, query], heads):
+            assert set(flatGraph(result.graph)
+                       for result in batch_results) == all_results
+
         if g_ind == 0:
             all_flat = sorted(all_flat, key=str)
             all_flats.append(all_flat)
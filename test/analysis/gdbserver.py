@@ -0,0 +1,140 @@
+import socket
+import struct
+import sys
+
+from miasm.analysis.debugging import Debugguer
+from miasm.analysis.gdbserver import GdbServer_x86_32, escape_binary, \
+    unescape_binary
+from miasm.analysis.machine import Machine
+from miasm.core.utils import decode_hex, encode_hex
+from miasm.jitter.csts import PAGE_READ, PAGE_WRITE
+
+# Binary escaping
+data = bytes(bytearray(range(0x100)))
+escaped = escape_binary(data)
+for byte in b"#$*":
+    assert byte not in bytearray(escaped)
+assert len(escaped) == len(data) + 4
+assert escape_binary(b"a}b") == b"a}]b"
+assert unescape_binary(escaped) == data
+assert unescape_binary(b"") == b""
+
+# Server on a jitter running an infinite loop (JMP $), then NOP; NOP; JMP $
+CODE_ADDR = 0x400000
+CODE2_ADDR = CODE_ADDR + 0x10
+DATA_ADDR = 0x500000
+myjit = Machine("x86_32").jitter(sys.argv[1])
+myjit.init_stack()
+code = b"\xeb\xfe".ljust(0x10, b"\x00") + b"\x90\x90\xeb\xfe"
+myjit.vm.add_memory_page(CODE_ADDR, PAGE_READ | PAGE_WRITE,
+                         code.ljust(0x1000, b"\x00"))
+myjit.vm.add_memory_page(DATA_ADDR, PAGE_READ | PAGE_WRITE, b"\x00" * 0x1000)
+dbg = Debugguer(myjit)
+dbg.init_run(CODE_ADDR)
+
+server = GdbServer_x86_32(dbg, port=0)
+server.sock, client = socket.socketpair()
+
+
+def packet(data):
+    return b"$%s#%s" % (data, server.compute_checksum(data))
+
+
+def receive(data):
+    """Feed @data to the server; return its replies but acknowledgments"""
+    server.recv_queue += server.parse_messages(data)
+    server.process_messages()
+    replies = [msg for msg in server.send_queue if msg != b"+"]
+    server.send_queue = []
+    return replies
+
+
+# Packets spanning several receptions, acknowledgments and garbage
+request = packet(b"?")
+assert server.parse_messages(request[:2]) == []
+assert server.parse_messages(request[2:] + b"+" + packet(b"g")[:3]) == [b"?"]
+assert server.parse_messages(packet(b"g")[3:] + b"\x03") == [b"g", b"\x03"]
+assert server.recv_buffer == b""
+try:
+    server.parse_messages(b"$?#00")
+except ValueError:
+    server.recv_buffer = b""
+else:
+    raise RuntimeError("Incorrect checksum expected")
+
+# Registers
+myjit.cpu.EAX = 0x11223344
+registers = decode_hex(receive(packet(b"g"))[0])
+assert len(registers) == server.get_registers_struct().size
+assert struct.unpack("<I", registers[:4])[0] == 0x11223344
+assert receive(packet(b"p0")) == [encode_hex(struct.pack("<I", 0x11223344))]
+
+# Hexadecimal and binary memory writes
+assert receive(packet(b"M%x,4:01020304" % DATA_ADDR)) == [b"OK"]
+assert myjit.vm.get_mem(DATA_ADDR, 4) == b"\x01\x02\x03\x04"
+payload = b"#$}*\x00\xff"
+assert receive(packet(b"X%x,%x:" % (DATA_ADDR, len(payload)) +
+                      escape_binary(payload))) == [b"OK"]
+assert myjit.vm.get_mem(DATA_ADDR, len(payload)) == payload
+assert receive(packet(b"m%x,%x" % (DATA_ADDR, len(payload)))) == \
+    [encode_hex(payload)]
+assert receive(packet(b"X0,1:a")) == [b"E01"]
+
+# Replies are sent through the socket; the last packet is sent again on a
+# negative acknowledgment
+server.recv_queue += server.parse_messages(packet(b"m0,2"))
+server.process_messages()
+server.send_messages()
+assert client.recv(0x100) == b"+" + packet(b"0000")
+assert receive(b"-") == [b"0000"]
+
+# Target description
+supported = receive(packet(b"qSupported:multiprocess+"))[0]
+assert b"qXfer:features:read+" in supported.split(b";")
+target_xml = server.target_xml
+chunks = []
+offset = 0
+while True:
+    reply = receive(packet(b"qXfer:features:read:target.xml:%x,10" % offset))[0]
+    assert reply[:1] in [b"m", b"l"]
+    chunk = unescape_binary(reply[1:])
+    chunks.append(chunk)
+    offset += len(chunk)
+    if reply[:1] == b"l":
+        break
+assert b"".join(chunks) == target_xml
+assert len(chunks) == (len(target_xml) + 0xf) // 0x10
+assert receive(packet(b"qXfer:features:read:other.xml:0,10")) == [b"E00"]
+assert receive(packet(b"qXfer:features:write:target.xml:0,10")) == [b""]
+
+# Binary content is escaped
+server.target_xml = b"<a>#$}*</a>"
+reply = receive(packet(b"qXfer:features:read:target.xml:0,100"))[0]
+assert reply == b"l" + escape_binary(server.target_xml)
+server.target_xml = target_xml
+
+# Continue: the emulation runs by slices until interrupted
+assert receive(packet(b"c")) == []
+assert server.running
+server.run_emulation()
+assert server.running
+assert myjit.pc == CODE_ADDR
+assert receive(b"\x03") == [b"S02"]
+assert not server.running
+assert receive(packet(b"?")) == [b"S02"]
+
+# Continue until a breakpoint
+dbg.init_run(CODE2_ADDR)
+assert receive(packet(b"Z0,%x,1" % (CODE2_ADDR + 1))) == [b"OK"]
+receive(packet(b"c"))
+while server.running:
+    server.run_emulation()
+    replies = [msg for msg in server.send_queue if msg != b"+"]
+server.send_queue = []
+assert replies == [b"S05"]
+assert myjit.pc == CODE2_ADDR + 1
+assert receive(packet(b"z0,%x,1" % (CODE2_ADDR + 1))) == [b"OK"]
+
+client.close()
+server.sock.close()
+server.server.close()
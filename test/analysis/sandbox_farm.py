@@ -0,0 +1,101 @@
+import os
+import sys
+from argparse import ArgumentParser
+
+from miasm.analysis.machine import Machine
+from miasm.analysis.sandbox_farm import SandboxFarm, SandboxJob, \
+    EXIT_FINISHED, EXIT_BUDGET, EXIT_TIMEOUT, EXIT_MEMORY, EXIT_CRASHED
+from miasm.core.utils import pck32
+from miasm.jitter.csts import PAGE_READ, PAGE_WRITE
+
+CODE_ADDR = 0x400000
+STACK_ADDR = 0x100000
+RET_ADDR = 0x1337BEEF
+
+CODES = {
+    # MOV EAX, 1; RET
+    "finish": b"\xb8\x01\x00\x00\x00\xc3",
+    # JMP $
+    "loop": b"\xeb\xfe",
+}
+
+
+class TestSandbox(object):
+    """Minimal Sandbox emulating the x86_32 code named by @fname, or failing
+    on purpose"""
+
+    _ARCH_ = "x86_32"
+
+    def __init__(self, fname, options, custom_methods):
+        self.fname = fname
+        self.jitter = Machine(self._ARCH_).jitter(options.jitter)
+        self.jitter.init_stack()
+        self.jitter.vm.add_memory_page(
+            STACK_ADDR, PAGE_READ | PAGE_WRITE, b"\x00" * 0x1000
+        )
+        self.jitter.vm.add_memory_page(
+            CODE_ADDR, PAGE_READ | PAGE_WRITE, CODES.get(fname, b"\xc3")
+        )
+        self.jitter.push_uint32_t(RET_ADDR)
+        self.jitter.add_breakpoint(RET_ADDR, lambda jitter: False)
+
+    @classmethod
+    def parser(cls):
+        parser = ArgumentParser()
+        parser.add_argument("--jitter", default="python")
+        return parser
+
+    def run(self):
+        if self.fname == "crash":
+            os._exit(1)
+        if self.fname == "memory":
+            b"\x00" * (1 << 36)
+        self.jitter.init_run(CODE_ADDR)
+        self.jitter.continue_run()
+
+
+options = ["--jitter", sys.argv[1]]
+
+
+def run(farm, names, **kwargs):
+    """Run the jobs @names in @farm, return {job name: result}"""
+    jobs = [SandboxJob(TestSandbox, name, options, **kwargs) for name in names]
+    results = dict((result.job_id, result) for result in farm.run(jobs))
+    assert sorted(results) == sorted(names)
+    return results
+
+
+# Normal end
+results = run(SandboxFarm(processes=2), ["finish", "finish2"])
+for result in results.values():
+    assert result.reason == EXIT_FINISHED
+    assert result.error is None
+
+# Instruction budget
+results = run(SandboxFarm(processes=1, max_instructions=100), ["loop", "finish"])
+assert results["loop"].reason == EXIT_BUDGET
+assert results["loop"].instructions == 100
+assert results["finish"].reason == EXIT_FINISHED
+assert results["finish"].instructions == 2
+
+# Timeout: the worker is killed and replaced, other jobs are not affected
+results = run(SandboxFarm(processes=2, timeout=2),
+              ["loop", "finish", "finish2", "finish3"])
+assert results["loop"].reason == EXIT_TIMEOUT
+assert results["loop"].elapsed >= 2
+for name in ["finish", "finish2", "finish3"]:
+    assert results[name].reason == EXIT_FINISHED
+
+# Crashed worker: replaced by a fresh one for the next jobs
+results = run(SandboxFarm(processes=1), ["crash", "finish", "crash2"])
+assert results["crash"].reason == EXIT_CRASHED
+assert "code 1" in results["crash"].error
+assert results["finish"].reason == EXIT_FINISHED
+assert results["crash2"].reason == EXIT_FINISHED
+
+# Memory limit
+results = run(SandboxFarm(processes=1, memory_limit=1 << 34),
+              ["memory", "finish"])
+assert results["memory"].reason == EXIT_MEMORY
+assert "MemoryError" in results["memory"].error
+assert results["finish"].reason == EXIT_FINISHED
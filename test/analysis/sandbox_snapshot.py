@@ -0,0 +1,86 @@
+import os
+import sys
+
+from future.utils import viewitems
+
+from miasm.analysis.sandbox import Sandbox_Linux_x86_32
+from miasm.jitter.csts import PAGE_READ, PAGE_WRITE
+
+fname = os.path.join("..", "os_dep", "linux", "test_env.x86_32")
+parser = Sandbox_Linux_x86_32.parser()
+parser.add_argument("filename")
+options = parser.parse_args([fname, "--jitter", sys.argv[1], "-q",
+                             "--mimic-env", "-c", "arg1",
+                             "--environment-vars", "TEST=TOTO"])
+sb = Sandbox_Linux_x86_32(options.filename, options, globals())
+vm = sb.jitter.vm
+
+
+def get_state():
+    """Registers and memory pages of the sandbox"""
+    memory = dict(
+        (addr, (page["size"], page["access"], page["data"]))
+        for addr, page in viewitems(vm.get_all_memory())
+    )
+    return sb.jitter.cpu.get_gpreg(), memory
+
+
+def written_pages(generation):
+    """Address of the pages written after @generation"""
+    return set(
+        addr for addr, _, _, page_generation in vm.get_memory_pages()
+        if page_generation > generation
+    )
+
+
+snapshot = sb.snapshot()
+state_ref = get_state()
+assert snapshot.memory == state_ref[1]
+assert written_pages(snapshot.generation) == set()
+
+# Memory content, mapping and access changes, registers
+pages = sorted(snapshot.memory)
+page_written, page_removed, page_access = pages[:3]
+vm.set_mem(page_written, b"\xcc" * 0x10)
+assert written_pages(snapshot.generation) == set([page_written])
+vm.remove_memory_page(page_removed)
+vm.set_mem_access(page_access, PAGE_READ)
+vm.add_memory_page(0x1337000, PAGE_READ | PAGE_WRITE, b"\x00" * 0x1000)
+sb.jitter.cpu.EAX = 0x1337
+assert get_state() != state_ref
+
+sb.restore(snapshot)
+assert get_state() == state_ref
+# Only the written page and the mapped again one have been written
+restore_generation = sb._last_restored[1]
+assert written_pages(snapshot.generation) == set([page_written, page_removed])
+assert written_pages(restore_generation) == set()
+
+# A second restore only considers the pages written since the first one
+vm.set_mem(pages[-1], b"\xcc")
+sb.restore(snapshot)
+assert get_state() == state_ref
+assert written_pages(restore_generation) == set([pages[-1]])
+
+# Runs from the snapshot end in the same state
+final_states = []
+for _ in range(2):
+    sb.restore(snapshot)
+    sb.run()
+    assert sb.jitter.run is False
+    final_states.append(get_state())
+assert final_states[0] == final_states[1]
+assert final_states[0] != state_ref
+sb.restore(snapshot)
+assert get_state() == state_ref
+
+# Segment bases of all the selectors, loaded in a segment register or not
+cpu = sb.jitter.cpu
+cpu.set_segm_base(0x99, 0x1000)
+snapshot_segm = sb.snapshot()
+cpu.set_segm_base(0x99, 0x2000)
+cpu.set_segm_base(0x77, 0x3000)
+sb.restore(snapshot_segm)
+assert cpu.get_segm_base(0x99) == 0x1000
+assert cpu.get_segm_base(0x77) == 0
+assert cpu.get_segm_bases() == snapshot_segm.cpu_state["segm_base"]
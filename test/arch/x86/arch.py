@@ -3201,3 +3201,9 @@ cProfile.run('profile_dis(o)')
 instr_bytes = b'\x65\xc7\x00\x09\x00\x00\x00'
 inst = mn_x86.dis(instr_bytes, 32, 0)
 assert(inst.b == instr_bytes)
+
+# The modrm to bytes table is still available as a module attribute
+from miasm.arch.x86 import arch as x86_arch
+from miasm.arch.x86.arch import modrm2byte, get_modrm2byte
+assert modrm2byte is get_modrm2byte() is x86_arch.modrm2byte
+assert sorted(modrm2byte) == [16, 32, 64]
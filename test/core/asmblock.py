@@ -6,11 +6,13 @@ from future.utils import viewitems
 
 from miasm.core.utils import decode_hex
 from miasm.analysis.machine import Machine
+from miasm.arch.x86.arch import mn_x86
 from miasm.analysis.binary import Container
 from miasm.core.asmblock import AsmCFG, AsmConstraint, AsmBlock, \
-    AsmBlockBad, AsmConstraintTo, AsmConstraintNext, \
+    AsmBlockBad, AsmConstraintTo, AsmConstraintNext, BlockChain, \
     bbl_simplifier
 from miasm.core.graph import DiGraphSimplifier, MatchGraphJoker
+from miasm.core.locationdb import LocationDB
 from miasm.expression.expression import ExprId
 
 # Initial data: from 'samples/simple_test.bin'
@@ -50,6 +52,54 @@ assert len(asmcfg.edges()) == 24
 assert asmcfg.getby_offset(0x63).lines[0].offset == 0x5f
 assert asmcfg.getby_offset(0x69).lines[0].offset == 0x69
 
+## Columnar view
+columns = asmcfg.to_columns()
+assert len(columns.loc_keys) == 17
+assert len(columns.offsets) == sum(len(block.lines) for block in asmcfg.blocks)
+for index, block in enumerate(asmcfg.blocks):
+    assert columns.loc_keys[index] == block.loc_key
+first_index = list(columns.offsets).index(0)
+assert columns.lengths[first_index] == 1
+assert columns.mnemonics[columns.mnemonic_ids[first_index]] == "PUSH"
+assert columns.blocks[first_index] == columns.loc_keys.index(
+    asmcfg.getby_offset(0).loc_key
+)
+
+## Linear sweep
+linear = list(mdis.dis_linear(0, len(data)))
+assert [instr.offset for instr in linear] == sorted(
+    line.offset for block in asmcfg.blocks for line in block.lines
+)
+for start in [0, 1, 0x23]:
+    linear = [
+        (instr.offset, str(instr))
+        for instr in mdis.dis_linear(start, len(data))
+    ]
+    linear_parallel = [
+        (instr.offset, str(instr))
+        for instr in mdis.dis_linear_parallel(
+            start, len(data), chunk_size=0x10, processes=2
+        )
+    ]
+    assert linear == linear_parallel
+
+## Instructions decoded from the same bytes share their decoded parts
+instr_a = mdis.dis_instr(0x39)
+instr_b = mdis.dis_instr(0x4c)
+assert instr_a.b == instr_b.b
+assert instr_a.offset != instr_b.offset
+assert instr_a.args == instr_b.args
+instr_a.args[0] = ExprId("EBX", 32)
+assert instr_a.args != instr_b.args
+# Additional information is modified by the semantics: it is not shared
+assert instr_a.additional_info is not instr_b.additional_info
+instr_rep_a = mn_x86.dis(b"\xf3\xa4", 32)
+instr_rep_b = mn_x86.dis(b"\xf3\xa4", 32)
+instr_rep_a.additional_info.g1.value = 0
+instr_rep_a.additional_info.custom = True
+assert str(instr_rep_b).strip() == "REP MOVSB"
+assert not hasattr(instr_rep_b.additional_info, "custom")
+
 ## Convert to dot
 open("graph.dot", "w").write(asmcfg.dot())
 
@@ -339,3 +389,34 @@ try:
 except RuntimeError:
     error_raised = True
 assert error_raised
+
+
+# Test BlockChain merge
+def chain_blocks(loc_db, sizes, pinned=None):
+    """Return blocks of @sizes, the one at index @pinned being pinned"""
+    blocks = []
+    for index, size in enumerate(sizes):
+        if index == pinned:
+            loc_key = loc_db.add_location(offset=0x1000)
+        else:
+            loc_key = loc_db.add_location()
+        block = AsmBlock(loc_key, alignment=4)
+        block.max_size = size
+        blocks.append(block)
+    return blocks
+
+for pinned in [0, 1, 2]:
+    loc_db = LocationDB()
+    blocks = chain_blocks(loc_db, [3, 8, 5], pinned)
+    blocks_next = chain_blocks(loc_db, [6, 1])
+    chain = BlockChain(loc_db, list(blocks))
+    chain.merge(BlockChain(loc_db, list(blocks_next)))
+    # Same bounds as a chain placed at once
+    chain_ref = BlockChain(loc_db, blocks + blocks_next)
+    assert chain.blocks == chain_ref.blocks
+    assert chain.max_size == chain_ref.max_size
+    assert chain.offset_min == chain_ref.offset_min
+    assert chain.offset_max == chain_ref.offset_max
+    chain.place()
+    assert chain.offset_min == chain_ref.offset_min
+    assert chain.offset_max == chain_ref.offset_max
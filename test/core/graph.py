@@ -166,6 +166,34 @@ frontier = g2.compute_dominance_frontier(5)
 assert(frontier == {7: set([9]),
                     8: set([9])})
 
+# DominatorTree queries
+dom_tree = g2.get_dominator_tree(1)
+assert dom_tree is g2.get_dominator_tree(1)
+assert dom_tree.head == 1
+assert set(dom_tree) == set([1, 2, 3, 4, 7, 8, 9])
+assert dom_tree.get_idom(1) is None
+assert dom_tree.get_idom(9) == 4
+assert sorted(dom_tree.get_children(4)) == [7, 8, 9]
+assert list(dom_tree.walk_dominators(9)) == [4, 3, 2, 1]
+assert dom_tree.dominates(3, 9)
+assert dom_tree.dominates(9, 9)
+assert not dom_tree.strictly_dominates(9, 9)
+assert not dom_tree.dominates(7, 9)
+assert not dom_tree.dominates(9, 3)
+assert not dom_tree.dominates(5, 9)
+
+postdom_tree = g1.get_postdominator_tree(6)
+assert postdom_tree.dominates(2, 3)
+assert not postdom_tree.dominates(5, 1)
+assert postdom_tree.idoms == g1.compute_immediate_postdominators(6)
+
+## Cache is invalidated on graph modification
+g4 = g2.copy()
+dom_tree = g4.get_dominator_tree(1)
+g4.add_edge(2, 9)
+assert g4.get_dominator_tree(1) is not dom_tree
+assert g4.get_dominator_tree(1).get_idom(9) == 2
+
 # Regression test with natural loops and irreducible loops
 g3 = DiGraph()
 g3.add_edge(1, 2)
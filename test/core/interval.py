@@ -160,3 +160,41 @@ for i in range(1000):
     c = interval(r3)
     assert((a & b) - c == a & (b - c) == (a - c) & (b - c))
     assert(a - (b & c) == (a - b) + (a - c))
+
+# In-place updates and overlap queries
+i_inplace = interval([(1, 3), (10, 12)])
+i_inplace.add(5, 6)
+assert(i_inplace == interval([(1, 3), (5, 6), (10, 12)]))
+i_inplace.add(4, 4)
+assert(i_inplace == interval([(1, 6), (10, 12)]))
+i_inplace.add(0, 20)
+assert(i_inplace == interval([(0, 20)]))
+i_inplace.remove(5, 6)
+assert(i_inplace == interval([(0, 4), (7, 20)]))
+i_inplace.remove(0, 7)
+assert(i_inplace == interval([(8, 20)]))
+i_inplace.remove(30, 40)
+i_inplace.add(3, 2)
+assert(i_inplace == interval([(8, 20)]))
+
+assert(i14.overlaps(2, 3))
+assert(i14.overlaps(6, 7))
+assert(not i14.overlaps(2, 2))
+assert(not i14.overlaps(11, 20))
+assert(not i14.overlaps(4, 3))
+assert(not i_empty.overlaps(0, 10))
+
+for i in range(1000):
+    r1 = gen_random_interval()
+    r2 = gen_random_interval()
+
+    a = interval(r1)
+    b = interval(r2)
+    a_add = interval(a)
+    a_remove = interval(a)
+    for start, stop in r2:
+        a_add.add(start, stop)
+        a_remove.remove(start, stop)
+        assert(a.overlaps(start, stop) == (not (a & interval([(start, stop)])).empty))
+    assert(a_add == a + b)
+    assert(a_remove == a - b)
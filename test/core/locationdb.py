@@ -1,5 +1,8 @@
 from builtins import str
+import pickle
+
 from miasm.core.locationdb import LocationDB
+from miasm.expression.expression import LocKey
 
 
 # Basic tests (LocationDB description)
@@ -112,3 +115,79 @@ assert loc_db.get_name_location(name2) == loc_key5
 loc_db.remove_location(loc_key5)
 assert loc_db.get_name_location(name2) is None
 loc_db.consistency_check()
+
+# Bulk creation
+loc_db = LocationDB()
+loc_key_known = loc_db.add_location(offset=0x20)
+loc_keys = loc_db.add_locations([0x10, 0x20, 0x30, 0x10])
+assert loc_keys[1] == loc_key_known
+assert loc_keys[0] == loc_keys[3]
+assert len(set(loc_keys)) == 3
+assert [loc_db.get_location_offset(loc_key) for loc_key in loc_keys] == \
+    [0x10, 0x20, 0x30, 0x10]
+loc_db.consistency_check()
+
+# Range queries
+assert loc_db.get_range_locations(0x10, 0x30) == loc_keys[:2]
+assert loc_db.get_range_locations(0x11, 0x31) == loc_keys[1:3]
+assert loc_db.get_range_locations(0x40, 0x50) == []
+loc_key_new = loc_db.add_location(offset=0x40)
+loc_db.remove_location(loc_keys[1])
+loc_db.consistency_check()
+assert loc_db.get_range_locations(0, 0x100) == [
+    loc_keys[0], loc_keys[2], loc_key_new
+]
+assert loc_db.get_location_offset(loc_keys[1]) is None
+loc_db.consistency_check()
+
+# Membership and cached loc_keys
+all_loc_keys = loc_db.loc_keys
+assert loc_db.loc_keys is all_loc_keys
+assert loc_db.is_known(loc_keys[0])
+assert not loc_db.is_known(loc_keys[1])
+assert loc_keys[1] not in all_loc_keys
+loc_key_tmp = loc_db.add_location()
+assert loc_db.is_known(loc_key_tmp)
+assert loc_db.loc_keys == all_loc_keys | set([loc_key_tmp])
+loc_db.consistency_check()
+loc_db.remove_location(loc_key_tmp)
+assert not loc_db.is_known(loc_key_tmp)
+assert loc_db.loc_keys == all_loc_keys
+new_loc_keys = loc_db.add_locations([0x70])
+assert loc_db.loc_keys == all_loc_keys | set(new_loc_keys)
+loc_db.remove_location(new_loc_keys[0])
+loc_db.consistency_check()
+
+# Merge with locations known by offset and by name
+loc_db2 = LocationDB()
+loc_db2.add_location(offset=0x10, name="start")
+loc_db2.add_location(name="name_only")
+loc_db2.add_location(offset=0x50, name="other")
+loc_db2.add_location(offset=0x60)
+loc_db.add_location(name="other")
+loc_db.merge(loc_db2)
+loc_db.consistency_check()
+assert loc_db.get_name_location("start") == loc_keys[0]
+assert loc_db.get_name_offset("other") == 0x50
+assert loc_db.get_name_offset("name_only") is None
+assert loc_db.get_offset_location(0x60) is not None
+
+# Serialisation, including the falsy LocKey(0), with every pickle protocol
+loc_db = LocationDB()
+loc_key_0 = loc_db.add_location(offset=0x10, name="entry")
+assert loc_key_0 == LocKey(0)
+loc_db.add_location(name="name_only")
+loc_db.add_location(offset=0x20)
+for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+    loc_key = pickle.loads(pickle.dumps(LocKey(0), protocol))
+    assert loc_key.key == 0 and loc_key == LocKey(0)
+    loaded = pickle.loads(pickle.dumps(loc_db, protocol))
+    loaded.consistency_check()
+    assert loaded.loc_keys == loc_db.loc_keys
+    for loc_key in loc_db.loc_keys:
+        assert loaded.get_location_offset(loc_key) == \
+            loc_db.get_location_offset(loc_key)
+        assert loaded.get_location_names(loc_key) == \
+            loc_db.get_location_names(loc_key)
+    assert loaded.get_name_location("entry") == loc_key_0
+    assert loaded.get_offset_location(0x20) == loc_db.get_offset_location(0x20)
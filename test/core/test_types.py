@@ -561,6 +561,85 @@ for idx, off in ((0, 0), (1, 2), (30, 60)):
     assert arr_t.get_offset(idx) == off
 
 
+# Bulk accessors
+class Packed(MemStruct):
+    fields = [
+        ("a", Num("<I")),
+        ("b", Num("<H")),
+        ("next", Ptr("<I", Self())),
+    ]
+
+class Mixed(MemStruct):
+    fields = [
+        ("num", Num("I")),
+        ("pair", RawStruct("<HB")),
+        ("arr", Array(Num("<H"), 3)),
+        ("inner", Packed),
+        ("bf", BitField(Num("<B"), [("lo", 4), ("hi", 4)])),
+    ]
+
+## Fully packed struct: single struct format
+packed = Packed(jitter.vm)
+packed.memset()
+packed.a = 0x11223344
+packed.next = packed.get_addr()
+assert packed.get_values() == {"a": 0x11223344, "b": 0,
+                               "next": packed.get_addr()}
+packed.set_values({"b": 0x55})
+assert packed.b == 0x55
+assert packed.a == 0x11223344
+packed.set_values({"a": 1, "b": 2, "next": 3})
+assert (packed.a, packed.b, packed.next.val) == (1, 2, 3)
+
+## Nested types
+mixed = Mixed(jitter.vm)
+mixed.memset()
+mixed.num = 7
+mixed.pair = (0x102, 3)
+mixed.arr = [4, 5, 6]
+mixed.inner.a = 8
+mixed.bf.hi = 0xa
+values = mixed.get_values()
+assert values == {
+    "num": 7,
+    "pair": (0x102, 3),
+    "arr": [4, 5, 6],
+    "inner": {"a": 8, "b": 0, "next": 0},
+    "bf": {"lo": 0, "hi": 0xa},
+}
+values["inner"]["b"] = 9
+values["bf"] = {"lo": 3}
+values["arr"][1] = 0x1234
+mixed.set_values(values)
+assert mixed.inner.b == 9
+assert mixed.bf.lo == 3 and mixed.bf.hi == 0xa
+assert mixed.arr[1] == 0x1234
+values["bf"]["hi"] = 0xa
+assert mixed.get_values() == values
+
+## Arrays
+packed_array = Array(Packed, 4).lval(jitter.vm)
+packed_array.set_values([{"a": i, "b": i * 2, "next": 0} for i in range(4)])
+assert [item.b for item in packed_array] == [0, 2, 4, 6]
+assert packed_array.get_values(1, 3) == [{"a": 1, "b": 2, "next": 0},
+                                         {"a": 2, "b": 4, "next": 0}]
+try:
+    packed_array.get_values(0, 5)
+    assert False, "Should raise"
+except IndexError:
+    pass
+
+num_array = Array(Num("<I")).lval(jitter.vm, memarray.get_addr())
+num_array.set_values([1, 2, 3], 2)
+assert num_array.get_values(0, 6)[2:5] == [1, 2, 3]
+assert num_array[3] == 2
+try:
+    num_array.get_values()
+    assert False, "Should raise"
+except ValueError:
+    pass
+
+
 # Repr tests
 
 print("Some struct reprs:\n")
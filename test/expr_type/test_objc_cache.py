@@ -0,0 +1,140 @@
+"""
+Regression test for the ObjC resolution cache of CTypesManager
+* resolved ObjC are shared and equal to uncached resolutions
+* the cache is invalidated on types modification
+* field lookup by offset
+* types database serialisation
+"""
+from __future__ import print_function
+
+import pickle
+
+from future.utils import viewitems
+from past.builtins import cmp
+
+from miasm.core.ctypesmngr import CAstTypes, CTypeId, CTypePtr, CTypeStruct
+from miasm.core.objc import CTypesManagerNotPacked, CTypesManagerPacked, \
+    ObjCStruct
+
+from miasm.arch.x86.ctype import CTypeAMD64_unk
+
+
+text = """
+typedef struct mini_st {
+        int x;
+        char c;
+        short z;
+} Mini;
+
+struct list;
+
+typedef struct test_st {
+        char a;
+        int b;
+        int** ptr;
+        short tab1[4];
+        Mini f_mini;
+        Mini minitab[0x10];
+        char empty[0];
+        int after_empty;
+        union {
+            int a1;
+            char a2[8];
+        };
+        struct list *next;
+        struct test_st *self;
+} Test;
+
+typedef Test TestAlias;
+"""
+
+base_types = CTypeAMD64_unk()
+types_ast = CAstTypes()
+types_ast.add_c_decl(text)
+type_ids = list(types_ast._types) + list(types_ast._typedefs)
+
+
+def fields_at(objc, offset):
+    "Reference linear lookup of the field containing @offset"
+    for field in objc.fields:
+        _, _, field_offset, size = field
+        if field_offset <= offset < field_offset + size:
+            return field
+    return None
+
+
+for manager_cls in [CTypesManagerNotPacked, CTypesManagerPacked]:
+    types_mngr = manager_cls(types_ast, base_types)
+
+    # Resolutions are shared, and equal to uncached ones
+    resolved = {}
+    for type_id in type_ids:
+        objc = types_mngr.get_objc(type_id)
+        types_mngr.check_objc(objc)
+        resolved[type_id] = objc
+    for type_id, objc in viewitems(resolved):
+        assert types_mngr.get_objc(type_id) is objc
+        uncached = manager_cls(types_ast, base_types)
+        assert cmp(uncached.get_objc(type_id), objc) == 0
+    obj_test = resolved[CTypeStruct("test_st")]
+    assert types_mngr.get_objc(CTypeId("Test")) is obj_test
+    assert types_mngr.get_objc(CTypeId("TestAlias")) is obj_test
+    assert obj_test.fields[-1][1].objtype is obj_test
+
+    # Field lookup, including the null sized field and the anonymous union
+    for objc in resolved.values():
+        if not isinstance(objc, ObjCStruct):
+            continue
+        for offset in range(-1, objc.size + 2):
+            assert objc.get_field_at(offset) == fields_at(objc, offset)
+    assert obj_test.get_field_at(-1) is None
+    assert obj_test.get_field_at(obj_test.size) is None
+    empty_offset = [field for field in obj_test.fields
+                    if field[0] == "empty"][0][2]
+    assert obj_test.get_field_at(empty_offset)[0] == "after_empty"
+
+    # Failed resolutions are not cached
+    try:
+        types_mngr.get_objc(CTypeId("unknown_t"))
+    except AssertionError:
+        pass
+    else:
+        raise RuntimeError("Unknown type expected")
+    assert types_mngr.get_objc(CTypeStruct("test_st")) is not obj_test
+    assert cmp(types_mngr.get_objc(CTypeStruct("test_st")), obj_test) == 0
+
+# Types modifications invalidate the cache
+types_mngr = CTypesManagerNotPacked(types_ast, base_types)
+obj_list_ptr = types_mngr.get_objc(CTypePtr(CTypeStruct("list")))
+assert obj_list_ptr.objtype.size == 0
+assert types_mngr.get_objc(CTypePtr(CTypeStruct("list"))) is obj_list_ptr
+generation = types_ast.generation
+types_ast.add_c_decl("struct list { struct list *next; int value; };")
+assert types_ast.generation > generation
+obj_list_ptr = types_mngr.get_objc(CTypePtr(CTypeStruct("list")))
+assert obj_list_ptr.objtype.size == 16
+assert [field[0] for field in obj_list_ptr.objtype.fields] == ["next", "value"]
+obj_test = types_mngr.get_objc(CTypeId("Test"))
+assert obj_test.fields[-2][1].objtype.size == 16
+
+# Types database serialisation
+types_mngr.get_objc(CTypeId("Test"))
+dumped = pickle.dumps(types_mngr)
+loaded = pickle.loads(dumped)
+assert loaded._objc_cache == {}
+assert loaded.types_ast._parser is None
+for type_id in list(types_ast._types) + list(types_ast._typedefs):
+    assert type_id in loaded.types_ast._types or \
+        type_id in loaded.types_ast._typedefs
+    assert cmp(loaded.get_objc(type_id), types_mngr.get_objc(type_id)) == 0
+# Loaded types hashes match fresh ones
+assert hash(list(loaded.types_ast._types)[0]) == \
+    hash(list(types_ast._types)[0])
+assert loaded.get_objc(CTypeId("Test")) is loaded.get_objc(CTypeId("TestAlias"))
+
+# The loaded database can still parse headers
+loaded.types_ast.add_c_decl("typedef struct { struct mini_st m; char end; } Wrap;")
+obj_wrap = loaded.get_objc(CTypeId("Wrap"))
+assert obj_wrap.size == 12
+assert obj_wrap.get_field_at(8)[0] == "end"
+assert pickle.loads(pickle.dumps(types_ast)).generation == types_ast.generation
@@ -54,6 +54,42 @@ for expr in [
         for constraint in consval.constraints:
             print("\t%s" % constraint.to_constraint())
 
+#- Contradictory constraints are pruned
+sol = possible_values(ExprCond(cond1, ExprCond(cond1, cst1, cst2), cst3))
+assert set(consval.value for consval in sol) == set([cst1, cst3])
+sol = possible_values(
+    ExprCond(cond1, cst1, cst2) + ExprCond(cond1, cst3, cst4)
+)
+assert set(consval.value for consval in sol) == set([cst1 + cst3, cst2 + cst4])
+sol = possible_values(ExprCond(ExprInt(0, 1), cst1, cst2))
+assert list(sol) == [ConstrainedValue(frozenset(), cst2)]
+
+#- Lazy enumeration
+conds = [ExprId("cond%d" % i, 1) for i in range(20)]
+expr = ExprCompose(*[ExprCond(cond, ExprInt(0, 1), ExprInt(1, 1))
+                     for cond in conds])
+assert len(list(iter_possible_values(expr, max_values=10))) == 10
+
+#- Merge values
+sol = merge_possible_values(
+    possible_values(ExprCond(cond1, cst1, ExprCond(cond2, cst1, cst2)))
+)
+assert sol == {
+    cst1: set([
+        frozenset([CondConstraintNotZero(cond1)]),
+        frozenset([CondConstraintZero(cond1), CondConstraintNotZero(cond2)]),
+    ]),
+    cst2: set([
+        frozenset([CondConstraintZero(cond1), CondConstraintZero(cond2)]),
+    ]),
+}
+sol = merge_possible_values([
+    ConstrainedValue(frozenset([CondConstraintZero(cond1),
+                                CondConstraintZero(cond2)]), cst1),
+    ConstrainedValue(frozenset([CondConstraintZero(cond1)]), cst1),
+])
+assert sol == {cst1: set([frozenset([CondConstraintZero(cond1)])])}
+
 # Repr
 for expr in [
         cst1,
@@ -975,4 +975,39 @@ for x, y in to_test:
     assert(str(x) == str(y))
     print(x)
 
+
+# Rules indexing: only rules applicable to an operator are run
+from miasm.expression.simplifications_common import simp_add_multiple, \
+    simp_cst_propagation, simp_compose_and_mask, simp_double_zeroext
+
+simp = ExpressionSimplifier()
+simp.enable_passes(ExpressionSimplifier.PASS_COMMONS)
+rules = [rule for _, rule in simp.get_callbacks(a + b)]
+assert simp_add_multiple in rules
+assert simp_cst_propagation in rules
+assert simp_compose_and_mask not in rules
+rules = [rule for _, rule in simp.get_callbacks(ExprOp("&", a, b, c))]
+assert simp_compose_and_mask not in rules
+rules = [rule for _, rule in simp.get_callbacks(a.zeroExtend(64))]
+assert simp_double_zeroext in rules
+assert simp_add_multiple not in rules
+
+# Rules statistics
+simp.profile = True
+assert simp(a + a + b) == b + a * ExprInt(2, 32)
+calls, hits, elapsed = simp.rule_stats[simp_add_multiple]
+assert calls >= 1 and hits == 1 and elapsed >= 0
+assert simp_compose_and_mask not in simp.rule_stats
+simp.reset_rule_stats()
+assert not simp.rule_stats
+
+# Simplified expressions are marked and never simplified again
+result = simp(a + a + b)
+assert not simp.rule_stats
+assert simp(result) == result
+assert not simp.rule_stats
+simp(result ^ c)
+assert simp_add_multiple not in simp.rule_stats
+simp.profile = False
+
 print('all tests ok')
@@ -48,3 +48,74 @@ assert assignblk3[id_a] != int0
 assignblk4 = assignblk3.simplify(expr_simp)
 assert assignblk3[id_a] != int0
 assert assignblk4[id_a] == int0
+
+# Test lifting cache
+from miasm.analysis.machine import Machine
+from miasm.core.locationdb import LocationDB
+
+machine = Machine("x86_32")
+loc_db = LocationDB()
+ir_arch = machine.ir(loc_db)
+cache = ir_arch.enable_lifting_cache()
+ir_arch_ref = machine.ir(LocationDB())
+
+def lift(ir_arch, data, offset):
+    instr = machine.mn.dis(data, 32)
+    instr.offset = offset
+    return ir_arch.instr2ir(instr)
+
+def get_dsts(ir_arch, lifting):
+    """Return the offsets of IRDst destinations of @lifting, None for
+    locations without offset"""
+    assignblk, extra_irblocks = lifting
+    assignblks = [assignblk] + [
+        assignblk
+        for irblock in extra_irblocks
+        for assignblk in irblock
+    ]
+    return [
+        set(
+            ir_arch.loc_db.get_location_offset(loc.loc_key)
+            for loc in get_expr_locs(assignblk[ir_arch.IRDst])
+        ) for assignblk in assignblks if ir_arch.IRDst in assignblk
+    ]
+
+## REP MOVSB: fresh locations and location of the next instruction
+for offset in [0x1000, 0x2000, 0x1000, 0x3000]:
+    lifting = lift(ir_arch, b"\xf3\xa4", offset)
+    lifting_ref = lift(ir_arch_ref, b"\xf3\xa4", offset)
+    assert get_dsts(ir_arch, lifting) == get_dsts(ir_arch_ref, lifting_ref)
+    assert len(lifting[1]) == len(lifting_ref[1])
+    # Fresh locations are generated again on each hit
+    assert lifting[1][0].loc_key not in [
+        irblock.loc_key for irblock in lift(ir_arch, b"\xf3\xa4", offset)[1]
+    ]
+assert cache.misses == 2
+assert cache.hits == 6
+assert cache.hit_rate == 0.75
+
+## PUSH EBP: offset independent
+for offset in [0x1000, 0x1001, 0x1002]:
+    assert lift(ir_arch, b"\x55", offset) == lift(ir_arch_ref, b"\x55", offset)
+assert cache.misses == 4
+assert cache.hits == 7
+
+cache.clear()
+assert cache.hits == cache.misses == 0
+
+## Failing lifting at the probe offset: not relocated, still lifted
+class IRProbeFailure(machine.ir):
+    def get_ir(self, instr):
+        if instr.offset & 0x80000000:
+            raise RuntimeError("Invalid offset")
+        return super(IRProbeFailure, self).get_ir(instr)
+
+ir_arch_probe = IRProbeFailure(LocationDB())
+cache = ir_arch_probe.enable_lifting_cache()
+for offset in [0x1000, 0x2000, 0x2000]:
+    assert lift(ir_arch_probe, b"\x55", offset) == lift(ir_arch_ref, b"\x55", offset)
+assert cache.misses == 2
+assert cache.hits == 1
+
+## The cache is opt-in
+assert machine.ir(LocationDB()).lifting_cache is None
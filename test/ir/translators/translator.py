@@ -0,0 +1,87 @@
+from miasm.expression.expression import *
+from miasm.ir.translators.translator import Translator
+from miasm.ir.translators.python import TranslatorPython
+
+a = ExprId("a", 32)
+b = ExprId("b", 32)
+
+# Handlers are dispatched on the expression class, once per translator class
+handlers = TranslatorPython.get_handlers()
+assert handlers[ExprOp] == TranslatorPython.from_ExprOp
+assert TranslatorPython.get_handlers() is handlers
+
+# Cache statistics
+translator = TranslatorPython()
+expr = ExprMem(a + b, 32) ^ (a + b)
+assert translator.from_expr(expr) == \
+    "((memory(((a + b) & 0xffffffff), 0x4) ^ ((a + b) & 0xffffffff)) & 0xffffffff)"
+# a, b, a + b, @32[a + b] and the xor are each translated once
+assert translator.cache_misses == 5
+hits = translator.cache_hits
+assert hits > 0
+translator.from_expr(expr)
+translator.from_expr(a + b)
+assert translator.cache_hits == hits + 2
+translator.cache_clear()
+assert (translator.cache_hits, translator.cache_misses) == (0, 0)
+
+# Errors of the handlers are still raised
+try:
+    translator.from_expr(ExprOp("unknown_op", a))
+except NotImplementedError:
+    pass
+else:
+    raise RuntimeError("Unknown operator should not be translated")
+
+# Sub-expressions a handler does not need do not fail the translation
+class TranslatorTest(TranslatorPython):
+    def from_ExprOp(self, expr):
+        if expr.op == "first":
+            return self.from_expr(expr.args[0])
+        return super(TranslatorTest, self).from_ExprOp(expr)
+
+translator = TranslatorTest()
+assert TranslatorTest.get_handlers()[ExprOp] == TranslatorTest.from_ExprOp
+assert translator.from_expr(ExprOp("first", a, ExprOp("unknown_op", b))) == "a"
+
+# A failing sub-expression needed by its parent is not translated again: its
+# error is raised again
+class TranslatorFailure(TranslatorPython):
+    calls = 0
+    def from_ExprOp(self, expr):
+        if expr.op == "fail":
+            TranslatorFailure.calls += 1
+            raise ValueError("Failure %d" % TranslatorFailure.calls)
+        return super(TranslatorFailure, self).from_ExprOp(expr)
+
+translator = TranslatorFailure()
+try:
+    translator.from_expr(ExprOp("fail", a + b) + a)
+except ValueError as error:
+    assert str(error) == "Failure 1"
+else:
+    raise RuntimeError("A ValueError was expected")
+assert TranslatorFailure.calls == 1
+# Failures are not kept between translations
+assert translator.from_expr(a + b) == "((a + b) & 0xffffffff)"
+try:
+    translator.from_expr(ExprOp("fail", a + b) + a)
+except ValueError as error:
+    assert str(error) == "Failure 2"
+else:
+    raise RuntimeError("A ValueError was expected")
+
+# Deep expressions do not exhaust the Python stack
+expr = a
+for i in range(5000):
+    expr = ExprOp("^", expr, ExprInt(i, 32))
+translator = TranslatorPython()
+assert translator.from_expr(expr).count("^") == 5000
+
+# Shared sub-expressions are translated once
+expr = a
+for i in range(16):
+    expr = ExprOp("+", expr, expr)
+translator = TranslatorPython()
+translator.from_expr(expr)
+assert translator.cache_misses == 17
@@ -0,0 +1,75 @@
+import struct
+import sys
+from miasm.jitter.csts import PAGE_READ, PAGE_WRITE
+from miasm.analysis.machine import Machine
+from miasm.core.bin_stream import bin_stream_vm
+
+myjit = Machine("x86_32").jitter(sys.argv[1])
+base_addr = 0x10000000
+page_size = bin_stream_vm.PAGE_SIZE
+data = bytes(bytearray(range(0x100))) * (2 * page_size // 0x100)
+myjit.vm.add_memory_page(base_addr, PAGE_READ | PAGE_WRITE, data)
+# Partially mapped page
+myjit.vm.add_memory_page(base_addr + 0x10000, PAGE_READ | PAGE_WRITE,
+                         b"\x90" * 0x10)
+
+bs = bin_stream_vm(myjit.vm)
+assert bs.getbytes(base_addr + 0x10, 4) == b"\x10\x11\x12\x13"
+# Read across pages
+assert bs.getbytes(base_addr + page_size - 2, 4) == b"\xfe\xff\x00\x01"
+assert bs.getbytes(base_addr + 0x10000, 0x10) == b"\x90" * 0x10
+assert bs.get_u32(base_addr + 4) == 0x07060504
+assert bs.getbits((base_addr + 1) * 8 + 4, 12) == 0x102
+assert bs.getbits((base_addr + 0xff) * 8 + 7, 1) == 1
+try:
+    bs.getbytes(base_addr + 0x10008, 0x10)
+except IOError:
+    pass
+else:
+    raise RuntimeError("Read out of mapped memory")
+
+# Cached pages follow the guest memory changes
+myjit.vm.set_mem(base_addr + 0x10, b"\xAA")
+assert bs.getbytes(base_addr + 0x10, 1) == b"\xAA"
+myjit.vm.set_u32(base_addr + 0x10, 0x11223344)
+assert bs.getbytes(base_addr + 0x10, 4) == b"\x44\x33\x22\x11"
+unmapped_addr = base_addr + 0x20000
+try:
+    bs.getbytes(unmapped_addr, 4)
+except IOError:
+    pass
+else:
+    raise RuntimeError("Read out of mapped memory")
+myjit.vm.add_memory_page(unmapped_addr, PAGE_READ | PAGE_WRITE,
+                         b"\xCC" * page_size)
+assert bs.getbytes(unmapped_addr, 4) == b"\xCC" * 4
+myjit.vm.remove_memory_page(unmapped_addr)
+try:
+    bs.getbytes(unmapped_addr, 4)
+except IOError:
+    pass
+else:
+    raise RuntimeError("Read out of mapped memory")
+
+# Writes done by the emulated code are seen by the jitter stream
+code_addr = base_addr + 0x100
+data_addr = base_addr + 0x200
+myjit.vm.set_mem(data_addr, b"\x90\x90")
+stream = myjit.jit.mdis.bin_stream
+assert stream.getbytes(data_addr, 2) == b"\x90\x90"
+# MOV DWORD PTR [data_addr], 0xC348; RET
+myjit.vm.set_mem(
+    code_addr,
+    b"\xc7\x05" + struct.pack("<I", data_addr) + b"\x48\xc3\x00\x00\xc3"
+)
+# Clear the access violations raised by the out of memory reads
+myjit.vm.set_exception(0)
+myjit.cpu.ESP = base_addr + 0x1000
+myjit.push_uint32_t(0x1337beef)
+myjit.add_breakpoint(0x1337beef, lambda jitter: False)
+myjit.init_run(code_addr)
+myjit.continue_run()
+assert stream.getbytes(data_addr, 2) == b"\x48\xc3"
+# DEC EAX; RET
+block = myjit.jit.disasm_and_jit_block(data_addr, myjit.vm)
+assert block.lines[0].name == "DEC"
@@ -0,0 +1,109 @@
+import sys
+
+from miasm.analysis.machine import Machine
+from miasm.core import parse_asm, asmblock
+from miasm.expression.expression import ExprId, ExprOp
+from miasm.jitter.csts import PAGE_READ, PAGE_WRITE, EXCEPT_DIV_BY_ZERO
+
+# Operators unknown to TranslatorPython (segm, x86_cpuid, cnttrailzeros,
+# sdiv/smod, ...) are evaluated through the execution engine simplifier by the
+# generated code: compare with the C code generator.
+machine = Machine("x86_32")
+
+CODE_ADDR = 0x1000
+DATA_ADDR = 0x2000
+FS_BASE = 0x3000
+
+TXT = '''
+main:
+    MOV    ECX, 0x10
+loop:
+    MOV    EAX, DWORD PTR FS:[ECX * 4]
+    ADD    DWORD PTR [EDI], EAX
+    BSF    EDX, EAX
+    ADD    ESI, EDX
+    MOV    EAX, DWORD PTR [EDI]
+    CDQ
+    MOV    EBX, ECX
+    NEG    EBX
+    IDIV   EBX
+    ADD    DWORD PTR [EDI + 4], EAX
+    ADD    DWORD PTR [EDI + 8], EDX
+    DEC    ECX
+    JNZ    loop
+    XOR    EAX, EAX
+    CPUID
+    MOV    DWORD PTR [EDI + 0xC], EDX
+    XOR    ECX, ECX
+    IDIV   ECX
+    MOV    EAX, 0x1337
+    RET
+'''
+
+asmcfg, loc_db = parse_asm.parse_txt(machine.mn, 32, TXT)
+loc_db.set_location_offset(loc_db.get_name_location("main"), CODE_ADDR)
+patches = asmblock.asm_resolve_final(machine.mn, asmcfg, loc_db)
+fs_data = b"".join(
+    (((index * 0x1357) << (index % 12)) & 0xffffffff).to_bytes(4, "little")
+    for index in range(0x11)
+)
+
+
+def run(engine):
+    """Run the code with @engine; return the registers, the data page and the
+    exception on the division by zero"""
+    jitter = machine.jitter(engine)
+    jitter.init_stack()
+    jitter.vm.add_memory_page(CODE_ADDR, PAGE_READ | PAGE_WRITE,
+                              b"\x00" * 0x1000)
+    for offset, raw in patches.items():
+        jitter.vm.set_mem(offset, raw)
+    jitter.vm.add_memory_page(DATA_ADDR, PAGE_READ | PAGE_WRITE,
+                              b"\x00" * 0x1000)
+    jitter.vm.add_memory_page(FS_BASE, PAGE_READ | PAGE_WRITE,
+                              fs_data.ljust(0x1000, b"\x00"))
+    jitter.cpu.FS = 0x33
+    jitter.cpu.set_segm_base(jitter.cpu.FS, FS_BASE)
+    jitter.cpu.EDI = DATA_ADDR
+    jitter.cpu.ESI = 0
+    jitter.init_run(CODE_ADDR)
+    try:
+        jitter.continue_run()
+    except AssertionError:
+        exception = jitter.vm.get_exception() | jitter.cpu.get_exception()
+    else:
+        raise RuntimeError("Division by zero expected")
+    return (jitter.cpu.get_gpreg(), jitter.vm.get_mem(DATA_ADDR, 0x10),
+            exception, jitter)
+
+
+gpregs, data, exception, jitter = run("python")
+assert exception & EXCEPT_DIV_BY_ZERO == EXCEPT_DIV_BY_ZERO
+assert gpregs["RSI"] != 0
+assert data[0xC:0x10] != b"\x00" * 4
+
+# The fallback is used by the generated code
+mdis = machine.dis_engine(jitter.bs, loc_db=jitter.ir_arch.loc_db)
+source, constants = jitter.jit.gen_python(
+    mdis.dis_block(loc_db.get_location_offset(loc_db.get_name_location("loop")))
+)
+assert "fallback(" in source
+ops = set(value.op for value in constants.values() if hasattr(value, "op"))
+for op in ["segm", "cnttrailzeros", "sdiv", "smod"]:
+    assert op in ops, op
+
+# Operators without concrete simplification (floating point ones) are
+# reported
+template = ExprOp("sint_to_fp", ExprId("__arg0", 32))
+try:
+    jitter.jit.eval_op_fallback(template, (3,))
+except RuntimeError:
+    pass
+else:
+    raise RuntimeError("Missing simplification expected")
+
+# Results match the C code generator ones
+gpregs_ref, data_ref, exception_ref, _ = run(sys.argv[1])
+assert gpregs == gpregs_ref
+assert data == data_ref
+assert exception == exception_ref
@@ -0,0 +1,87 @@
+import os
+import shutil
+import sys
+import tempfile
+
+from miasm.analysis.machine import Machine
+from miasm.analysis.sandbox import Sandbox_Win_x86_32
+from miasm.jitter.loader.pe import vm_load_pe_libs, libimp_pe, PeImageCache
+from miasm.loader.pe_init import PE
+
+# Build a DLL exporting some functions
+pe = PE()
+pe.NThdr.ImageBase = 0x60000000
+s_text = pe.SHList.add_section(name="text", addr=0x1000, rawsize=0x1000,
+                               data=b"\xc3" * 0x10)
+pe.DirExport.create("test.dll")
+for index in range(0x10):
+    pe.DirExport.add_name(b"Func%02d" % index, rva=s_text.addr + index)
+s_exp = pe.SHList.add_section(name="edata", rawsize=0x1000)
+pe.DirExport.set_rva(s_exp.addr)
+
+lib_path = tempfile.mkdtemp()
+with open(os.path.join(lib_path, "test.dll"), "wb") as fdesc:
+    fdesc.write(bytes(pe))
+
+# Main program, loaded by the sandboxes
+main_pe = PE()
+main_text = main_pe.SHList.add_section(name="text", addr=0x1000,
+                                       rawsize=0x1000, data=b"\xc3")
+main_pe.Opthdr.AddressOfEntryPoint = main_text.addr
+main_path = os.path.join(lib_path, "main.exe")
+with open(main_path, "wb") as fdesc:
+    fdesc.write(bytes(main_pe))
+
+
+def load(image_cache=None):
+    """Load test.dll in a new VmMngr; return its PE instance, memory and
+    exports"""
+    myjit = Machine("x86_32").jitter(sys.argv[1])
+    libs = libimp_pe()
+    name2module = vm_load_pe_libs(myjit.vm, ["test.dll"], libs, lib_path,
+                                  image_cache=image_cache)
+    memory = dict(
+        (addr, (page["data"], page["access"]))
+        for addr, page in myjit.vm.get_all_memory().items()
+    )
+    return name2module["test.dll"], memory, libs.cname2addr
+
+
+try:
+    pe_ref, memory_ref, exports_ref = load()
+    assert exports_ref["test_Func03"] == 0x60001003
+
+    cache = PeImageCache()
+    pe_1, memory_1, exports_1 = load(cache)
+    pe_2, memory_2, exports_2 = load(cache)
+    # The DLL is only parsed once
+    assert len(cache) == 1
+    assert pe_1 is pe_2
+    assert pe_1 is not pe_ref
+    # Cached loads are identical to a regular one
+    assert memory_1 == memory_2 == memory_ref
+    assert exports_1 == exports_2 == exports_ref
+
+    cache.clear()
+    assert len(cache) == 0
+    pe_3, memory_3, _ = load(cache)
+    assert pe_3 is not pe_1
+    assert memory_3 == memory_ref
+
+    # Sandboxes only share their DLLs on demand
+    Sandbox_Win_x86_32.ALL_IMP_DLL = ["test.dll"]
+    Sandbox_Win_x86_32.modules_path = lib_path
+
+    def sandbox_dll(*args):
+        parser = Sandbox_Win_x86_32.parser()
+        parser.add_argument("filename")
+        options = parser.parse_args(
+            [main_path, "-l", "--jitter", sys.argv[1]] + list(args)
+        )
+        sandbox = Sandbox_Win_x86_32(options.filename, options, {})
+        return sandbox.name2module["test.dll"]
+
+    assert sandbox_dll() is not sandbox_dll()
+    assert sandbox_dll("--cache-dlls") is sandbox_dll("--cache-dlls")
+finally:
+    shutil.rmtree(lib_path)
@@ -0,0 +1,123 @@
+import os
+
+from miasm.loader import elf as elf_csts
+from miasm.loader.elf_init import ELF, StrTable, SymTable, RelTable, \
+    TableIndex, WSym32, WSym64
+
+
+def ref_strings(content):
+    "Eagerly parsed offset -> string of a string table"
+    res = {}
+    index = 0
+    while index < len(content):
+        stop = content.find(b"\x00", index)
+        if stop < 0:
+            stop = len(content)
+        res[index] = content[index:stop]
+        index = stop + 1
+    return res
+
+
+def sym_fields(sym):
+    return (sym.name, sym.value, sym.size, sym.info, sym.other, sym.shndx)
+
+
+def ref_symtab(section, size):
+    "Eagerly parsed symbols of @section"
+    wsym = WSym32 if size == 32 else WSym64
+    content = section.content
+    entsize = section.sh.entsize
+    return [
+        wsym(section, section.sex, size, content[index:index + entsize])
+        for index in range(0, len(content), entsize)
+    ]
+
+
+for fname in ["test_env.x86_32", "test_env.x86_64", "test_env.arml"]:
+    with open(os.path.join("..", "os_dep", "linux", fname), "rb") as fdesc:
+        elf = ELF(fdesc.read())
+    size = elf.size
+    symtabs = [section for section in elf.sh if isinstance(section, SymTable)]
+    reltabs = [section for section in elf.sh if isinstance(section, RelTable)]
+    strtabs = [section for section in elf.sh if isinstance(section, StrTable)]
+    assert symtabs and reltabs and strtabs
+
+    # String tables are parsed on demand
+    for section in strtabs:
+        assert section._res is None
+        assert section.res == ref_strings(bytes(section.content))
+        assert section.res is section.res
+
+    for section in symtabs:
+        # Symbols are only wrapped on access
+        assert not section.symtab._entries
+        ref = ref_symtab(section, size)
+        assert len(section.symtab) == len(ref)
+        assert not section.symtab._entries
+        assert [sym_fields(sym) for sym in section.symtab] == \
+            [sym_fields(sym) for sym in ref]
+        assert section.symtab[-1] is section.symtab[len(ref) - 1]
+        assert [sym_fields(sym) for sym in section.symtab[1:3]] == \
+            [sym_fields(sym) for sym in ref[1:3]]
+        try:
+            section.symtab[len(ref)]
+        except IndexError:
+            pass
+        else:
+            raise RuntimeError("IndexError expected")
+
+        # Name index: the last symbol of a name wins, as in a dict
+        ref_symbols = dict((sym.name, sym_fields(sym)) for sym in ref)
+        assert sorted(section.symbols) == sorted(ref_symbols)
+        assert len(section.symbols) == len(ref_symbols)
+        for name, fields in ref_symbols.items():
+            assert name in section.symbols
+            assert sym_fields(section[name]) == fields
+        for position, sym in enumerate(ref):
+            assert section.symbol_name(position) == sym.name
+
+        # Address index
+        for sym in ref:
+            if sym.shndx == 0 or sym.info & 0xF in [elf_csts.STT_SECTION,
+                                                    elf_csts.STT_FILE]:
+                continue
+            assert sym_fields(sym) in [
+                sym_fields(found)
+                for found in section.getsymbolsbyvalue(sym.value)
+            ]
+            found = section.getsymbolbyvad(sym.value)
+            assert found is not None and found.value == sym.value
+        assert section.getsymbolbyvad(0) is None
+
+    # Symbol -> relocation index, last relocation of a symbol wins
+    for section in reltabs:
+        if section.linksection == elf.sh.shlist[0]:
+            assert section.rel == {}
+            continue
+        ref_rel = {}
+        for rel in section.reltab:
+            ref_rel[rel.sym] = (rel.offset, rel.info)
+        assert sorted(section.rel) == sorted(ref_rel)
+        for sym, fields in ref_rel.items():
+            rel = section.rel[sym]
+            assert (rel.offset, rel.info) == fields
+
+# TableIndex as a mutable mapping
+section = symtabs[0]
+index = TableIndex(
+    section.symtab,
+    lambda position, raw: position if position % 2 else None
+)
+assert len(index) == len(section.symtab) // 2
+assert 1 in index and 0 not in index
+assert index[1] is section.symtab[1]
+index[0] = "new"
+assert index[0] == "new" and 0 in index
+assert len(index) == len(section.symtab) // 2 + 1
+index[1] = "replaced"
+assert index[1] == "replaced"
+assert len(index) == len(section.symtab) // 2 + 1
+del index[1]
+del index[0]
+assert 0 not in index and 1 not in index
+assert len(index) == len(section.symtab) // 2 - 1
@@ -0,0 +1,97 @@
+import struct
+
+from miasm.loader.new_cstruct import CStruct
+
+
+class TestFixed(CStruct):
+    _fields = [("a", "u08"),
+               ("b", "u16"),
+               ("c", "u32"),
+               ("d", "ptr"),
+               ("e", "4s")]
+
+
+class TestVariable(CStruct):
+    _fields = [("count", "u08"),
+               ("name", "sz"),
+               ("items", "TestFixed", lambda c: c.count),
+               ("words", "u16", lambda c: c.count),
+               ("last", "u32")]
+
+
+def ref_fixed(sex, wsize, a, b, c, d, e):
+    "Expected packing of a TestFixed"
+    ptr = "I" if wsize == 32 else "Q"
+    return struct.pack(sex + "BHI" + ptr + "4s", a, b, c, d, e)
+
+
+for _sex, sex in [(0, "<"), (1, ">")]:
+    for wsize in [32, 64]:
+        entries = [
+            (index, index * 0x101, index * 0x1010101, index << 24, b"abc%d" % index)
+            for index in range(5)
+        ]
+        data = b"".join(ref_fixed(sex, wsize, *entry) for entry in entries)
+        # Unpacking checks are strict on the end of data
+        padded = data + b"\x00"
+
+        # Single structure
+        fixed = TestFixed.unpack(padded, 0, None, _sex, wsize)
+        assert (fixed.a, fixed.b, fixed.c, fixed.d, fixed.e) == entries[0]
+        assert bytes(fixed) == ref_fixed(sex, wsize, *entries[0])
+
+        # Array of fixed size structures: decoded from a single slice
+        size = len(data) // len(entries)
+        array, length = TestFixed.unpack_array(padded, 4, size, None, _sex, wsize)
+        assert length == 4 * size
+        assert [(s.a, s.b, s.c, s.d, s.e) for s in array] == entries[1:]
+        for structure in array:
+            assert structure.parent_head is structure
+            assert structure._sex == _sex and structure._wsize == wsize
+            assert bytes(structure) == \
+                bytes(TestFixed.unpack(bytes(structure) + b"\x00", 0, None,
+                                       _sex, wsize))
+        assert TestFixed.unpack_array(padded, 0, 0, None, _sex, wsize) == ([], 0)
+        try:
+            TestFixed.unpack_array(data, len(entries), 0, None, _sex, wsize)
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError("Not enough data expected")
+
+        # Variable structure, with an array of sub structures
+        variable_data = (
+            struct.pack(sex + "B", 2) + b"name\x00" + data[:2 * size] +
+            struct.pack(sex + "HHI", 0x1234, 0x5678, 0xdeadbeef)
+        )
+        variable = TestVariable.unpack(variable_data + b"\x00", 0, None,
+                                       _sex, wsize)
+        assert variable.name == b"name"
+        assert [(s.a, s.b, s.c, s.d, s.e) for s in variable.items] == \
+            entries[:2]
+        for structure in variable.items:
+            assert structure.parent is variable
+        assert variable.words == [0x1234, 0x5678]
+        assert variable.last == 0xdeadbeef
+        assert bytes(variable) == variable_data
+        array, length = TestVariable.unpack_array(
+            variable_data * 2 + b"\x00", 2, 0, None, _sex, wsize
+        )
+        assert length == 2 * len(variable_data)
+        assert [bytes(structure) for structure in array] == [variable_data] * 2
+
+        # Packing values refused by the compiled Struct falls back to the per
+        # field packing: None values are zeroed, str are converted to bytes
+        fixed = TestFixed(_sex=_sex, _wsize=wsize, a=1, c=3, d=4, e="xyz")
+        assert bytes(fixed) == ref_fixed(sex, wsize, 1, 0, 3, 4, b"xyz")
+        fixed = TestFixed(_sex=_sex, _wsize=wsize)
+        assert bytes(fixed) == b"\x00" * size
+        # Out of range values are still refused
+        fixed = TestFixed(_sex=_sex, _wsize=wsize, a=0x100, b=0, c=0, d=0,
+                          e=b"")
+        try:
+            bytes(fixed)
+        except struct.error:
+            pass
+        else:
+            raise RuntimeError("struct.error expected")
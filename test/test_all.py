@@ -335,6 +335,8 @@ testset += RegressionTest(["simplifications.py", "--z3"],
 ## ObjC/CHandler
 testset += RegressionTest(["test_chandler.py"], base_dir="expr_type",
                           tags=[TAGS["cparser"]])
+testset += RegressionTest(["test_objc_cache.py"], base_dir="expr_type",
+                          tags=[TAGS["cparser"]])
 
 
 ## IR
@@ -344,6 +346,7 @@ for script in ["symbexec.py",
                ]:
     testset += RegressionTest([script], base_dir="ir")
 
+testset += RegressionTest(["translator.py"], base_dir="ir/translators")
 testset += RegressionTest(["z3_ir.py"], base_dir="ir/translators",
                           tags=[TAGS["z3"]])
 testset += RegressionTest(["smt2.py"], base_dir="ir/translators",
@@ -361,6 +364,10 @@ for arch in ["x86_32", "x86_64", "arml", "aarch64l"]:
                                "TEST=TOTO", "--mimic-env"],
                               base_dir="os_dep/linux", tags=[TAGS['gcc']])
 
+## Loader
+testset += RegressionTest(["elf_init.py"], base_dir="loader")
+testset += RegressionTest(["new_cstruct.py"], base_dir="loader")
+
 ## Analysis
 testset += RegressionTest(["depgraph.py"], base_dir="analysis",
                           products=[fname for fnames in (
@@ -382,6 +389,12 @@ for jitter in ArchUnitTest.jitter_engines:
         continue
     tags = [TAGS[jitter]] if jitter in TAGS else []
     testset += RegressionTest(["dse.py", jitter], base_dir="analysis", tags=tags)
+    testset += RegressionTest(["gdbserver.py", jitter], base_dir="analysis",
+                              tags=tags)
+    testset += RegressionTest(["sandbox_farm.py", jitter], base_dir="analysis",
+                              tags=tags)
+    testset += RegressionTest(["sandbox_snapshot.py", jitter],
+                              base_dir="analysis", tags=tags)
 
 testset += RegressionTest(["range.py"], base_dir="analysis",
                           tags=[TAGS["z3"]])
@@ -392,6 +405,7 @@ testset += RegressionTest(["data_flow.py"], base_dir="analysis",
             for test_nb in range(1, 18))
                                     for fname in fnames])
 testset += RegressionTest(["unssa.py"], base_dir="analysis")
+testset += RegressionTest(["analysis_db.py"], base_dir="analysis")
 
 for i in range(1, 21):
     input_name = "cst_propag/x86_32_sc_%d" % i
@@ -465,10 +479,14 @@ for script in ["jitload.py",
                "bad_block.py",
                "jmp_out_mem.py",
                "mem_breakpoint.py",
+               "bin_stream_vm.py",
+               "pe_image_cache.py",
                ]:
     for engine in ArchUnitTest.jitter_engines:
         testset += RegressionTest([script, engine], base_dir="jitter",
                                   tags=[TAGS.get(engine,None)])
+testset += RegressionTest(["jitcore_python.py", "gcc"], base_dir="jitter",
+                          tags=[TAGS["gcc"]])
 
 
 # Examples
@@ -494,6 +512,18 @@ class Example(Test):
         return os.path.join(cls.sample_dir, sample_name)
 
 
+## Core
+class ExampleCore(Example):
+    """Core examples specificities:
+    - script path begins with "core/"
+    """
+    example_dir = "core"
+
+
+testset += ExampleCore(["interval_benchmark.py", "-n", "1000"])
+testset += ExampleCore(["machine_benchmark.py", "-a", "mn", "dis_engine", "ira",
+                        "jitter"])
+
 ## Assembler
 class ExampleAssembler(Example):
     """Assembler examples specificities:
@@ -503,6 +533,7 @@ class ExampleAssembler(Example):
 
 
 testset += ExampleAssembler(["simple.py"])
+testset += ExampleAssembler(["benchmark.py", "-n", "500"])
 
 class ExampleShellcode(ExampleAssembler):
     """Specificities:
@@ -828,6 +859,25 @@ for jitter in ExampleJitterNoPython.jitter_engines:
                                      depends=[test_x86_32_seh],
                                      tags=tags)
 
+for jitter in ExampleJitter.jitter_engines:
+    tags = [TAGS[jitter]] if jitter in TAGS else []
+    testset += ExampleJitter(["sandbox_farm.py", Example.get_sample("md5_arm"),
+                              "-r", "2", "-p", "2", "-n", "1000000",
+                              "-o", "-q --mimic-env", "--jitter", jitter],
+                             tags=tags)
+
+for script, dep in [(["sandbox_snapshot.py", "Sandbox_Linux_arml",
+                      Example.get_sample("md5_arm"), "-q", "--mimic-env"],
+                     []),
+                    (["sandbox_snapshot.py", "Sandbox_Win_x86_32",
+                      Example.get_sample("x86_32_automod_2.bin"), "-y"],
+                     [test_x86_32_automod_2]),
+                    ]:
+    for jitter in ExampleJitter.jitter_engines:
+        tags = [TAGS[jitter]] if jitter in TAGS else []
+        testset += ExampleJitter(script + ["--jitter", jitter], depends=dep,
+                                 tags=tags)
+
 testset += ExampleJitter(["example_types.py"])
 testset += ExampleJitter(["trace.py", Example.get_sample("md5_arm"), "-a",
                           "0xA684"])